@@ -0,0 +1,126 @@
+# agent/answer_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from .config import CACHE_DIR, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_AGE, ANSWER_CACHE_MAX_ENTRIES
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class AnswerCache:
+    def __init__(self, path: Optional[str] = None, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_age: int = ANSWER_CACHE_MAX_AGE, max_entries: int = ANSWER_CACHE_MAX_ENTRIES):
+        """
+        Persistent semantic cache of generated answers. Each answer is stored
+        with the embedding of the query that produced it; a new query reuses
+        it when their cosine similarity reaches `threshold` and the answer is
+        younger than `max_age` seconds.
+
+        Vectors are kept L2-normalized in memory, so a lookup is a single
+        matrix-vector product over the fresh entries of the same model.
+        """
+        self.path = path or os.path.join(CACHE_DIR, "answers.sqlite")
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, model TEXT NOT NULL, query TEXT NOT NULL, "
+                "vector BLOB NOT NULL, answer TEXT NOT NULL, sources TEXT NOT NULL, scores TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_created ON answers(created_at)")
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_vector: Sequence[float], model_name: str) -> Optional[Dict]:
+        """
+        Find the most similar fresh answer for a query embedding.
+
+        Returns:
+            Dict: 'query', 'answer', 'sources', 'scores', 'created_at' and
+            'similarity', or None when nothing clears the threshold.
+        """
+        query_vec = self._normalize(query_vector)
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector FROM answers WHERE model = ? AND created_at >= ?", (model_name, cutoff)
+            ).fetchall()
+
+        best_id, best_sim = None, -1.0
+        if rows:
+            matrix = np.frombuffer(b"".join(blob for _, blob in rows), dtype=np.float32)
+            matrix = matrix.reshape(len(rows), -1)
+            if matrix.shape[1] == query_vec.shape[0]:
+                sims = matrix @ query_vec
+                idx = int(np.argmax(sims))
+                best_id, best_sim = rows[idx][0], float(sims[idx])
+
+        if best_id is None or best_sim < self.threshold:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            query, answer, sources, scores, created_at = self._conn.execute(
+                "SELECT query, answer, sources, scores, created_at FROM answers WHERE id = ?", (best_id,)
+            ).fetchone()
+        logger.info(f"[AnswerCache] Hit for '{query}' (similarity {best_sim:.3f})")
+        return {
+            "query": query,
+            "answer": answer,
+            "sources": json.loads(sources),
+            "scores": json.loads(scores),
+            "created_at": created_at,
+            "similarity": best_sim,
+        }
+
+    def put(self, query: str, query_vector: Sequence[float], model_name: str, answer: str,
+            sources: List[Dict], scores: List[Dict]) -> None:
+        """
+        Store an answer with its source citations and relevance scores.
+        """
+        now = time.time()
+        blob = self._normalize(query_vector).tobytes()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO answers (model, query, vector, answer, sources, scores, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model_name, query, blob, answer, json.dumps(sources), json.dumps(scores), now)
+            )
+            self._conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.max_age,))
+            self._conn.execute(
+                "DELETE FROM answers WHERE id NOT IN "
+                "(SELECT id FROM answers ORDER BY created_at DESC LIMIT ?)", (self.max_entries,)
+            )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
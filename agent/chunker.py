@@ -1,20 +1,136 @@
 # agent/chunker.py
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from typing import List, Dict
+import os
+import re
+from contextlib import nullcontext
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from .config import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_PROCESSES, CHUNK_PARALLEL_MIN_CHARS
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SENTENCE_ENDS = (". ", "! ", "? ")
+# A heading line: markdown '#', or a short capitalized line without closing
+# punctuation that is followed by a paragraph (so list items don't qualify)
+HEADING = re.compile(r"\n(?=[^\n]{0,80}\n[^\n]{81})[ \t]*(#[^\n]*|[^\s#a-z][^\n]*(?<![.!?:;,\"')\]\s]))\n")
+
+class Chunk:
+    """
+    One chunk of a page: its text and the [start, end) character offsets of
+    that text in the source. `__slots__` keeps the per-chunk footprint small
+    when large crawls produce thousands of them.
+    """
+    __slots__ = ("content", "start", "end", "metadata")
+
+    def __init__(self, content: str, start: int, end: int, metadata: Dict[str, Any]):
+        self.content = content
+        self.start = start
+        self.end = end
+        self.metadata = metadata
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"content": self.content,
+                "metadata": {**self.metadata, "start_offset": self.start, "end_offset": self.end}}
+
+    def __repr__(self) -> str:
+        return f"Chunk({self.start}:{self.end}, {self.content[:40]!r})"
+
+def _last_boundary(content: str, start: int, limit: int) -> int:
+    """
+    Latest paragraph or sentence end in (start, limit], else the last space,
+    else `limit` itself (a single word longer than a chunk).
+    """
+    # Search the second half first; most chunks end there, and rfind cost grows with the span
+    for lo in ((start + limit) // 2, start):
+        boundary = content.rfind("\n", lo + 1, limit + 1)
+        for mark in SENTENCE_ENDS:
+            found = content.rfind(mark, lo, limit + 1)
+            if found + 1 > boundary:
+                boundary = found + 1
+        if boundary > start:
+            return boundary
+    space = content.rfind(" ", start + 1, limit + 1)
+    return space if space > start else limit
+
+def _first_boundary(content: str, lo: int, hi: int) -> int:
+    """
+    Start of the earliest paragraph or sentence beginning in [lo, hi), or -1.
+    """
+    first = -1
+    found = content.find("\n", lo, hi)
+    if found != -1:
+        first = found + 1
+    for mark in SENTENCE_ENDS:
+        found = content.find(mark, lo, hi)
+        if found != -1 and (first == -1 or found + 2 < first):
+            first = found + 2
+    return first
 
 class TextChunker:
-    def __init__(self, chunk_size: int = 2048, chunk_overlap: int = 512):
+    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP,
+                 executor: Optional[Executor] = None, parallel_min_chars: int = CHUNK_PARALLEL_MIN_CHARS):
+        """
+        Sentence- and heading-aware chunker.
+
+        Chunks are packed from whole sentences up to `chunk_size` characters,
+        and consecutive chunks share up to `chunk_overlap` characters of
+        trailing sentences (or words, where there are no sentence breaks). A heading starts a new chunk (without overlap)
+        once the current one is a quarter full, so sections stay together.
+
+        With an `executor` (e.g. a ProcessPoolExecutor), pages of at least
+        `parallel_min_chars` are chunked there; callers on several threads
+        then chunk in parallel instead of contending for the GIL.
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = min(chunk_overlap, chunk_size // 2)
+        self.executor = executor
+        self.parallel_min_chars = parallel_min_chars
+
+    def iter_chunks(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Chunk]:
         """
-        Initialize text chunker with recursive splitting strategy.
+        Lazily yield Chunk records for `content`, in order.
+
+        Boundaries are searched only near each chunk's end with str.rfind /
+        str.find, so the Python-level work is per chunk, not per sentence.
         """
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ".", "!", "?", " ", ""]
-        )
+        metadata = metadata or {}
+        min_fill = self.chunk_size // 4
+        length = len(content.rstrip())
+        start = len(content) - len(content.lstrip())
+
+        while start < length:
+            limit = start + self.chunk_size
+            end = length if limit >= length else _last_boundary(content, start, limit)
+
+            # A heading past the first quarter of the chunk starts the next one, without overlap
+            next_start = -1
+            heading = HEADING.search(content, start + min_fill, end)
+            if heading is not None:
+                next_start, end = heading.start(1), heading.start()
+
+            while end > start and content[end - 1].isspace():
+                end -= 1
+            yield Chunk(content[start:end], start, end, metadata)
+            if end >= length:
+                return
+
+            if next_start == -1:
+                # Resume at the earliest sentence within `chunk_overlap` of the end,
+                # else at the earliest word there (text without sentence punctuation)
+                lo = max(start + 1, end - self.chunk_overlap)
+                next_start = _first_boundary(content, lo, end)
+                if next_start == -1:
+                    next_start = content.find(" ", lo, end) + 1
+                if next_start <= start or next_start >= end:
+                    next_start = end
+            while next_start < length and content[next_start].isspace():
+                next_start += 1
+            start = next_start
 
-    def chunk_text(self, content: str, metadata: Dict[str, str]) -> List[Dict[str, str]]:
+    def chunk_text(self, content: str, metadata: Dict[str, str]) -> List[Dict[str, Any]]:
         """
         Split the text into clean chunks and attach metadata for vector storage.
 
@@ -23,12 +139,53 @@ class TextChunker:
             metadata (Dict[str, str]): Metadata like URL, title, etc.
 
         Returns:
-            List[Dict[str, str]]: List of chunks with content + metadata
+            List[Dict[str, Any]]: Chunks with 'content' and 'metadata', which
+            also holds the chunk's 'start_offset' / 'end_offset' in `content`.
         """
         try:
-            chunks = self.splitter.split_text(content)
-            return [{"content": chunk, "metadata": metadata} for chunk in chunks]
+            if self.executor is not None and len(content) >= self.parallel_min_chars:
+                spans = self.executor.submit(_chunk_spans, content, self.chunk_size, self.chunk_overlap).result()
+                return _spans_to_dicts(content, metadata, spans)
+            return [chunk.to_dict() for chunk in self.iter_chunks(content, metadata)]
         except Exception as e:
-            import logging
-            logging.error(f"[Chunker] Failed to split content: {e}")
+            logger.error(f"[Chunker] Failed to split content: {e}")
             return []
+
+def _chunk_spans(content: str, chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int]]:
+    # Module-level so process pools can pickle it; only offsets travel back
+    return [(chunk.start, chunk.end) for chunk in TextChunker(chunk_size, chunk_overlap).iter_chunks(content)]
+
+def _spans_to_dicts(content: str, metadata: Dict[str, Any], spans: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    return [Chunk(content[start:end], start, end, metadata).to_dict() for start, end in spans]
+
+def chunk_process_pool(max_workers: int = CHUNK_PROCESSES) -> Optional[ProcessPoolExecutor]:
+    """
+    Process pool for chunking (`max_workers` 0 = one per CPU), or None when
+    fewer than two workers are available and chunking inline is faster.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    return ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+
+def chunk_many(pages: Iterable[Tuple[str, Dict[str, Any]]], chunk_size: int = CHUNK_SIZE,
+               chunk_overlap: int = CHUNK_OVERLAP, executor: Optional[Executor] = None) -> List[List[Dict[str, Any]]]:
+    """
+    Chunk many (content, metadata) pages in parallel across processes.
+
+    Uses `executor` if given, otherwise a temporary process pool (or chunks
+    inline on a single CPU). Workers return offsets only, so chunk text is
+    not pickled back.
+
+    Returns:
+        List[List[Dict]]: Each page's chunks, in input order.
+    """
+    pages = list(pages)
+    args = ([content for content, _ in pages], [chunk_size] * len(pages), [chunk_overlap] * len(pages))
+    pool = executor or chunk_process_pool()
+    if pool is None:
+        all_spans = map(_chunk_spans, *args)
+    else:
+        # Batch tasks per worker of the pool that runs them (thread pools ignore chunksize)
+        workers = getattr(pool, "_max_workers", 1)
+        with pool if executor is None else nullcontext():
+            all_spans = list(pool.map(_chunk_spans, *args, chunksize=max(1, len(pages) // (4 * workers))))
+    return [_spans_to_dicts(content, metadata, spans) for (content, metadata), spans in zip(pages, all_spans)]
@@ -8,3 +8,83 @@ load_dotenv()
 GOOGLE_CSE_API_KEY = os.getenv("GOOGLE_CSE_API_KEY")
 GOOGLE_CSE_CX = os.getenv("GOOGLE_CSE_CX")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# ─── Fetch Scheduler ────────────────────────────────────────────
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", "8"))
+FETCH_MAX_PER_HOST = int(os.getenv("FETCH_MAX_PER_HOST", "2"))
+FETCH_HOST_DELAY = float(os.getenv("FETCH_HOST_DELAY", "0.5"))
+
+# ─── HTTP Client ────────────────────────────────────────────────
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# ─── Chunking ───────────────────────────────────────────────────
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "2048"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "512"))
+CHUNK_PROCESSES = int(os.getenv("CHUNK_PROCESSES", "0"))  # 0 = one per CPU
+# Process-pool chunking only pays off for texts far larger than a scraped page (see CRAWL_MAX_CHARS)
+CHUNK_PARALLEL_MIN_CHARS = int(os.getenv("CHUNK_PARALLEL_MIN_CHARS", "100000"))
+
+# ─── Embedding ──────────────────────────────────────────────────
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", "4"))
+
+# ─── Caches ─────────────────────────────────────────────────────
+CACHE_DIR = os.getenv("AGENT_CACHE_DIR", ".cache")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+CHROMA_TTL_SECONDS = int(os.getenv("CHROMA_TTL_SECONDS", str(7 * 24 * 3600)))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "3600"))
+PAGE_CACHE_MAX_AGE = int(os.getenv("PAGE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# ─── Relevance Scoring ──────────────────────────────────────────
+SCORING_MAX_WORKERS = int(os.getenv("SCORING_MAX_WORKERS", "4"))
+
+# ─── Pipelined Scrape → Embed ───────────────────────────────────
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "256"))
+PIPELINE_FLUSH_INTERVAL = float(os.getenv("PIPELINE_FLUSH_INTERVAL", "0.5"))
+
+# ─── Scraping Limits ────────────────────────────────────────────
+SCRAPE_MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+CRAWL_MAX_CHARS = int(os.getenv("CRAWL_MAX_CHARS", "20000"))
+
+# ─── Search ─────────────────────────────────────────────────────
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "3"))
+
+# ─── Gemini Rate Limiting ───────────────────────────────────────
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))
+QUERY_PLAN_TTL = int(os.getenv("QUERY_PLAN_TTL", str(24 * 3600)))
+
+# ─── Answer Cache ───────────────────────────────────────────────
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_MAX_AGE = int(os.getenv("ANSWER_CACHE_MAX_AGE", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+
+# ─── Batch Research ─────────────────────────────────────────────
+BATCH_MAX_CONCURRENT_ANSWERS = int(os.getenv("BATCH_MAX_CONCURRENT_ANSWERS", "3"))
+
+# ─── Instrumentation ────────────────────────────────────────────
+INSTRUMENTATION_EXPORT_PATH = os.getenv("INSTRUMENTATION_EXPORT_PATH", "")
+INSTRUMENTATION_OTEL = os.getenv("INSTRUMENTATION_OTEL", "false").lower() in ("1", "true", "yes")
+
+# ─── Near-Duplicate Detection ───────────────────────────────────
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() in ("1", "true", "yes")
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "4"))
+DEDUP_AGAINST_STORE = os.getenv("DEDUP_AGAINST_STORE", "false").lower() in ("1", "true", "yes")
+
+# ─── Context Assembly ───────────────────────────────────────────
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "12"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+CONTEXT_MAX_CHUNKS_PER_SOURCE = int(os.getenv("CONTEXT_MAX_CHUNKS_PER_SOURCE", "3"))
+CONTEXT_MAX_SIMILARITY = float(os.getenv("CONTEXT_MAX_SIMILARITY", "0.85"))
+
+# ─── Retrieval Store ────────────────────────────────────────────
+# "memory" retrieves from an in-process index of the run's chunks; "chroma" from the on-disk store
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "memory")
+VECTOR_STORE_WRITE_BEHIND = os.getenv("VECTOR_STORE_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
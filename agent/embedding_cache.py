@@ -0,0 +1,111 @@
+# agent/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+from .config import CACHE_DIR, EMBEDDING_CACHE_MAX_ENTRIES
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class EmbeddingCache:
+    def __init__(self, path: Optional[str] = None, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        """
+        Persistent SQLite cache of embedding vectors keyed by a hash of the
+        model name and chunk text, with least-recently-used eviction.
+        """
+        self.path = path or os.path.join(CACHE_DIR, "embeddings.sqlite")
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+
+    @staticmethod
+    def make_key(text: str, model_name: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: Sequence[str], model_name: str) -> List[Optional[List[float]]]:
+        """
+        Look up vectors for texts. Returns a list aligned with `texts`, None on a miss.
+        """
+        keys = [self.make_key(text, model_name) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique_keys = list(set(keys))
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+
+            results = [found.get(key) for key in keys]
+            hits = sum(1 for vector in results if vector is not None)
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]], model_name: str) -> None:
+        """
+        Store vectors for texts, then evict least-recently-used entries over the size bound.
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(text, model_name), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors) if vector is not None
+        ]
+        if not rows:
+            return
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (overflow,)
+            )
+            logger.info(f"[EmbeddingCache] Evicted {overflow} entries")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,252 @@
+# agent/html_extractor.py
+
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urldefrag
+import logging
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; html.parser is always available
+    etree = None
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BACKENDS = ("lxml", "html.parser")
+DEFAULT_BACKEND = "lxml" if etree is not None else "html.parser"
+
+# Main-content blocks whose text is kept
+CONTENT_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "dt", "dd",
+    "td", "th", "caption", "pre", "blockquote", "figcaption",
+}
+# Layout blocks: their text belongs to no content block, but they separate blocks
+BLOCK_TAGS = {
+    "div", "section", "article", "main", "ul", "ol", "dl", "table", "tr",
+    "figure", "details", "fieldset", "address", "hgroup", "dialog",
+}
+# Start tags that implicitly close an open <p> (the HTML spec's list; lxml applies it, html.parser doesn't)
+CLOSES_P = BLOCK_TAGS | {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "figcaption", "li", "dd", "dt",
+    "nav", "header", "footer", "aside", "form", "menu", "hr",
+}
+# Page chrome: text is dropped, but links are kept for crawling
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "menu"}
+# Never rendered as text: contents are dropped entirely
+INVISIBLE_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "object", "head", "title"}
+
+class _ExtractionHandler:
+    """
+    Event handler shared by both parser backends. Collects main-content text
+    blocks and <a href> links (with anchor text and the enclosing block's
+    text as context) in a single pass over the document.
+    """
+    def __init__(self, base_url: str = "", want_links: bool = True,
+                 max_chars: Optional[int] = None, context_chars: int = 200):
+        self.base_url = base_url
+        self.want_links = want_links
+        self.max_chars = max_chars
+        self.context_chars = context_chars
+        self.blocks: List[str] = []
+        self.links: Dict[str, Dict[str, str]] = {}
+        self.chars = 0
+        self.done = False
+        self._invisible = 0
+        self._boilerplate = 0
+        self._block: Optional[List[str]] = None
+        self._open: List[str] = []  # content and layout tags currently open, innermost last
+        self._block_links: List[Dict[str, str]] = []
+        self._link: Optional[Dict] = None
+
+    # ─── Parser Events ──────────────────────────────────────────
+    def start(self, tag: str, attrs: Dict[str, Optional[str]]) -> None:
+        tag = tag.lower()
+        if tag in INVISIBLE_TAGS:
+            self._invisible += 1
+            return
+        if self._invisible:
+            return
+        if tag in CLOSES_P and "p" in self._open:
+            self._close("p")
+        if tag in BOILERPLATE_TAGS:
+            self._boilerplate += 1
+        elif tag in CONTENT_TAGS and not self._boilerplate:
+            self._flush_block()
+            self._open.append(tag)
+            self._block = []
+        elif tag in BLOCK_TAGS and not self._boilerplate:
+            self._flush_block()
+            self._open.append(tag)
+            self._reopen_block()
+        elif tag == "br" and self._block is not None:
+            self._block.append(" ")
+
+        if tag == "a" and self.want_links and attrs.get("href"):
+            self._link = {"href": attrs["href"], "anchor": [], "title": attrs.get("title") or ""}
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if tag in INVISIBLE_TAGS:
+            self._invisible = max(0, self._invisible - 1)
+            return
+        if self._invisible:
+            return
+        if tag == "a" and self._link is not None:
+            self._finish_link()
+        if tag in BOILERPLATE_TAGS:
+            self._boilerplate = max(0, self._boilerplate - 1)
+        elif tag in self._open:
+            self._close(tag)
+
+    def data(self, text: str) -> None:
+        if self._invisible:
+            return
+        if self._link is not None:
+            self._link["anchor"].append(text)
+        if self._block is not None and not self._boilerplate:
+            self._block.append(text)
+
+    def close(self) -> Dict:
+        if self._link is not None:
+            self._finish_link()
+        self._flush_block()
+        return {"text": "\n".join(self.blocks), "links": list(self.links.values())}
+
+    # ─── Helpers ────────────────────────────────────────────────
+    def _close(self, tag: str) -> None:
+        # Close the innermost open `tag` and any unclosed tags inside it
+        self._flush_block()
+        del self._open[len(self._open) - 1 - self._open[::-1].index(tag):]
+        self._reopen_block()
+
+    def _reopen_block(self) -> None:
+        # Text that follows inside a still-open content tag, e.g. <li><p>..</p>tail</li>, starts a new block
+        self._block = [] if any(tag in CONTENT_TAGS for tag in self._open) else None
+
+    def _finish_link(self) -> None:
+        link, self._link = self._link, None
+        url, _ = urldefrag(urljoin(self.base_url, link["href"].strip()))
+        if not url.startswith(("http://", "https://")):
+            return
+
+        anchor = " ".join("".join(link["anchor"]).split()) or link["title"]
+        entry = self.links.setdefault(url, {"url": url, "anchor": "", "context": ""})
+        if anchor and anchor not in entry["anchor"]:
+            entry["anchor"] = f"{entry['anchor']} {anchor}".strip()
+        if self._block is not None and not entry["context"]:
+            self._block_links.append(entry)
+
+    def _flush_block(self) -> None:
+        if self._block is None:
+            return
+        text = " ".join("".join(self._block).split())
+        self._block = None
+
+        for entry in self._block_links:
+            entry["context"] = text[:self.context_chars]
+        self._block_links = []
+
+        if text:
+            self.blocks.append(text)
+            self.chars += len(text) + 1
+            if self.max_chars and self.chars >= self.max_chars:
+                self.done = True
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, handler: _ExtractionHandler):
+        super().__init__(convert_charrefs=True)
+        self.handler = handler
+
+    def handle_starttag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handler.start(tag, dict(attrs))
+        self.handler.end(tag)
+
+    def handle_endtag(self, tag):
+        self.handler.end(tag)
+
+    def handle_data(self, data):
+        self.handler.data(data)
+
+class _LxmlTarget:
+    def __init__(self, handler: _ExtractionHandler):
+        self.handler = handler
+
+    def start(self, tag, attrib):
+        self.handler.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.handler.end(tag)
+
+    def data(self, data):
+        self.handler.data(data)
+
+    def close(self):
+        return None
+
+class HTMLExtractor:
+    def __init__(self, base_url: str = "", want_links: bool = True,
+                 max_chars: Optional[int] = None, backend: Optional[str] = None):
+        """
+        Incremental, single-pass extractor of main-content text and links.
+
+        Args:
+            base_url (str): Used to resolve relative links.
+            want_links (bool): Collect <a href> links with anchor/context text.
+            max_chars (int): Stop collecting once this much text is extracted;
+                `done` turns True so callers can stop feeding.
+            backend (str): "lxml" (fast, if installed) or "html.parser".
+        """
+        backend = backend or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown HTML backend: {backend}")
+        if backend == "lxml" and etree is None:
+            logger.warning("lxml is not installed; falling back to html.parser")
+            backend = "html.parser"
+
+        self.backend = backend
+        self.handler = _ExtractionHandler(base_url, want_links=want_links, max_chars=max_chars)
+        if backend == "lxml":
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self.handler), recover=True)
+        else:
+            self._parser = _StdlibParser(self.handler)
+
+    @property
+    def done(self) -> bool:
+        return self.handler.done
+
+    def feed(self, html: str) -> None:
+        if not self.done:
+            self._parser.feed(html)
+
+    def close(self) -> Dict:
+        """
+        Finish parsing and return {'text': str, 'links': List[Dict]}.
+        """
+        try:
+            self._parser.close()
+        except Exception as e:
+            # lxml raises on documents it could not parse at all
+            logger.debug(f"[HTMLExtractor] Parser close failed: {e}")
+        result = self.handler.close()
+        if self.handler.max_chars:
+            result["text"] = result["text"][:self.handler.max_chars]
+        return result
+
+def extract_page(html: str, base_url: str = "", want_links: bool = True,
+                 max_chars: Optional[int] = None, backend: Optional[str] = None) -> Dict:
+    """
+    Extract main-content text (paragraphs, headings, lists, tables) and links
+    from an HTML document in one pass, skipping nav/header/footer boilerplate.
+
+    Returns:
+        Dict: 'text' (blocks joined by newlines) and 'links' (dicts with
+        'url', 'anchor' and 'context').
+    """
+    extractor = HTMLExtractor(base_url, want_links=want_links, max_chars=max_chars, backend=backend)
+    extractor.feed(html)
+    return extractor.close()
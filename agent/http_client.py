@@ -0,0 +1,91 @@
+# agent/http_client.py
+
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
+from .config import HTTP_POOL_SIZE, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR, HTTP_TIMEOUT
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# urllib3 advertises "br" only when a brotli decoder is importable
+DEFAULT_HEADERS = {
+    "Accept-Encoding": ACCEPT_ENCODING,
+    "Connection": "keep-alive",
+}
+
+class HTTPClient:
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_retries: int = HTTP_MAX_RETRIES,
+                 backoff_factor: float = HTTP_BACKOFF_FACTOR, timeout: float = HTTP_TIMEOUT):
+        """
+        Shared HTTP layer with one pooled keep-alive session per host.
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session_for(self, url: str) -> requests.Session:
+        """
+        Return the pooled session for the URL's host, creating it on first use.
+        """
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc.lower()}"
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._build_session()
+                    self._sessions[key] = session
+        return session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the host's pooled session. Accepts the same kwargs as `requests.get`.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session_for(url).get(url, **kwargs)
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+_default_client: Optional[HTTPClient] = None
+_default_lock = threading.Lock()
+
+def get_default_client() -> HTTPClient:
+    """
+    Process-wide client shared by tools that were not given one explicitly.
+    """
+    global _default_client
+    if _default_client is None:
+        with _default_lock:
+            if _default_client is None:
+                _default_client = HTTPClient()
+    return _default_client
@@ -0,0 +1,164 @@
+# agent/instrumentation.py
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from .config import INSTRUMENTATION_EXPORT_PATH, INSTRUMENTATION_OTEL
+import logging
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional; spans are still recorded locally
+    otel_trace = None
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+_otel_tracer = otel_trace.get_tracer("web_research_agent") if otel_trace is not None and INSTRUMENTATION_OTEL else None
+
+class Trace:
+    def __init__(self, name: str):
+        """
+        Spans and counters recorded for one pipeline run. Thread-safe, so
+        worker threads that inherit the run's context can record into it.
+        """
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def add_span(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self) -> Dict[str, Dict]:
+        """
+        Per-stage totals: {'stages': {name: {'count', 'total', 'max'}}, 'counters': {...}}.
+        Totals add up concurrent spans, so they can exceed wall-clock time.
+        """
+        stages: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for record in self.spans:
+                stage = stages.setdefault(record["name"], {"count": 0, "total": 0.0, "max": 0.0})
+                stage["count"] += 1
+                stage["total"] += record["duration"]
+                stage["max"] = max(stage["max"], record["duration"])
+            return {"stages": stages, "counters": dict(self.counters)}
+
+    def export_jsonl(self, path: str) -> None:
+        """
+        Append one JSON line per span plus a final line with the counters.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._lock:
+            lines = [json.dumps({"trace_id": self.trace_id, "trace": self.name, **record}, default=str)
+                     for record in self.spans]
+            lines.append(json.dumps({"trace_id": self.trace_id, "trace": self.name,
+                                     "started": self.started, "counters": dict(self.counters)}))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+@contextmanager
+def start_trace(name: str, export_path: Optional[str] = INSTRUMENTATION_EXPORT_PATH) -> Iterator[Trace]:
+    """
+    Make a new Trace current for the enclosed block (and for worker threads
+    started through `propagate`), exporting it to `export_path` on exit.
+    """
+    trace = Trace(name)
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        if export_path:
+            try:
+                trace.export_jsonl(export_path)
+            except OSError as e:
+                logger.warning(f"[Instrumentation] Failed to export trace: {e}")
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Time the enclosed block as a span of the current trace.
+
+    Yields the span record; callers can attach results such as status codes
+    or byte counts to record['attributes'], and read record['duration'] after
+    the block. Outside a trace (and without OpenTelemetry) this only times.
+    """
+    trace = _current_trace.get()
+    record = {"span_id": next(_span_ids), "parent_id": _current_span.get(), "name": name,
+              "thread": threading.current_thread().name, "attributes": attributes}
+    token = _current_span.set(record["span_id"])
+
+    with ExitStack() as stack:
+        otel_span = stack.enter_context(_otel_tracer.start_as_current_span(name)) if _otel_tracer else None
+        record["start"] = time.time()
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            record["duration"] = time.perf_counter() - started
+            _current_span.reset(token)
+            if otel_span is not None:
+                otel_span.set_attributes({key: value for key, value in attributes.items()
+                                          if isinstance(value, (str, bool, int, float))})
+            if trace is not None:
+                trace.add_span(record)
+
+def record_span(name: str, duration: float, **attributes: Any) -> None:
+    """
+    Record an already-measured duration (e.g. parse time accumulated across
+    the chunks of a streamed download) as a span of the current trace.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.add_span({"span_id": next(_span_ids), "parent_id": _current_span.get(), "name": name,
+                    "thread": threading.current_thread().name, "attributes": attributes,
+                    "start": time.time() - duration, "duration": duration})
+
+def incr(name: str, value: float = 1) -> None:
+    """
+    Add to a counter of the current trace (no-op outside a trace).
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.incr(name, value)
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Wrap `fn` to run in a copy of the caller's context, so spans and counters
+    recorded in worker threads land in the caller's trace. A fresh copy is
+    entered per call, so the wrapper is safe to use from many threads at once.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
@@ -0,0 +1,180 @@
+# agent/page_cache.py
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+from .config import CACHE_DIR, PAGE_CACHE_MAX_BYTES, PAGE_CACHE_TTL, PAGE_CACHE_MAX_AGE
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def freshness_lifetime(headers: Mapping[str, str], default_ttl: int) -> Optional[float]:
+    """
+    Seconds a response may be served without revalidation, from Cache-Control
+    or Expires. Returns None when the response must not be stored.
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+
+    match = re.search(r"max-age\s*=\s*(\d+)", cache_control)
+    if match:
+        return float(match.group(1))
+
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0.0
+    return float(default_ttl)
+
+class PageCache:
+    def __init__(self, path: Optional[str] = None, max_bytes: int = PAGE_CACHE_MAX_BYTES,
+                 default_ttl: int = PAGE_CACHE_TTL, max_age: int = PAGE_CACHE_MAX_AGE):
+        """
+        Persistent SQLite cache of extracted page text/links plus the HTTP
+        validators (ETag, Last-Modified) needed to revalidate stale entries.
+
+        Entries are fresh for the server's max-age (or `default_ttl`), kept for
+        revalidation until `max_age` seconds old, and evicted least-recently-used
+        once the cache exceeds `max_bytes`.
+        """
+        self.path = path or os.path.join(CACHE_DIR, "pages.sqlite")
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, content TEXT NOT NULL, links TEXT, truncated INTEGER NOT NULL, "
+                "max_chars INTEGER, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_access ON pages(last_access)")
+
+    def get(self, url: str, want_links: bool = False, max_chars: Optional[int] = None) -> Optional[Dict]:
+        """
+        Return the cached entry if it can answer this request, fresh or stale.
+        The entry's 'fresh' flag says whether it needs revalidation first.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, links, truncated, max_chars, etag, last_modified, fetched_at, expires_at "
+                "FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+        content, links, truncated, stored_chars, etag, last_modified, fetched_at, expires_at = row
+
+        # A truncated extraction only covers requests for at most as much text
+        if want_links and links is None:
+            return None
+        if truncated and (not max_chars or max_chars > (stored_chars or 0)):
+            return None
+        if time.time() - fetched_at > self.max_age:
+            return None
+
+        return {
+            "content": content,
+            "links": json.loads(links) if links is not None else [],
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": time.time() < expires_at,
+        }
+
+    def validators(self, entry: Dict) -> Dict[str, str]:
+        """
+        Conditional request headers for a stale entry.
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_hit(self, url: str) -> None:
+        with self._lock, self._conn:
+            self.hits += 1
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+
+    def refresh(self, url: str, headers: Mapping[str, str]) -> None:
+        """
+        Extend a stale entry's freshness after a 304 Not Modified.
+        """
+        lifetime = freshness_lifetime(headers, self.default_ttl) or 0.0
+        now = time.time()
+        with self._lock, self._conn:
+            self.revalidated += 1
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ?, expires_at = ?, last_access = ? WHERE url = ?",
+                (now, now + lifetime, now, url)
+            )
+
+    def put(self, url: str, page: Dict, headers: Mapping[str, str], truncated: bool,
+            max_chars: Optional[int] = None, want_links: bool = False) -> None:
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        with self._lock:
+            self.misses += 1
+        if lifetime is None:
+            return
+
+        now = time.time()
+        content = page["content"]
+        links = json.dumps(page["links"]) if want_links else None
+        size = len(content) + len(links or "")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, content, links, truncated, max_chars, etag, "
+                "last_modified, fetched_at, expires_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, content, links, int(truncated), max_chars, headers.get("ETag"),
+                 headers.get("Last-Modified"), now, now + lifetime, size, now)
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM pages WHERE fetched_at < ?", (now - self.max_age,))
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        freed = 0
+        stale_urls = []
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY last_access ASC"):
+            stale_urls.append((url,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM pages WHERE url = ?", stale_urls)
+        logger.info(f"[PageCache] Evicted {len(stale_urls)} pages")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            return {"hits": self.hits, "misses": self.misses,
+                    "revalidated": self.revalidated, "entries": count}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,27 +1,47 @@
 # agent/query_analyzer.py
 
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 import google.generativeai as genai
 from .config import GEMINI_API_KEY
+from .instrumentation import incr, span
+from .rate_limiter import gemini_limiter
+from .ttl_cache import TTLCache
 import logging
-import time
+import re
 import ast
 
 # ─── Logging Config ─────────────────────────────────────────────
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+def normalize_query(query: str) -> str:
+    """
+    Cache key form of a query: lowercase, punctuation dropped, whitespace collapsed.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
 class QueryAnalyzer:
-    def __init__(self):
+    def __init__(self, cache: Optional[TTLCache] = None):
         self.model = genai.GenerativeModel("gemini-2.0-pro-exp-02-05")
+        self.cache = cache
 
     def analyze_query(self, query: str) -> Dict[str, Union[str, List[List[str]]]]:
         """
         Uses Gemini to extract structured web search intent and keyword clusters.
+        Successful plans are cached by normalized query text when a cache is set.
 
         Returns:
             Dict with Intent, Info Types, Time Range, KeywordChunks
         """
+        cache_key = normalize_query(query)
+        if self.cache is not None and cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                incr("cache.query_plan.hit")
+                logger.info("Using cached query plan")
+                return cached
+            incr("cache.query_plan.miss")
+
         prompt = f"""
         You are a web research planning assistant. Break down the user query into:
 
@@ -42,10 +62,12 @@ class QueryAnalyzer:
         """
 
         try:
-            response = self.model.generate_content(prompt)
+            with span("analyze"):
+                gemini_limiter.acquire()
+                incr("api.gemini")
+                response = self.model.generate_content(prompt)
             logger.info("Gemini query analysis succeeded")
-            time.sleep(5)
-            return self._parse_response(response.text.strip(), query)
+            plan = self._parse_response(response.text.strip(), query)
 
         except Exception as e:
             logger.error(f"Query analysis failed: {e}")
@@ -56,6 +78,13 @@ class QueryAnalyzer:
                 "KeywordChunks": [[query]]
             }
 
+        if self.cache is not None and cache_key and plan["KeywordChunks"] != [[query]]:
+            try:
+                self.cache.set(cache_key, plan)
+            except Exception as e:
+                logger.warning(f"Failed to cache query plan: {e}")
+        return plan
+
     def _parse_response(self, response_text: str, fallback_query: str) -> Dict[str, Union[str, List[List[str]]]]:
         result = {
             "Intent": "unknown",
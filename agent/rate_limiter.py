@@ -0,0 +1,56 @@
+# agent/rate_limiter.py
+
+import threading
+import time
+from typing import Optional
+from .config import GEMINI_REQUESTS_PER_MINUTE, GEMINI_BURST
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class TokenBucket:
+    def __init__(self, rate_per_minute: float, capacity: int = 1):
+        """
+        Thread-safe token bucket: refills at `rate_per_minute`, holds at most
+        `capacity` tokens, so short bursts go through immediately and sustained
+        traffic is smoothed to the configured rate.
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: int = 1, timeout: Optional[float] = None) -> bool:
+        """
+        Block until `tokens` are available. Returns False if `timeout` expires first.
+        """
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            logger.debug(f"[RateLimiter] Waiting {wait:.2f}s for a token")
+            time.sleep(wait)
+
+# Shared by every Gemini caller in the process (analysis, scoring, synthesis)
+gemini_limiter = TokenBucket(GEMINI_REQUESTS_PER_MINUTE, capacity=GEMINI_BURST)
@@ -1,21 +1,173 @@
 # agent/scraper_tool.py
 
+import codecs
+import re
+import time
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Optional
+from .config import SCRAPE_MAX_BYTES
+from .http_client import HTTPClient, get_default_client
+from .html_extractor import HTMLExtractor
+from .instrumentation import incr, record_span, span
+from .page_cache import PageCache
 import logging
 
 # ─── Logging Config ─────────────────────────────────────────────
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+BINARY_SIGNATURES = (b"%PDF", b"PK\x03\x04", b"\x89PNG", b"GIF8", b"\xff\xd8\xff")
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9._:-]+)""", re.IGNORECASE)
+
+def _charset_from_content_type(content_type: str) -> Optional[str]:
+    match = re.search(r"charset\s*=\s*[\"']?([A-Za-z0-9._:-]+)", content_type, re.IGNORECASE)
+    return match.group(1) if match else None
+
+def detect_encoding(content_type: str, head: bytes) -> str:
+    """
+    Pick the document encoding once: HTTP charset, then BOM, then <meta> in the
+    first bytes, else UTF-8. Unknown names fall back to UTF-8.
+    """
+    candidates = [_charset_from_content_type(content_type)]
+    if head.startswith(codecs.BOM_UTF8):
+        candidates.append("utf-8-sig")
+    elif head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append("utf-16")
+    match = META_CHARSET.search(head[:4096])
+    candidates.append(match.group(1).decode("ascii") if match else None)
+
+    for name in candidates:
+        if not name:
+            continue
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            continue
+    return "utf-8"
+
 class WebScraperTool:
-    def __init__(self, user_agent: str = "Mozilla/5.0"):
+    def __init__(self, user_agent: str = "Mozilla/5.0", http_client: Optional[HTTPClient] = None,
+                 html_backend: Optional[str] = None, max_bytes: int = SCRAPE_MAX_BYTES,
+                 page_cache: Optional[PageCache] = None):
         self.headers = {"User-Agent": user_agent}
+        self.http_client = http_client or get_default_client()
+        self.html_backend = html_backend
+        self.max_bytes = max_bytes
+        self.page_cache = page_cache
+
+    def fetch_page(self, url: str, want_links: bool = True, max_chars: Optional[int] = None) -> Dict:
+        """
+        Streams a page and extracts its main text and links in one incremental
+        parse. Reading stops at `max_bytes`, as soon as `max_chars` of text has
+        been extracted, or immediately for non-HTML responses (PDFs, images...).
+
+        With a PageCache, fresh entries are served without any request and
+        stale ones are revalidated with If-None-Match / If-Modified-Since.
+        Raises `requests.exceptions.RequestException` on HTTP failures.
+
+        Returns:
+            Dict: 'url', 'content' and 'links' (dicts with 'url', 'anchor', 'context').
+        """
+        headers = dict(self.headers)
+        entry = None
+        if self.page_cache is not None:
+            entry = self.page_cache.get(url, want_links=want_links, max_chars=max_chars)
+            if entry is not None and entry["fresh"]:
+                incr("cache.page.hit")
+                self.page_cache.record_hit(url)
+                return self._cached_page(url, entry, max_chars)
+            if entry is not None:
+                headers.update(self.page_cache.validators(entry))
+
+        with span("fetch", url=url, conditional=entry is not None) as record:
+            incr("http.fetch")
+            response = self.http_client.get(url, headers=headers, stream=True)
+            record["attributes"]["status"] = response.status_code
+            try:
+                if entry is not None and response.status_code == 304:
+                    incr("cache.page.revalidated")
+                    self.page_cache.refresh(url, response.headers)
+                    return self._cached_page(url, entry, max_chars)
+
+                response.raise_for_status()
+                page, truncated, received = self._read_page(url, response, want_links, max_chars)
+                record["attributes"]["bytes"] = received
+            finally:
+                response.close()
+
+        if self.page_cache is not None:
+            incr("cache.page.miss")
+            try:
+                self.page_cache.put(url, page, response.headers, truncated,
+                                    max_chars=max_chars, want_links=want_links)
+            except Exception as e:
+                logger.warning(f"Failed to cache {url}: {e}")
+
+        if not page["content"]:
+            logger.warning(f"No main content found at: {url}")
+        return page
+
+    def _cached_page(self, url: str, entry: Dict, max_chars: Optional[int]) -> Dict:
+        content = entry["content"][:max_chars] if max_chars else entry["content"]
+        return {"url": url, "content": content, "links": entry["links"]}
+
+    def _read_page(self, url: str, response, want_links: bool, max_chars: Optional[int]):
+        """
+        Incrementally decode and parse a streamed response.
+
+        Returns:
+            Tuple[Dict, bool, int]: the page, whether reading stopped early,
+            and the number of bytes read.
+        """
+        empty = {"url": url, "content": "", "links": []}
+        content_type = response.headers.get("Content-Type", "")
+        mime_type = content_type.split(";")[0].strip().lower()
+        if mime_type and mime_type not in HTML_CONTENT_TYPES:
+            logger.info(f"Skipping non-HTML content ({mime_type}) at: {url}")
+            return empty, False, 0
+
+        extractor = HTMLExtractor(url, want_links=want_links, max_chars=max_chars,
+                                  backend=self.html_backend)
+        decoder = None
+        received = 0
+        truncated = False
+        parse_time = 0.0
+
+        for chunk in response.iter_content(chunk_size=16384):
+            if not chunk:
+                continue
+            if decoder is None:
+                if chunk.startswith(BINARY_SIGNATURES):
+                    logger.info(f"Skipping binary content at: {url}")
+                    return empty, False, len(chunk)
+                encoding = detect_encoding(content_type, chunk)
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+            chunk = chunk[:self.max_bytes - received]
+            received += len(chunk)
+            started = time.perf_counter()
+            extractor.feed(decoder.decode(chunk))
+            parse_time += time.perf_counter() - started
+            if extractor.done:
+                truncated = True
+                break
+            if received >= self.max_bytes:
+                logger.info(f"Stopped reading {url} at {self.max_bytes} bytes")
+                truncated = True
+                break
+
+        started = time.perf_counter()
+        if decoder is not None:
+            extractor.feed(decoder.decode(b"", final=True))
+        page = extractor.close()
+        record_span("parse", parse_time + time.perf_counter() - started, url=url, backend=extractor.backend)
+        incr("http.bytes", received)
+        return {"url": url, "content": page["text"], "links": page["links"]}, truncated, received
 
     def scrape(self, url: str) -> Dict[str, str]:
         """
-        Scrapes clean text content (from <p> tags) from a webpage.
+        Scrapes clean main-content text (paragraphs, headings, lists, tables) from a webpage.
 
         Args:
             url (str): URL of the page to scrape
@@ -24,20 +176,9 @@ class WebScraperTool:
             Dict[str, str]: Dictionary with 'url' and clipped 'content'
         """
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            paragraphs = soup.find_all("p")
-            if not paragraphs:
-                logger.warning(f"No <p> tags found at: {url}")
-
-            clean_text = "\n".join(p.get_text().strip() for p in paragraphs if p.get_text())
-
-            return {
-                "url": url,
-                "content": clean_text[:5000]  # Limit content to avoid LLM overflow
-            }
+            # Limit content to avoid LLM overflow
+            page = self.fetch_page(url, want_links=False, max_chars=5000)
+            return {"url": url, "content": page["content"]}
 
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to scrape {url}: {e}")
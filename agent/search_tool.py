@@ -1,24 +1,91 @@
 # agent/search_tool.py
 
+import json
 import requests
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Optional
 from urllib.parse import urlencode
 import logging
-from .config import GOOGLE_CSE_API_KEY, GOOGLE_CSE_CX
+from .config import GOOGLE_CSE_API_KEY, GOOGLE_CSE_CX, SEARCH_MAX_WORKERS
+from .http_client import HTTPClient, get_default_client
+from .instrumentation import incr, propagate, span
+from .ttl_cache import TTLCache
 
 # ─── Logging Config ─────────────────────────────────────────────
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 class GoogleCSESearchTool:
-    def __init__(self, api_key: str, cse_id: str):
+    def __init__(self, api_key: str, cse_id: str, http_client: Optional[HTTPClient] = None,
+                 cache: Optional[TTLCache] = None, max_workers: int = SEARCH_MAX_WORKERS):
         self.api_key = api_key
         self.cse_id = cse_id
+        self.http_client = http_client or get_default_client()
+        self.cache = cache
+        self.max_workers = max_workers
         self.base_url = "https://www.googleapis.com/customsearch/v1"
 
+    def search_page(self, query: str, page_num: int = 0, num_results: int = 10) -> Optional[List[Dict[str, str]]]:
+        """
+        Fetch one page of results (0-based `page_num`), from the cache when possible.
+
+        Returns:
+            List[Dict[str, str]] | None: The page's results (possibly empty), or
+            None if the request failed.
+        """
+        cache_key = json.dumps([self.cse_id, query, page_num, num_results])
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                incr("cache.search.hit")
+                return cached
+            incr("cache.search.miss")
+
+        params = {
+            "q": query,
+            "cx": self.cse_id,
+            "key": self.api_key,
+            "num": num_results,
+            "start": page_num * num_results + 1
+        }
+
+        try:
+            with span("search", query=query, page=page_num + 1) as record:
+                incr("api.cse")
+                response = self.http_client.get(self.base_url, params=params)
+                record["attributes"]["status"] = response.status_code
+                response.raise_for_status()
+                data = response.json()
+
+            if "items" not in data:
+                logger.warning(f"No results found on page {page_num + 1} for query: {query}")
+
+            results = [{
+                "title": item.get("title"),
+                "link": item.get("link"),
+                "snippet": item.get("snippet", ""),
+                "page": page_num + 1
+            } for item in data.get("items", [])]
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Search failed on page {page_num + 1}: {e}")
+            return None
+
+        except Exception as e:
+            logger.exception(f"Unexpected error during search on page {page_num + 1}")
+            return None
+
+        if self.cache is not None:
+            try:
+                self.cache.set(cache_key, results)
+            except Exception as e:
+                logger.warning(f"Failed to cache search results: {e}")
+        return results
+
     def search(self, query: str, num_results: int = 10, max_pages: int = 2) -> List[Dict[str, str]]:
         """
         Perform a web search using Google CSE and fetch results across multiple pages.
+        Pages are requested concurrently.
 
         Args:
             query (str): Search query.
@@ -28,41 +95,55 @@ class GoogleCSESearchTool:
         Returns:
             List[Dict[str, str]]: Each dict contains 'title', 'link', 'snippet', and 'page'.
         """
-        results = []
+        if max_pages <= 0:
+            return []
 
-        for page_num in range(max_pages):
-            start = page_num * num_results + 1
-            params = {
-                "q": query,
-                "cx": self.cse_id,
-                "key": self.api_key,
-                "num": num_results,
-                "start": start
-            }
-
-            try:
-                response = requests.get(self.base_url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, max_pages))) as executor:
+            pages = list(executor.map(propagate(lambda page_num: self.search_page(query, page_num, num_results)),
+                                      range(max_pages)))
 
-                if "items" not in data:
-                    logger.warning(f"No results found on page {page_num + 1} for query: {query}")
-                    continue
+        results = []
+        for page in pages:
+            # As before, a failed page ends the result list
+            if page is None:
+                break
+            results.extend(page)
+        return results
 
-                for item in data["items"]:
-                    results.append({
-                        "title": item.get("title"),
-                        "link": item.get("link"),
-                        "snippet": item.get("snippet", ""),
-                        "page": page_num + 1
-                    })
+def iter_search_results(search_tool, queries: Iterable[str], max_pages: int = 2,
+                        num_results: int = 10) -> Iterator[Dict[str, str]]:
+    """
+    Lazily yield unique results (by link) for several queries, page by page:
+    page 1 of every query before page 2 of any, and each further page is only
+    requested once the consumer has used up the previous ones. A query stops
+    paging when a page comes back short or fails.
 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Search failed on page {page_num + 1}: {e}")
-                break
+    Args:
+        search_tool: Anything with `search_page(query, page_num, num_results)`,
+            e.g. a GoogleCSESearchTool or a batch-wide memo wrapping one.
+    """
+    seen = set()
+    active = list(queries)
 
+    for page_num in range(max_pages):
+        still_active = []
+        for query in active:
+            try:
+                page_results = search_tool.search_page(query, page_num, num_results)
             except Exception as e:
-                logger.exception(f"Unexpected error during search on page {page_num + 1}")
-                break
+                logger.error(f"Search failed for '{query}': {e}")
+                continue
+            if page_results is None:
+                continue
 
-        return results
+            # A short page means this query has no further results
+            if len(page_results) >= num_results:
+                still_active.append(query)
+
+            for result in page_results:
+                link = result.get("link")
+                if not link or link in seen:
+                    continue
+                seen.add(link)
+                yield result
+        active = still_active
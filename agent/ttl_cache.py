@@ -0,0 +1,76 @@
+# agent/ttl_cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from .config import CACHE_DIR
+import logging
+
+# ─── Logging Config ─────────────────────────────────────────────
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float = 3600, path: Optional[str] = None, max_entries: int = 10000):
+        """
+        Small persistent key/value cache for JSON-serializable values, with a
+        per-entry expiry. Expired and oldest entries are dropped on write.
+        """
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, expires_at)
+            )
+            self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM entries WHERE key NOT IN "
+                "(SELECT key FROM entries ORDER BY created_at DESC LIMIT ?)", (self.max_entries,)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
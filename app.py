@@ -1,19 +1,11 @@
 # rag_app.py
 
+import html
+import time
 import streamlit as st
-import google.generativeai as genai
 from dotenv import load_dotenv
-from langchain.vectorstores import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-
-from agent.config import GOOGLE_CSE_API_KEY, GOOGLE_CSE_CX, GEMINI_API_KEY
-from agent.search_tool import GoogleCSESearchTool
-from agent.scraper_tool import WebScraperTool
-from agent.chunker import TextChunker
-from pipeline.query_handler import analyze_query
-from pipeline.search_and_scrape import search_and_scrape
-from pipeline.embed_and_store import embed_and_store_chunks
-from pipeline.answer_generator import generate_answer
+
+from agent.config import GEMINI_API_KEY
 
 import logging
 logger = logging.getLogger(__name__)
@@ -41,7 +33,6 @@ user_gemini_key = st.sidebar.text_input(
 )
 
 # Override env key if user provides custom one
-genai.configure(api_key=user_gemini_key if user_gemini_key else GEMINI_API_KEY)
 api_key=user_gemini_key if user_gemini_key else GEMINI_API_KEY
 # ─── Sidebar Settings ─────────────────────────────────────────
 st.sidebar.markdown("### ⚙️ Settings")
@@ -49,34 +40,152 @@ st.sidebar.markdown("### ⚙️ Settings")
 num_links = st.sidebar.number_input("🔗 Pages to scrape", min_value=1, max_value=15, value=4, step=1)
 max_crawl_depth = st.sidebar.number_input("🌐 Crawl depth", min_value=1, max_value=3, value=2, step=1)
 max_crawl_pages = st.sidebar.number_input("📄 Pages per homepage", min_value=1, max_value=3, value=2, step=1)
+store_namespace = st.sidebar.selectbox("🗂️ Vector store namespace", ["Shared", "Per query"])
+restrict_to_run = st.sidebar.checkbox("🎯 Retrieve only from this run's sources", value=True)
+store_backend = st.sidebar.selectbox("🧮 Retrieval index", ["In-memory", "Chroma (on disk)"],
+                                     help="In-memory retrieval still saves chunks to Chroma in the background")
+scoring_mode = st.sidebar.selectbox("⚖️ Relevance scoring", ["Gemini (batch)", "Gemini (concurrent)", "Local (no API)"])
+force_refresh = st.sidebar.checkbox("🔄 Force refresh (skip cached answers)", value=False)
+
+# ─── Cached Resources ─────────────────────────────────────────
+@st.cache_resource(show_spinner="Loading research pipeline...")
+def load_pipeline(gemini_api_key):
+    """
+    One ResearchPipeline (search, scraper, chunker, embedding model, caches)
+    per API key for the whole process; each run applies its own key. Imported
+    here so the UI renders before genai, LangChain and scikit-learn are loaded.
+    """
+    from pipeline.research import ResearchPipeline
+    return ResearchPipeline(gemini_api_key=gemini_api_key)
+
+def session_memo():
+    """
+    Per-session memo of stage outputs, so a rerun with the same query only
+    repeats the stages whose settings changed.
+    """
+    if "stage_memo" not in st.session_state:
+        from pipeline.research import StageMemo
+        st.session_state["stage_memo"] = StageMemo()
+    return st.session_state["stage_memo"]
+
+# ─── Rendering ────────────────────────────────────────────────
+SCORING_MODES = {"Gemini (batch)": "batch", "Gemini (concurrent)": "concurrent", "Local (no API)": "local"}
+
+def render_citations(scores, sources):
+    labels = {source["url"]: source["label"] for source in sources}
+
+    with st.expander("📊 Document Relevance Ranking"):
+        for entry in scores:
+            url = entry["url"]
+            score = entry["score"]
+            label = labels.get(url, "-")
+            rating = "High" if score >= 4 else "Medium" if score == 3 else "Low"
+            st.markdown(f"<small>🔹 **{label}** | {rating} Relevance | Score: {score}/5 — <a href='{url}' target='_blank'>{url}</a></small>", unsafe_allow_html=True)
+
+    with st.expander("🔗 Source Citations"):
+        for source in sources:
+            st.markdown(f"<small>🔹 **{source['label']}**: <a href='{source['url']}' target='_blank'>{source['url']}</a></small>", unsafe_allow_html=True)
+            for url in source.get("also_at", []):
+                st.markdown(f"<small>&nbsp;&nbsp;&nbsp;↳ also published at <a href='{url}' target='_blank'>{url}</a></small>", unsafe_allow_html=True)
+
+def render_timings(result):
+    with st.expander("⏱️ Timing breakdown"):
+        if result.reused:
+            st.markdown(f"<small>♻️ Reused from an earlier run this session: {', '.join(result.reused)}</small>",
+                        unsafe_allow_html=True)
+        st.markdown("**Pipeline stages (wall clock)**")
+        for name, seconds in result.timings.items():
+            st.markdown(f"<small>🔹 {name}: {seconds:.2f}s</small>", unsafe_allow_html=True)
+        if result.context:
+            st.markdown(f"<small>🔹 context: {result.context['tokens']} / {result.context['budget']} tokens, "
+                        f"{result.context['chunks']} of {result.context['candidates']} chunks</small>",
+                        unsafe_allow_html=True)
+
+        stages = result.trace.get("stages", {})
+        if stages:
+            st.markdown("**Spans** (totals add up concurrent work)")
+            rows = sorted(stages.items(), key=lambda item: item[1]["total"], reverse=True)
+            st.table([{"span": name, "count": stage["count"], "total (s)": round(stage["total"], 2),
+                       "max (s)": round(stage["max"], 2)} for name, stage in rows])
+
+        counters = result.trace.get("counters", {})
+        if counters:
+            st.markdown("**Counters**")
+            st.markdown("<small>" + " · ".join(f"{name}: {int(value)}" for name, value in sorted(counters.items()))
+                        + "</small>", unsafe_allow_html=True)
+
+def render_source(source):
+    page_info = source.get("page", 1)
+    if source["crawled"]:
+        st.sidebar.markdown(f"<span style='color:green'>🌐 Crawled</span> 🔹 <a href='{source['link']}' target='_blank'>{source['link']}</a>", unsafe_allow_html=True)
+    elif page_info > 1:
+        st.sidebar.markdown(
+            f"<span style='color:orange'>📄 Page {page_info}</span> 🔹 <a href='{source['link']}' target='_blank'>{source['title']}</a>",
+            unsafe_allow_html=True)
+    else:
+        st.sidebar.markdown(f"🔹 [Page {page_info}] [{source['title']}]({source['link']})")
+
+class StreamlitProgress:
+    """
+    Renders ResearchPipeline progress events: sources in the sidebar and the
+    answer streamed into a placeholder as tokens arrive.
+    """
+    def __init__(self):
+        self.answer = ""
+        self.placeholder = None
+        self.deeper_pages = False
+
+    def __call__(self, name, payload):
+        if name == "stage" and payload["name"] == "analyze":
+            st.info("Running full RAG pipeline...")
+            st.sidebar.markdown("### 🔗 Scraped Sources")
+        elif name == "memo_hit":
+            if "answer" not in payload["stages"]:
+                st.info("Reusing this query's scraped sources; re-running retrieval and synthesis...")
+            st.sidebar.markdown("### 🔗 Scraped Sources")
+        elif name == "source":
+            self.deeper_pages = self.deeper_pages or payload.get("page", 1) > 1
+            render_source(payload)
+        elif name == "crawl_failed":
+            st.sidebar.warning(f"Failed to crawl {payload['link']} — {payload['error']}")
+        elif name == "stage" and payload["name"] == "answer":
+            st.markdown("### 🧠 Answer")
+            if self.deeper_pages:
+                st.markdown("<span style='color:orange; font-weight:bold;'>⚠️ Includes content from deeper Google search pages</span>", unsafe_allow_html=True)
+            self.placeholder = st.empty()
+        elif name == "token" and self.placeholder is not None:
+            self.answer += payload["text"]
+            self.placeholder.markdown(self.answer + "▌", unsafe_allow_html=True)
 
 # ─── Main Execution ───────────────────────────────────────────
 if user_query:
     try:
-        st.info("Running full RAG pipeline...")
-
-        # Tool initialization
-        search_tool = GoogleCSESearchTool(api_key=GOOGLE_CSE_API_KEY, cse_id=GOOGLE_CSE_CX)
-        scraper = WebScraperTool()
-        chunker = TextChunker()
-        embedding_model = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004",
-            google_api_key=api_key
+        pipeline = load_pipeline(api_key).with_settings(
+            num_links=num_links, max_crawl_depth=max_crawl_depth, max_crawl_pages=max_crawl_pages,
+            store_namespace="per_query" if store_namespace == "Per query" else "shared",
+            restrict_to_run=restrict_to_run, scoring_mode=SCORING_MODES[scoring_mode],
+            store_backend="memory" if store_backend == "In-memory" else "chroma"
         )
+        progress = StreamlitProgress()
+        result = pipeline.run(user_query, force_refresh=force_refresh, on_event=progress, memo=session_memo())
 
-        # RAG steps
-        keyword_chunks = analyze_query(user_query)
-        scraped_results, all_chunks = search_and_scrape(
-            keyword_chunks, search_tool, scraper, chunker, user_query,
-            max_links=num_links, max_pages=3,
-            max_crawl_depth=max_crawl_depth, max_crawl_pages=max_crawl_pages
-        )
-        chroma_store = embed_and_store_chunks(all_chunks, embedding_model)
-        if chroma_store is None:
-            st.error("Failed to embed and store documents.")
+        if result.error:
+            st.error(result.error)
+            render_timings(result)
+        elif result.cached:
+            age_minutes = int((time.time() - result.created_at) // 60)
+            st.markdown("### 🧠 Answer")
+            st.markdown(
+                f"<span style='color:gray'>♻️ Cached answer from {age_minutes} min ago for a similar question: "
+                f"<i>{html.escape(result.cached_query)}</i> (similarity {result.similarity:.2f})</span>",
+                unsafe_allow_html=True)
+            st.markdown(result.answer, unsafe_allow_html=True)
+            render_citations(result.scores, result.sources)
+            render_timings(result)
         else:
-            retriever = chroma_store.as_retriever(search_kwargs={"k": 4})
-            generate_answer(user_query, retriever, scraped_results)
+            progress.placeholder.markdown(result.answer, unsafe_allow_html=True)
+            render_citations(result.scores, result.sources)
+            render_timings(result)
 
     except Exception as e:
         logger.exception("Pipeline failed.")
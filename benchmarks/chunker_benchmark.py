@@ -0,0 +1,71 @@
+# benchmarks/chunker_benchmark.py
+"""
+Compare TextChunker with LangChain's RecursiveCharacterTextSplitter (the
+previous chunker) on synthetic crawled pages, serially and in a process pool.
+
+    python -m benchmarks.chunker_benchmark --pages 200 --paragraphs 120
+"""
+
+import argparse
+import random
+import time
+from agent.chunker import TextChunker, chunk_many
+
+try:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+except ImportError:
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+WORDS = ("orbit launch payload booster engine price mission satellite market cost data "
+         "network policy model report analysis growth customer plan feature support").split()
+
+def make_page(rng, paragraphs):
+    lines = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            lines.append(" ".join(rng.choice(WORDS).title() for _ in range(3)))
+        if rng.random() < 0.4:
+            # Lists and navigation blocks: many short lines
+            lines.extend(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+                         for _ in range(rng.randint(3, 10)))
+            continue
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 25))).capitalize() + "."
+                     for _ in range(rng.randint(2, 6))]
+        lines.append(" ".join(sentences))
+    return "\n".join(lines)
+
+def timed(label, fn, total_chars):
+    started = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed * 1000:9.1f} ms  {total_chars / elapsed / 1e6:7.1f} MB/s  {chunks:7d} chunks")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=120, help="Paragraphs per page")
+    parser.add_argument("--chunk-size", type=int, default=2048)
+    parser.add_argument("--overlap", type=int, default=512)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = [make_page(rng, args.paragraphs) for _ in range(args.pages)]
+    total_chars = sum(len(page) for page in pages)
+    print(f"{args.pages} pages, {total_chars / 1e6:.1f} M characters\n")
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.overlap,
+                                              separators=["\n\n", "\n", ".", "!", "?", " ", ""])
+    chunker = TextChunker(args.chunk_size, args.overlap)
+    metadata = {"url": "https://example.com"}
+
+    timed("RecursiveCharacterTextSplitter", lambda: sum(len(splitter.split_text(page)) for page in pages),
+          total_chars)
+    timed("TextChunker (serial)", lambda: sum(len(chunker.chunk_text(page, metadata)) for page in pages),
+          total_chars)
+    timed("TextChunker (chunk_many, processes)",
+          lambda: sum(len(chunks) for chunks in chunk_many([(page, metadata) for page in pages],
+                                                           args.chunk_size, args.overlap)),
+          total_chars)
+
+if __name__ == "__main__":
+    main()
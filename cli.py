@@ -0,0 +1,141 @@
+# cli.py
+
+import argparse
+import json
+import sys
+from dotenv import load_dotenv
+from agent.config import BATCH_MAX_CONCURRENT_ANSWERS, INSTRUMENTATION_EXPORT_PATH, VECTOR_STORE_BACKEND
+from pipeline.research import ResearchPipeline, SCORING_CHOICES, NAMESPACE_CHOICES, STORE_BACKENDS
+from pipeline.batch import load_queries, research_batch
+
+import logging
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+load_dotenv()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run Gemini-powered web research from the command line.")
+    parser.add_argument("query", nargs="?", help="Question to research")
+    parser.add_argument("--batch", metavar="FILE", help="Research every query in FILE (one per line) with shared fetching")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENT_ANSWERS,
+                        help="Answers synthesized in parallel in batch mode")
+    parser.add_argument("--links", type=int, default=4, help="Pages to scrape")
+    parser.add_argument("--search-pages", type=int, default=3, help="Google result pages per keyword cluster")
+    parser.add_argument("--crawl-depth", type=int, default=2, help="Crawl depth for homepages")
+    parser.add_argument("--crawl-pages", type=int, default=2, help="Pages per crawled homepage")
+    parser.add_argument("--namespace", choices=NAMESPACE_CHOICES, default="shared", help="Vector store namespace")
+    parser.add_argument("--all-sources", action="store_true",
+                        help="Retrieve from the whole store, not only this run's pages")
+    parser.add_argument("--store", choices=STORE_BACKENDS, default=VECTOR_STORE_BACKEND,
+                        help="Retrieve from an in-memory index of this run's chunks or from Chroma")
+    parser.add_argument("--no-write-behind", action="store_true",
+                        help="With --store memory, don't copy chunks into the Chroma store")
+    parser.add_argument("--scoring", choices=SCORING_CHOICES, default="batch", help="Relevance scoring mode")
+    parser.add_argument("--refresh", action="store_true", help="Skip cached answers")
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Don't report progress on stderr")
+    parser.add_argument("--trace", metavar="FILE", default=INSTRUMENTATION_EXPORT_PATH,
+                        help="Append spans and counters of each run to FILE as JSON lines")
+    return parser
+
+def make_progress(stream_tokens, quiet):
+    """
+    Progress reporter: stage and source events go to stderr, answer tokens to stdout.
+    """
+    def on_event(name, payload):
+        if name == "token" and stream_tokens:
+            sys.stdout.write(payload["text"])
+            sys.stdout.flush()
+        elif quiet:
+            return
+        elif name == "stage":
+            print(f"[{payload['name']}]", file=sys.stderr)
+        elif name == "source":
+            print(f"  + {payload['link']}", file=sys.stderr)
+        elif name == "crawl_failed":
+            print(f"  ! failed to crawl {payload['link']}: {payload['error']}", file=sys.stderr)
+        elif name == "cache_hit":
+            print(f"[cached] similar to: {payload['query']} ({payload['similarity']:.2f})", file=sys.stderr)
+        elif name == "result":
+            result = payload["result"]
+            status = "failed" if result.error else "cached" if result.cached else "done"
+            print(f"[{status}] {payload['query']}", file=sys.stderr)
+    return on_event
+
+def print_breakdown(result):
+    stages = sorted(result.trace.get("stages", {}).items(), key=lambda item: item[1]["total"], reverse=True)
+    for name, stage in stages:
+        print(f"  {name:<12} {stage['count']:>4}x  total {stage['total']:7.2f}s  max {stage['max']:6.2f}s",
+              file=sys.stderr)
+    counters = result.trace.get("counters", {})
+    if counters:
+        print("  " + ", ".join(f"{name}={int(value)}" for name, value in sorted(counters.items())), file=sys.stderr)
+
+def print_result(result, show_answer=True):
+    if show_answer:
+        print(result.answer)
+    for source in result.sources:
+        print(f"[{source['label']}] {source['url']}")
+        for url in source.get("also_at", []):
+            print(f"    also at {url}")
+
+def run_batch(pipeline, args):
+    queries = load_queries(args.batch)
+    results = research_batch(pipeline, queries, force_refresh=args.refresh,
+                             max_concurrent_answers=args.concurrency,
+                             on_event=make_progress(stream_tokens=False, quiet=args.quiet))
+    if args.json:
+        print(json.dumps([result.to_dict() for result in results], indent=2))
+    else:
+        for result in results:
+            print(f"# {result.query}\n")
+            if result.error:
+                print(f"Error: {result.error}\n")
+                continue
+            print_result(result)
+            print()
+    if results and not args.quiet:
+        print_breakdown(results[0])
+    return 1 if any(result.error for result in results) else 0
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if bool(args.query) == bool(args.batch):
+        parser.error("give either a query or --batch FILE")
+
+    pipeline = ResearchPipeline(
+        num_links=args.links, max_pages=args.search_pages,
+        max_crawl_depth=args.crawl_depth, max_crawl_pages=args.crawl_pages,
+        store_namespace=args.namespace, restrict_to_run=not args.all_sources,
+        scoring_mode=args.scoring, trace_path=args.trace,
+        store_backend=args.store, write_behind=not args.no_write_behind
+    )
+    if args.batch:
+        return run_batch(pipeline, args)
+
+    result = pipeline.run(args.query, force_refresh=args.refresh,
+                          on_event=make_progress(stream_tokens=not args.json, quiet=args.quiet))
+
+    if args.json:
+        print(json.dumps(result.to_dict(), indent=2))
+    else:
+        # Fresh answers were already streamed to stdout
+        if not result.cached:
+            print()
+        print_result(result, show_answer=result.cached)
+        if not args.quiet:
+            timings = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in result.timings.items())
+            print(f"Timings: {timings}", file=sys.stderr)
+            if result.context:
+                print(f"Context: {result.context['tokens']}/{result.context['budget']} tokens, "
+                      f"{result.context['chunks']} of {result.context['candidates']} chunks", file=sys.stderr)
+            print_breakdown(result)
+    if result.error:
+        print(f"Error: {result.error}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,92 +1,64 @@
 # pipeline/answer_generator.py
 
-import streamlit as st
 import google.generativeai as genai
 from collections import defaultdict
-import math
+from agent.config import CONTEXT_TOKEN_BUDGET
+from agent.instrumentation import incr, span
+from agent.rate_limiter import gemini_limiter
+from pipeline.reranker import GeminiReranker
+from pipeline.context_builder import build_context
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def score_documents_with_gemini(docs, user_query):
+def stream_answer(prompt):
     """
-    Uses Gemini to rate how relevant each document is to the user's query (scale 1–5).
+    Streams the synthesis response from Gemini, yielding text as it arrives.
     """
     model = genai.GenerativeModel("gemini-2.0-pro-exp-02-05")
-    scored_docs = []
-
-    for i, doc in enumerate(docs):
-        url = doc.metadata.get("url", "No URL")
-        snippet = doc.page_content[:500]
-
-        prompt = f"""
-        You are a relevance evaluator assistant.
-
-        Given the user's query and a document snippet, score how relevant this document is (1 to 5 scale):
-
-        User Query:
-        \"\"\"{user_query}\"\"\"
-
-        Document Snippet:
-        \"\"\"{snippet}\"\"\"
-
-        Return a single number (1-5):
-        """
-
+    gemini_limiter.acquire()
+    incr("api.gemini")
+    for chunk in model.generate_content(prompt, stream=True):
         try:
-            response = model.generate_content(prompt)
-            score = int("".join(filter(str.isdigit, response.text.strip())))
-        except Exception as e:
-            logger.warning(f"Scoring failed for URL {url}: {e}")
-            score = 3  # Default fallback score
-
-        scored_docs.append({
-            "doc": doc,
-            "url": url,
-            "score": score
-        })
-
-    scored_docs.sort(key=lambda x: x["score"], reverse=True)
-    return scored_docs
-
-def get_diverse_documents(scored_docs, min_required):
-    """
-    Ensure documents are picked from diverse URLs.
-    """
-    by_url = defaultdict(list)
-    for entry in scored_docs:
-        by_url[entry["url"]].append(entry)
-
-    diverse_docs = []
-    for entries in by_url.values():
-        if len(diverse_docs) >= min_required:
-            break
-        diverse_docs.append(entries[0])
-
-    return diverse_docs
-
-def generate_answer(user_query, retriever, scraped_results):
+            text = chunk.text
+        except ValueError:
+            # Chunks carrying only safety/finish metadata have no text parts
+            continue
+        if text:
+            yield text
+
+def generate_answer(user_query, retriever, reranker=None, on_token=None, token_budget=CONTEXT_TOKEN_BUDGET):
     """
     Final stage — Synthesizes a markdown answer using top documents and Gemini.
+    Retrieved documents are ranked by `reranker` (Gemini batch scoring by default),
+    then chunks are picked by MMR until the context reaches `token_budget`.
+    `on_token`, if given, receives the answer text as it streams in.
+
+    Returns:
+        Dict: 'answer' (markdown), 'sources' ({'label', 'url'} dicts),
+        'scores' ({'url', 'score'} dicts), 'timings' (seconds per step) and
+        'context' ({'tokens', 'budget', 'chunks', 'candidates'}).
     """
+    timings = {}
     try:
-        raw_docs = retriever.get_relevant_documents(user_query)
-        scored_docs = score_documents_with_gemini(raw_docs, user_query)
-
-        min_required = max(1, math.ceil(0.7 * len(scraped_results)))
-        selected_docs = get_diverse_documents(scored_docs, min_required)
-
-        context = ""
-        unique_sources = {}
-
-        for i, entry in enumerate(selected_docs):
-            doc = entry["doc"]
-            url = doc.metadata.get("url", "No URL Provided")
-            if url not in unique_sources:
-                unique_sources[url] = f"Source {len(unique_sources) + 1}"
-            label = unique_sources[url]
-            context += f"[{label}] ({url}):\n{doc.page_content}\n\n"
+        reranker = reranker or GeminiReranker()
+        with span("retrieve") as record:
+            raw_docs = retriever.get_relevant_documents(user_query)
+        timings["retrieve"] = record["duration"]
+
+        with span("score", docs=len(raw_docs)) as record:
+            scored_docs = reranker.score(raw_docs, user_query)
+        timings["score"] = record["duration"]
+
+        context = build_context(scored_docs, token_budget=token_budget)
+        unique_sources = context["labels"]
+        incr("context.tokens", context["tokens"])
+        also_at = defaultdict(set)  # same content published under other URLs
+        for doc in context["docs"]:
+            url = doc.metadata.get("url", "No URL")
+            for duplicate_url in (doc.metadata.get("duplicate_urls") or "").split():
+                also_at[url].add(duplicate_url)
 
         # Generate markdown report
         prompt = f"""
@@ -102,7 +74,7 @@ def generate_answer(user_query, retriever, scraped_results):
         - If **tabular or comparative data** (e.g., pricing, features, plans, specs, performance) is mentioned in any source, format it as a **Markdown table** with headers.
         - Do not skip important numerical, plan, or policy info just because it's complex — break it down in tables or bulleted blocks as needed.
         - Use inline citations like [Source 1], [Source 2], etc. after each fact.
-        - You MUST incorporate information from **at least 3 different sources**.
+        - You MUST incorporate information from **at least {min(3, len(unique_sources))} different sources**.
         - If some sources contain overlapping content, reference each one explicitly.
         - Avoid relying on just one source unless it's the only one with that information.
         - If you cannot extract anything unique from a source, mention this in the "Source Coverage" section at the end.
@@ -118,7 +90,7 @@ def generate_answer(user_query, retriever, scraped_results):
         ---
 
         ### SOURCE DOCUMENTS:
-        {context}
+        {context["text"]}
 
         ---
 
@@ -129,27 +101,27 @@ def generate_answer(user_query, retriever, scraped_results):
 
         """
 
-        model = genai.GenerativeModel("gemini-2.0-pro-exp-02-05")
-        response = model.generate_content(prompt)
-        answer = response.text.strip()
-
-        st.markdown("### 🧠 Answer")
-        if any(r.get("page", 1) > 1 for r in scraped_results):
-            st.markdown("<span style='color:orange; font-weight:bold;'>⚠️ Includes content from deeper Google search pages</span>", unsafe_allow_html=True)
-        st.markdown(answer, unsafe_allow_html=True)
-
-        with st.expander("📊 Document Relevance Ranking"):
-            for entry in scored_docs:
-                url = entry["url"]
-                score = entry["score"]
-                label = unique_sources.get(url, "-")
-                rating = "High" if score >= 4 else "Medium" if score == 3 else "Low"
-                st.markdown(f"<small>🔹 **{label}** | {rating} Relevance | Score: {score}/5 — <a href='{url}' target='_blank'>{url}</a></small>", unsafe_allow_html=True)
-
-        with st.expander("🔗 Source Citations"):
-            for url, label in unique_sources.items():
-                st.markdown(f"<small>🔹 **{label}**: <a href='{url}' target='_blank'>{url}</a></small>", unsafe_allow_html=True)
-
-    except Exception as e:
-        st.error(f"Failed to generate answer: {e}")
+        answer = ""
+        with span("synthesize", context_tokens=context["tokens"], chunks=len(context["docs"])) as record:
+            for token in stream_answer(prompt):
+                answer += token
+                if on_token is not None:
+                    on_token(token)
+        timings["synthesize"] = record["duration"]
+
+        sources = []
+        for url, label in unique_sources.items():
+            source = {"label": label, "url": url}
+            others = sorted(also_at[url] - {url})
+            if others:
+                source["also_at"] = others
+            sources.append(source)
+        scores = [{"url": entry["url"], "score": entry["score"]} for entry in scored_docs]
+        context_stats = {"tokens": context["tokens"], "budget": context["budget"],
+                         "chunks": len(context["docs"]), "candidates": context["candidates"]}
+        return {"answer": answer.strip(), "sources": sources, "scores": scores, "timings": timings,
+                "context": context_stats}
+
+    except Exception:
         logger.exception("Gemini synthesis failed.")
+        raise
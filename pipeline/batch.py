@@ -0,0 +1,255 @@
+# pipeline/batch.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from agent.config import BATCH_MAX_CONCURRENT_ANSWERS, CHROMA_TTL_SECONDS, CONTEXT_CANDIDATES
+from agent.instrumentation import propagate, start_trace
+from agent.query_analyzer import normalize_query
+from pipeline.query_handler import analyze_query
+from pipeline.search_and_scrape import search_and_scrape, PageMemo
+from pipeline.embedder import EmbeddingWorker, embed_texts, embedding_model_name
+from pipeline.embed_and_store import (open_run_store, write_chunks, finalize_store, build_retriever,
+                                      chunk_id, collection_for_query, DEFAULT_COLLECTION)
+from pipeline.dedup import ChunkDeduplicator
+from pipeline.answer_generator import generate_answer
+from pipeline.research import ResearchResult, gemini_key
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def load_queries(path):
+    """
+    Read one query per line, skipping blank lines, '#' comments and
+    duplicates (compared in normalized form).
+    """
+    queries = []
+    seen = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            query = line.strip()
+            if not query or query.startswith("#"):
+                continue
+            key = normalize_query(query)
+            if key in seen:
+                continue
+            seen.add(key)
+            queries.append(query)
+    return queries
+
+class SearchMemo:
+    """
+    Wraps a search tool so each unique (keyword chunk, page) is searched once
+    per batch, however many queries share the chunk.
+    """
+    def __init__(self, search_tool):
+        self.search_tool = search_tool
+        self.calls = 0
+        self.hits = 0
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def search_page(self, query, page_num=0, num_results=10):
+        key = (normalize_query(query), page_num, num_results)
+        with self._lock:
+            if key in self._pages:
+                self.hits += 1
+                return self._pages[key]
+        page = self.search_tool.search_page(query, page_num, num_results)
+        with self._lock:
+            self._pages[key] = page
+            self.calls += 1
+        return page
+
+def _dedupe_chunks(keyword_chunks):
+    unique = {}
+    for chunk in keyword_chunks:
+        unique.setdefault(normalize_query(" ".join(chunk)), chunk)
+    return list(unique.values())
+
+def research_batch(pipeline, queries, force_refresh=False,
+                   max_concurrent_answers=BATCH_MAX_CONCURRENT_ANSWERS, on_event=None):
+    """
+    Research many related queries with shared work:
+
+    1. Query embeddings are computed in one batch and checked against the answer cache.
+    2. Remaining queries are analyzed concurrently (plans come from the plan cache when possible).
+    3. Searches run once per unique keyword chunk and every unique URL is
+       fetched once; each new chunk is embedded once into a single store, and
+       near-duplicate chunks across all queries' pages are dropped.
+    4. Retrieval and synthesis run per query, at most `max_concurrent_answers` at a time.
+
+    `on_event(name, payload)` is called on the calling thread; payloads carry
+    the 'query' they belong to, and a 'result' event follows each finished query.
+    Timings for the shared scrape/embed stage and the trace summary are batch-wide.
+
+    Returns:
+        List[ResearchResult]: One per query, in input order.
+    """
+    with gemini_key(pipeline.api_key), start_trace("batch", export_path=pipeline.trace_path) as trace:
+        results = _research_batch(pipeline, queries, force_refresh, max_concurrent_answers, on_event)
+    summary = trace.summary()
+    for result in results:
+        result.trace = summary
+    return results
+
+def _research_batch(pipeline, queries, force_refresh, max_concurrent_answers, on_event):
+    emit = on_event or (lambda name, payload: None)
+    batch_started = time.perf_counter()
+    workers = max(1, max_concurrent_answers)
+    results = {query: ResearchResult(query=query) for query in queries}
+    model_name = embedding_model_name(pipeline.embedding_model)
+
+    def finish(query):
+        results[query].timings["total"] = time.perf_counter() - batch_started
+        emit("result", {"query": query, "result": results[query]})
+
+    # ─── Answer cache ───────────────────────────────────────────
+    query_vectors = {}
+    pending = list(queries)
+    if pipeline.answer_cache is not None:
+        emit("stage", {"name": "cache_lookup"})
+        vectors = embed_texts(queries, pipeline.embedding_model, cache=pipeline.embedding_cache)
+        pending = []
+        for query, vector in zip(queries, vectors):
+            query_vectors[query] = vector
+            cached = pipeline.lookup_cached(query, vector, model_name, force_refresh)
+            if cached is None:
+                pending.append(query)
+            else:
+                results[query] = ResearchResult.from_cache(query, cached)
+                finish(query)
+    if not pending:
+        return [results[query] for query in queries]
+
+    # ─── Query analysis ─────────────────────────────────────────
+    emit("stage", {"name": "analyze"})
+    def analyze(query):
+        started = time.perf_counter()
+        try:
+            plan = _dedupe_chunks(analyze_query(query, cache=pipeline.plan_cache))
+        except Exception as e:
+            logger.exception(f"[Batch] Query analysis failed for '{query}'")
+            results[query].error = str(e)
+            plan = []
+        results[query].timings["analyze"] = time.perf_counter() - started
+        return plan
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        plans = dict(zip(pending, executor.map(propagate(analyze), pending)))
+    unique_chunks = {normalize_query(" ".join(chunk)) for plan in plans.values() for chunk in plan}
+    logger.info(f"[Batch] {len(pending)} queries share {len(unique_chunks)} unique keyword chunks")
+
+    # ─── Shared scrape → embed ──────────────────────────────────
+    emit("stage", {"name": "scrape_embed"})
+    started = time.perf_counter()
+    collection_name = (collection_for_query("\n".join(pending)) if pipeline.store_namespace == "per_query"
+                       else DEFAULT_COLLECTION)
+    backend = pipeline.backend_for_run()
+    store = open_run_store(pipeline.embedding_model, backend=backend, persist_dir=pipeline.persist_dir,
+                           collection_name=collection_name, write_behind=pipeline.write_behind,
+                           fingerprints=pipeline.dedup)
+    search_memo = SearchMemo(pipeline.search_tool)
+    page_memo = PageMemo()
+    submitted_ids = set()
+    stand_ins = {}  # chunk ID -> URL of the chunk kept in place of that duplicate
+    run_urls = {}
+    deduplicator = None
+    if pipeline.dedup:
+        deduplicator = ChunkDeduplicator(store=store if pipeline.dedup_against_store and backend == "chroma" else None)
+
+    worker = EmbeddingWorker(
+        pipeline.embedding_model,
+        write_batch=lambda chunks, vectors: write_chunks(store, chunks, vectors, fingerprints=pipeline.dedup),
+        cache=pipeline.embedding_cache
+    )
+
+    def submit_new(chunks, matched_urls):
+        # Pages reused from the memo bring the same chunks again; embed each chunk once,
+        # and point every query that meets a dropped duplicate at the chunk kept for it
+        new_chunks = []
+        for chunk in chunks:
+            key = chunk_id(chunk)
+            if key in submitted_ids:
+                if key in stand_ins:
+                    matched_urls.add(stand_ins[key])
+                continue
+            submitted_ids.add(key)
+            kept_for = set()
+            if deduplicator is not None and not deduplicator.add(chunk, kept_for):
+                stand_ins.update((key, url) for url in kept_for)
+                matched_urls.update(kept_for)
+                continue
+            new_chunks.append(chunk)
+        worker.submit(new_chunks)
+
+    with worker:
+        for query in pending:
+            if results[query].error:
+                continue
+            matched_urls = set()
+            try:
+                scraped_results, chunks = search_and_scrape(
+                    plans[query], search_memo, pipeline.scraper, pipeline.chunker, query,
+                    max_links=pipeline.num_links, max_pages=pipeline.max_pages,
+                    max_crawl_depth=pipeline.max_crawl_depth, max_crawl_pages=pipeline.max_crawl_pages,
+                    on_chunks=lambda chunks, matched_urls=matched_urls: submit_new(chunks, matched_urls),
+                    page_memo=page_memo,
+                    on_event=lambda name, payload, query=query: emit(name, {**payload, "query": query})
+                )
+            except Exception as e:
+                logger.exception(f"[Batch] Scraping failed for '{query}'")
+                results[query].error = str(e)
+                continue
+            results[query].scraped_results = scraped_results
+            run_urls[query] = [chunk["metadata"]["url"] for chunk in chunks] + sorted(matched_urls)
+
+    scrape_embed_time = time.perf_counter() - started
+    logger.info(f"[Batch] {search_memo.calls} searches ({search_memo.hits} shared), "
+                f"{page_memo.hits} page fetches reused, {worker.stored} chunks stored")
+
+    finalize_store(store, deduplicator, CHROMA_TTL_SECONDS)
+
+    answerable = []
+    for query in pending:
+        results[query].timings["scrape_embed"] = scrape_embed_time
+        if results[query].error:
+            finish(query)
+        elif not run_urls.get(query):
+            results[query].error = "No pages could be fetched for this query."
+            finish(query)
+        elif worker.stored == 0:
+            results[query].error = "Failed to embed and store documents."
+            finish(query)
+        else:
+            answerable.append(query)
+
+    # ─── Per-query retrieval and synthesis ──────────────────────
+    emit("stage", {"name": "answer"})
+    def answer(query):
+        urls = run_urls[query] if pipeline.restrict_to_run else None
+        retriever = build_retriever(store, k=CONTEXT_CANDIDATES, urls=urls)
+        return generate_answer(query, retriever, reranker=pipeline.make_reranker())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(propagate(answer), query): query for query in answerable}
+        for future in as_completed(futures):
+            query = futures[future]
+            result = results[query]
+            try:
+                generated = future.result()
+                result.answer = generated["answer"]
+                result.sources = generated["sources"]
+                result.scores = generated["scores"]
+                result.timings.update(generated["timings"])
+                result.context = generated["context"]
+                vector = query_vectors.get(query)
+                if pipeline.answer_cache is not None and result.answer and vector is not None:
+                    pipeline.answer_cache.put(query, vector, model_name, result.answer,
+                                              result.sources, result.scores)
+            except Exception as e:
+                result.error = str(e)
+            finish(query)
+
+    return [results[query] for query in queries]
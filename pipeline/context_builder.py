@@ -0,0 +1,120 @@
+# pipeline/context_builder.py
+
+import math
+import numpy as np
+from collections import Counter
+from agent.config import (CONTEXT_TOKEN_BUDGET, CONTEXT_MMR_LAMBDA, CONTEXT_MAX_CHUNKS_PER_SOURCE,
+                          CONTEXT_MAX_SIMILARITY)
+from pipeline.reranker import _tokenize
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+CHARS_PER_TOKEN = 4  # Gemini's rule of thumb for English text
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def _source_header(label, url):
+    return f"[{label}] ({url}):\n"
+
+def _similarity_matrix(texts):
+    """
+    Cosine similarity between the term-frequency vectors of `texts`.
+    """
+    counts = [Counter(_tokenize(text)) for text in texts]
+    vocab = {term: i for i, term in enumerate({term for c in counts for term in c})}
+    matrix = np.zeros((len(texts), max(1, len(vocab))), dtype=np.float32)
+    for row, c in enumerate(counts):
+        for term, n in c.items():
+            matrix[row, vocab[term]] = n
+    norms = np.linalg.norm(matrix, axis=1)
+    matrix /= np.maximum(norms, 1e-12)[:, None]
+    return matrix @ matrix.T
+
+def _normalized_relevance(scored_docs):
+    relevance = np.array([entry["relevance"] for entry in scored_docs], dtype=np.float32)
+    spread = relevance.max() - relevance.min()
+    if spread <= 0:
+        return np.ones_like(relevance)
+    return (relevance - relevance.min()) / spread
+
+def build_context(scored_docs, token_budget=CONTEXT_TOKEN_BUDGET, mmr_lambda=CONTEXT_MMR_LAMBDA,
+                  max_per_source=CONTEXT_MAX_CHUNKS_PER_SOURCE, max_similarity=CONTEXT_MAX_SIMILARITY):
+    """
+    Select chunks for the synthesis prompt by maximal marginal relevance
+    under a token budget.
+
+    Each step picks the candidate maximizing
+    `mmr_lambda * relevance - (1 - mmr_lambda) * max similarity to the chunks
+    already picked`, among those that still fit the budget. A source may
+    contribute up to `max_per_source` chunks, but a chunk whose similarity to
+    a picked one reaches `max_similarity` adds nothing new and is skipped.
+    If even the most relevant chunk exceeds the budget alone, it is truncated.
+
+    Args:
+        scored_docs: Reranker entries ('doc', 'url', 'relevance'), best first.
+
+    Returns:
+        Dict: 'text' (prompt context, excerpts grouped under '[Source N] (url)'
+        headers), 'labels' ({url: label} in citation order), 'docs' (picked
+        LangChain documents), 'tokens' (estimated tokens used), 'budget'
+        and 'candidates'.
+    """
+    result = {"text": "", "labels": {}, "docs": [], "tokens": 0, "budget": token_budget,
+              "candidates": len(scored_docs)}
+    if not scored_docs:
+        return result
+
+    texts = [entry["doc"].page_content for entry in scored_docs]
+    relevance = _normalized_relevance(scored_docs)
+    similarity = _similarity_matrix(texts)
+    costs = [estimate_tokens(text) for text in texts]
+    header_costs = [estimate_tokens(_source_header("Source 00", entry["url"])) for entry in scored_docs]
+
+    picked = []
+    per_source = Counter()
+    remaining = set(range(len(scored_docs)))
+    used = 0
+    while remaining:
+        best, best_score = None, -math.inf
+        for i in sorted(remaining):
+            redundancy = max((similarity[i, j] for j in picked), default=0.0)
+            cost = costs[i] + (0 if per_source[scored_docs[i]["url"]] else header_costs[i])
+            if (redundancy >= max_similarity or used + cost > token_budget
+                    or per_source[scored_docs[i]["url"]] >= max_per_source):
+                remaining.discard(i)
+                continue
+            score = mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        used += costs[best] + (0 if per_source[scored_docs[best]["url"]] else header_costs[best])
+        per_source[scored_docs[best]["url"]] += 1
+        picked.append(best)
+        remaining.discard(best)
+
+    excerpts = {i: texts[i] for i in picked}
+    if not picked:
+        best = int(np.argmax(relevance))
+        room = max(0, token_budget - header_costs[best]) * CHARS_PER_TOKEN
+        picked = [best]
+        excerpts[best] = texts[best][:room]
+        logger.info(f"[Context] Top chunk exceeds the {token_budget}-token budget; truncated")
+
+    # Group excerpts by source, sources ordered by their first pick
+    by_url = {}
+    for i in picked:
+        by_url.setdefault(scored_docs[i]["url"], []).append(i)
+    sections = []
+    for url, indices in by_url.items():
+        label = f"Source {len(result['labels']) + 1}"
+        result["labels"][url] = label
+        sections.append(_source_header(label, url) + "\n\n".join(excerpts[i] for i in indices))
+        result["docs"].extend(scored_docs[i]["doc"] for i in indices)
+
+    result["text"] = "\n\n".join(sections) + "\n\n"
+    result["tokens"] = estimate_tokens(result["text"])
+    return result
@@ -1,77 +1,109 @@
 # pipeline/crawler.py
 
+import heapq
+import itertools
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
-from typing import List, Dict, Tuple, Set
-from pipeline.link_ranker import rank_links_by_query
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from typing import List, Dict, Tuple, Set, Optional
+from agent.config import CRAWL_MAX_CHARS
+from agent.http_client import HTTPClient
+from agent.scraper_tool import WebScraperTool
+from pipeline.link_ranker import LinkRanker
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def extract_internal_links(soup: BeautifulSoup, base_url: str) -> List[str]:
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "ref"}
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize a URL for deduplication: lowercase scheme/host, drop default
+    ports, fragments, trailing slashes and tracking params, sort the query.
     """
-    Get all internal <a href> links from the page.
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    params = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(params)), ""))
+
+def extract_internal_links(links: List[Dict[str, str]], base_url: str) -> List[Dict[str, str]]:
+    """
+    Keep only links on the same host as `base_url`. Links come from the
+    extractor with their anchor text and surrounding text as context.
     """
-    internal_links = []
     base_domain = urlparse(base_url).netloc
+    return [link for link in links if urlparse(link["url"]).netloc == base_domain]
 
-    for a in soup.find_all("a", href=True):
-        href = a["href"]
-        full_url = urljoin(base_url, href)
-        parsed = urlparse(full_url)
-        if parsed.netloc == base_domain:
-            internal_links.append(full_url)
-
-    return list(set(internal_links))
-
-def crawl_site(start_url: str, user_query: str, max_depth: int = 2, max_links: int = 5) -> List[Dict]:
+def crawl_site(start_url: str, user_query: str, max_depth: int = 2, max_links: int = 5,
+               http_client: Optional[HTTPClient] = None, links_per_page: int = 5,
+               link_ranker: Optional[LinkRanker] = None,
+               scraper: Optional[WebScraperTool] = None) -> List[Dict]:
     """
-    Crawl site starting from homepage and follow internal links.
+    Crawl site starting from homepage and follow internal links best-first:
+    the frontier is a heap ordered by link relevance, then depth, so a highly
+    relevant link found deep in the site is fetched before mediocre shallow ones.
 
     Args:
         start_url (str): Homepage or base URL.
         user_query (str): Query for relevance ranking.
         max_depth (int): Depth of recursion.
         max_links (int): Total pages to crawl.
+        http_client (HTTPClient): Pooled client; pages of one site share a keep-alive session.
+        links_per_page (int): Best-scoring links enqueued from each page.
+        link_ranker (LinkRanker): Ranker for `user_query`, shared across crawls of
+            one query; links below its similarity threshold are never enqueued.
+        scraper (WebScraperTool): Fetches and extracts each page (text and links in one parse).
 
     Returns:
         List[Dict]: List of crawled pages with content and depth.
     """
-    visited: Set[str] = set()
-    queue: List[Tuple[str, int]] = [(start_url, 0)]
+    scraper = scraper or WebScraperTool(http_client=http_client)
+    link_ranker = link_ranker or LinkRanker(user_query)
+    tie_breaker = itertools.count()
+    # (-relevance, depth, insertion order, url); the start page always goes first
+    frontier: List[Tuple[float, int, int, str]] = [(float("-inf"), 0, next(tie_breaker), start_url)]
+    queued: Set[str] = {canonicalize_url(start_url)}
     crawled_pages = []
 
-    while queue and len(crawled_pages) < max_links:
-        url, depth = queue.pop(0)
-        if url in visited or depth > max_depth:
-            continue
-        visited.add(url)
+    while frontier and len(crawled_pages) < max_links:
+        _, depth, _, url = heapq.heappop(frontier)
 
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            html = response.text
-            soup = BeautifulSoup(html, "html.parser")
-
-            content = "\n".join(p.get_text() for p in soup.find_all("p") if p.get_text())
+            page = scraper.fetch_page(url, want_links=depth + 1 <= max_depth, max_chars=CRAWL_MAX_CHARS)
 
             crawled_pages.append({
                 "url": url,
                 "depth": depth,
-                "content": content.strip()
+                "content": page["content"].strip()
             })
 
             if len(crawled_pages) >= max_links:
                 break
 
-            internal_links = extract_internal_links(soup, url)
-            ranked_links = rank_links_by_query(internal_links, user_query, top_k=5)
+            if depth + 1 > max_depth:
+                continue
+
+            candidates = {}
+            for link in extract_internal_links(page["links"], url):
+                canonical = canonicalize_url(link["url"])
+                if canonical not in queued:
+                    candidates.setdefault(canonical, link)
 
-            for link in ranked_links:
-                if link not in visited:
-                    queue.append((link, depth + 1))
+            for link, score in link_ranker.rank(list(candidates.values()), top_k=links_per_page):
+                queued.add(canonicalize_url(link["url"]))
+                heapq.heappush(frontier, (-score, depth + 1, next(tie_breaker), link["url"]))
 
         except requests.exceptions.RequestException as e:
             logger.warning(f"[Crawler] Request error at {url}: {e}")
@@ -0,0 +1,169 @@
+# pipeline/dedup.py
+
+import hashlib
+import re
+import threading
+import numpy as np
+from agent.config import DEDUP_MAX_DISTANCE, DEDUP_SHINGLE_SIZE
+from agent.instrumentation import incr
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BANDS = 4
+BAND_BITS = 16
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def _tokens(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def exact_hash(text):
+    """
+    Hash of the text with case, punctuation and whitespace normalized away.
+    """
+    return hashlib.sha256(" ".join(_tokens(text)).encode("utf-8")).hexdigest()
+
+def simhash(text, shingle_size=DEDUP_SHINGLE_SIZE):
+    """
+    64-bit SimHash over word shingles. Near-duplicate texts get fingerprints
+    a few bits apart. Returns None for texts too short to shingle.
+    """
+    tokens = _tokens(text)
+    if len(tokens) < shingle_size:
+        return None
+    shingles = {" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in shingles],
+        dtype=">u8"
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int("".join("1" if vote > 0 else "0" for vote in votes), 2)
+
+def simhash_bands(fingerprint):
+    """
+    Split a fingerprint into BANDS 16-bit bands. Fingerprints within
+    BANDS - 1 bits of each other share at least one band exactly.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [(fingerprint >> (BAND_BITS * i)) & mask for i in range(BANDS)]
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def fingerprint_metadata(text):
+    """
+    Dedup fields stored with each chunk so later runs can match against the store.
+    """
+    metadata = {"dedup_hash": exact_hash(text)}
+    fingerprint = simhash(text)
+    if fingerprint is not None:
+        metadata["simhash"] = f"{fingerprint:016x}"
+        for i, band in enumerate(simhash_bands(fingerprint)):
+            metadata[f"simhash_band{i}"] = band
+    return metadata
+
+class ChunkDeduplicator:
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE, store=None):
+        """
+        Incremental exact + near-duplicate filter for the chunks of a run.
+
+        The first chunk seen with some content is kept as the representative;
+        later chunks that match it exactly (after normalization) or within
+        `max_distance` SimHash bits are dropped, and their URLs are recorded in
+        the representative's 'duplicate_urls' so citations can still name them.
+
+        With a Chroma `store`, chunks not matched within the run are also looked
+        up among stored chunks via their 'dedup_hash' and 'simhash_band*' fields.
+        """
+        self.max_distance = min(max_distance, BANDS - 1)  # banding only guarantees recall up to here
+        self.store = store
+        self.kept = 0
+        self.dropped = 0
+        self._exact = {}
+        self._bands = [{} for _ in range(BANDS)]
+        self._representatives = []
+        self._lock = threading.Lock()
+
+    def _match(self, digest, fingerprint):
+        rep = self._exact.get(digest)
+        if rep is not None or fingerprint is None:
+            return rep
+        for i, band in enumerate(simhash_bands(fingerprint)):
+            for candidate in self._bands[i].get(band, ()):
+                if hamming(candidate["fingerprint"], fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+    def _match_in_store(self, digest, fingerprint):
+        conditions = [{"dedup_hash": digest}]
+        if fingerprint is not None:
+            conditions += [{f"simhash_band{i}": band} for i, band in enumerate(simhash_bands(fingerprint))]
+        where = conditions[0] if len(conditions) == 1 else {"$or": conditions}
+        try:
+            found = self.store._collection.get(where=where, include=["metadatas"])
+        except Exception as e:
+            logger.warning(f"[Dedup] Store lookup failed: {e}")
+            return None
+
+        for chunk_id, metadata in zip(found["ids"], found["metadatas"]):
+            stored = int(metadata["simhash"], 16) if metadata.get("simhash") else None
+            exact = metadata.get("dedup_hash") == digest
+            near = stored is not None and fingerprint is not None and hamming(stored, fingerprint) <= self.max_distance
+            if exact or near:
+                rep = {"id": chunk_id, "chunk": None, "url": metadata.get("url", ""),
+                       "fingerprint": stored, "duplicate_urls": []}
+                self._index(rep, metadata.get("dedup_hash", digest))
+                return rep
+        return None
+
+    def _index(self, rep, digest):
+        self._exact[digest] = rep
+        if rep["fingerprint"] is not None:
+            for i, band in enumerate(simhash_bands(rep["fingerprint"])):
+                self._bands[i].setdefault(band, []).append(rep)
+        self._representatives.append(rep)
+
+    def add(self, chunk, matched_urls=None):
+        """
+        Returns True if the chunk is new and should be embedded, False if it
+        duplicates a chunk already seen (in this run or in the store). For a
+        duplicate, the kept chunk's URL is added to `matched_urls` if given,
+        so retrieval restricted to a run's pages can still reach it.
+        """
+        url = chunk["metadata"].get("url", "")
+        digest = exact_hash(chunk["content"])
+        fingerprint = simhash(chunk["content"])
+
+        with self._lock:
+            rep = self._match(digest, fingerprint)
+            if rep is None and self.store is not None:
+                rep = self._match_in_store(digest, fingerprint)
+            if rep is not None and rep["id"] is not None and rep["url"] == url:
+                # The same page re-scraped: keep it so its stored copy is refreshed
+                rep = None
+            if rep is not None:
+                if url and url != rep["url"] and url not in rep["duplicate_urls"]:
+                    rep["duplicate_urls"].append(url)
+                if matched_urls is not None and rep["url"]:
+                    matched_urls.add(rep["url"])
+                self.dropped += 1
+                incr("dedup.dropped")
+                return False
+
+            self._index({"id": None, "chunk": chunk, "url": url, "fingerprint": fingerprint,
+                         "duplicate_urls": []}, digest)
+            self.kept += 1
+            return True
+
+    def filter(self, chunks, matched_urls=None):
+        return [chunk for chunk in chunks if self.add(chunk, matched_urls)]
+
+    def duplicates(self):
+        """
+        Representatives that absorbed duplicates from other URLs: dicts with
+        'id' (stored chunks) or 'chunk' (this run's), 'url' and 'duplicate_urls'.
+        """
+        with self._lock:
+            return [rep for rep in self._representatives if rep["duplicate_urls"]]
@@ -1,36 +1,271 @@
 # pipeline/embed_and_store.py
 
-from langchain.schema import Document
-from langchain.vectorstores import Chroma
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agent.config import EMBED_BATCH_SIZE, EMBED_MAX_WORKERS, CHROMA_TTL_SECONDS, DEDUP_ENABLED
+from pipeline.embedder import embed_texts
+from pipeline.dedup import fingerprint_metadata
+from pipeline.memory_index import InMemoryVectorIndex
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def embed_and_store_chunks(all_chunks, embedding_model, persist_dir="chroma_store"):
+DEFAULT_COLLECTION = "langchain"
+STORE_BACKENDS = ("chroma", "memory")
+
+# One writer thread for all write-behind stores keeps SQLite writes serialized and in order
+_write_behind_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-write-behind")
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def chunk_id(chunk):
     """
-    Embeds all chunks using the embedding model and saves to Chroma.
+    Stable ID from source URL + content, so re-scraping a page upserts in place.
     """
-    embedded_chunks = []
+    url = chunk["metadata"].get("url", "")
+    return hashlib.sha256(f"{url}\0{content_hash(chunk['content'])}".encode("utf-8")).hexdigest()
 
-    for chunk in all_chunks:
-        try:
-            vector = embedding_model.embed_query(chunk["content"])
-            embedded_chunks.append({
-                "embedding": vector,
-                "content": chunk["content"],
-                "metadata": chunk["metadata"]
+def collection_for_query(user_query):
+    """
+    Per-query namespace: a valid Chroma collection name derived from the normalized query.
+    """
+    normalized = " ".join(user_query.lower().split())
+    return f"query-{hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]}"
+
+def _clean_metadata(metadata):
+    # Chroma only accepts str/int/float/bool metadata values; drop None, lists, dicts etc.
+    # so one odd field doesn't fail the whole upsert
+    return {key: value for key, value in metadata.items() if isinstance(value, (str, int, float, bool))}
+
+def prune_store(chroma_store, ttl_seconds=CHROMA_TTL_SECONDS):
+    """
+    Deletes chunks whose last upsert is older than `ttl_seconds`.
+    """
+    if not ttl_seconds or ttl_seconds <= 0:
+        return
+    cutoff = time.time() - ttl_seconds
+    try:
+        chroma_store._collection.delete(where={"stored_at": {"$lt": cutoff}})
+    except Exception as e:
+        logger.warning(f"Failed to prune Chroma collection: {e}")
+
+class _EmptyRetriever:
+    def get_relevant_documents(self, query):
+        return []
+
+    invoke = get_relevant_documents
+
+def build_retriever(chroma_store, k=4, urls=None):
+    """
+    Retriever over the store (Chroma or InMemoryVectorIndex), optionally
+    restricted to chunks from `urls` (e.g. the current run's sources).
+    `urls=None` means no filter; an empty list matches nothing.
+    """
+    if urls is not None and not urls:
+        return _EmptyRetriever()  # Chroma rejects an empty $in
+    search_kwargs = {"k": k}
+    if urls:
+        search_kwargs["filter"] = {"url": {"$in": sorted(set(urls))}}
+    return chroma_store.as_retriever(search_kwargs=search_kwargs)
+
+def open_store(embedding_model, persist_dir="chroma_store", collection_name=DEFAULT_COLLECTION):
+    # Deferred so runs on the in-memory backend don't load Chroma on the request path
+    from langchain.vectorstores import Chroma
+    return Chroma(collection_name=collection_name, persist_directory=persist_dir,
+                  embedding_function=embedding_model)
+
+def _stored_duplicate_urls(chroma_store, ids):
+    try:
+        found = chroma_store._collection.get(ids=ids, include=["metadatas"])
+    except Exception as e:
+        logger.warning(f"Failed to read stored duplicate URLs: {e}")
+        return {}
+    return {key: metadata["duplicate_urls"] for key, metadata in zip(found["ids"], found["metadatas"])
+            if metadata and metadata.get("duplicate_urls")}
+
+def upsert_chunks(chroma_store, chunks, vectors, stored_at=None, fingerprints=DEDUP_ENABLED):
+    """
+    Upserts chunks with their precomputed vectors, skipping chunks whose
+    embedding failed. Returns the number of chunks written.
+
+    With `fingerprints`, the dedup fields later runs match against are
+    stored too. 'duplicate_urls' recorded on an existing entry are kept.
+    """
+    # Identical (url, content) pairs collapse onto one ID; keep the last one
+    unique_chunks = {
+        chunk_id(chunk): (chunk, vector)
+        for chunk, vector in zip(chunks, vectors) if vector is not None
+    }
+    if not unique_chunks:
+        return 0
+
+    stored_at = stored_at or time.time()
+    duplicate_urls = _stored_duplicate_urls(chroma_store, list(unique_chunks))
+    chroma_store._collection.upsert(
+        ids=list(unique_chunks),
+        embeddings=[list(vector) for _, vector in unique_chunks.values()],
+        documents=[chunk["content"] for chunk, _ in unique_chunks.values()],
+        metadatas=[
+            _clean_metadata({
+                **chunk["metadata"],
+                **(fingerprint_metadata(chunk["content"]) if fingerprints else {}),
+                "content_hash": content_hash(chunk["content"]),
+                "duplicate_urls": duplicate_urls.get(key),
+                "stored_at": stored_at
             })
+            for key, (chunk, _) in unique_chunks.items()
+        ]
+    )
+    return len(unique_chunks)
+
+def annotate_duplicates(chroma_store, deduplicator):
+    """
+    Record on each stored representative chunk the other URLs that carried
+    the same content ('duplicate_urls', space-separated), merging with URLs
+    recorded by earlier runs. Returns the number of chunks updated.
+    """
+    reps = {}
+    for rep in deduplicator.duplicates():
+        key = rep["id"] or chunk_id(rep["chunk"])
+        reps.setdefault(key, set()).update(rep["duplicate_urls"])
+    if not reps:
+        return 0
+
+    try:
+        found = chroma_store._collection.get(ids=list(reps), include=["metadatas"])
+        ids, metadatas = [], []
+        for key, metadata in zip(found["ids"], found["metadatas"]):
+            urls = set((metadata.get("duplicate_urls") or "").split()) | reps[key]
+            ids.append(key)
+            metadatas.append({**metadata, "duplicate_urls": " ".join(sorted(urls))})
+        if ids:
+            chroma_store._collection.update(ids=ids, metadatas=metadatas)
+        return len(ids)
+    except Exception as e:
+        logger.warning(f"Failed to record duplicate URLs: {e}")
+        return 0
+
+class ChromaWriteBehind:
+    def __init__(self, embedding_model, persist_dir="chroma_store", collection_name=DEFAULT_COLLECTION,
+                 ttl_seconds=CHROMA_TTL_SECONDS, fingerprints=DEDUP_ENABLED):
+        """
+        Persists chunks to Chroma on a background thread, so a run served from
+        an InMemoryVectorIndex still fills the shared store for later runs.
+        The collection is opened lazily on the writer thread.
+        """
+        self.embedding_model = embedding_model
+        self.persist_dir = persist_dir
+        self.collection_name = collection_name
+        self.ttl_seconds = ttl_seconds
+        self.fingerprints = fingerprints
+        self._store = None
+
+    def _open(self):
+        if self._store is None:
+            self._store = open_store(self.embedding_model, persist_dir=self.persist_dir,
+                                     collection_name=self.collection_name)
+        return self._store
+
+    def _upsert(self, chunks, vectors):
+        try:
+            upsert_chunks(self._open(), chunks, vectors, fingerprints=self.fingerprints)
         except Exception as e:
-            logger.warning(f"Failed to embed chunk: {e}")
+            logger.warning(f"Write-behind upsert of {len(chunks)} chunks failed: {e}")
+
+    def _finalize(self, deduplicator):
+        try:
+            chroma_store = self._open()
+            if deduplicator is not None:
+                annotate_duplicates(chroma_store, deduplicator)
+            prune_store(chroma_store, self.ttl_seconds)
+            chroma_store.persist()
+        except Exception as e:
+            logger.warning(f"Failed to finalize write-behind Chroma store: {e}")
+
+    def upsert(self, chunks, vectors):
+        return _write_behind_executor.submit(self._upsert, list(chunks), list(vectors))
+
+    def finalize(self, deduplicator=None):
+        """
+        Queue duplicate annotation, pruning and persisting after the pending upserts.
+        """
+        return _write_behind_executor.submit(self._finalize, deduplicator)
+
+def open_run_store(embedding_model, backend="chroma", persist_dir="chroma_store",
+                   collection_name=DEFAULT_COLLECTION, write_behind=True, ttl_seconds=CHROMA_TTL_SECONDS,
+                   fingerprints=DEDUP_ENABLED):
+    """
+    Store a run's chunks are written to and retrieved from: the persistent
+    Chroma collection, or an InMemoryVectorIndex that (with `write_behind`)
+    copies every chunk into that collection in the background.
+    """
+    if backend not in STORE_BACKENDS:
+        raise ValueError(f"Unknown store backend: {backend}")
+    if backend == "chroma":
+        return open_store(embedding_model, persist_dir=persist_dir, collection_name=collection_name)
+    writer = ChromaWriteBehind(embedding_model, persist_dir=persist_dir, collection_name=collection_name,
+                               ttl_seconds=ttl_seconds, fingerprints=fingerprints) if write_behind else None
+    return InMemoryVectorIndex(embedding_model, key=chunk_id, write_behind=writer)
+
+def write_chunks(store, chunks, vectors, fingerprints=DEDUP_ENABLED):
+    if isinstance(store, InMemoryVectorIndex):
+        return store.add(chunks, vectors)
+    return upsert_chunks(store, chunks, vectors, fingerprints=fingerprints)
+
+def finalize_store(store, deduplicator=None, ttl_seconds=CHROMA_TTL_SECONDS):
+    """
+    End-of-run bookkeeping: record duplicate URLs on kept chunks, prune
+    expired entries and persist. For an in-memory index the persistent part
+    is queued on its write-behind thread instead of blocking the run.
+    """
+    if isinstance(store, InMemoryVectorIndex):
+        if deduplicator is not None:
+            for rep in deduplicator.duplicates():
+                if rep["chunk"] is not None:
+                    store.update_metadata(chunk_id(rep["chunk"]), duplicate_urls=" ".join(sorted(rep["duplicate_urls"])))
+        if store.write_behind is not None:
+            store.write_behind.finalize(deduplicator)
+        return
+    try:
+        if deduplicator is not None:
+            annotate_duplicates(store, deduplicator)
+        prune_store(store, ttl_seconds)
+        store.persist()
+    except Exception as e:
+        logger.warning(f"Failed to finalize Chroma store: {e}")
+
+def embed_and_store_chunks(all_chunks, embedding_model, persist_dir="chroma_store",
+                           batch_size=EMBED_BATCH_SIZE, max_workers=EMBED_MAX_WORKERS, cache=None,
+                           collection_name=DEFAULT_COLLECTION, ttl_seconds=CHROMA_TTL_SECONDS,
+                           deduplicator=None):
+    """
+    Embeds all chunks exactly once using batched calls and upserts the
+    precomputed vectors into Chroma under stable chunk IDs, so repeated pages
+    replace their old entries instead of piling up. Chunks already in the
+    optional EmbeddingCache are not sent to the embedding API, and entries
+    older than `ttl_seconds` are pruned from the collection.
+    With a ChunkDeduplicator, exact and near-duplicate chunks are dropped
+    before embedding and their URLs recorded on the chunk that was kept.
+    """
+    if deduplicator is not None:
+        all_chunks = deduplicator.filter(all_chunks)
+    texts = [chunk["content"] for chunk in all_chunks]
+    vectors = embed_texts(texts, embedding_model, batch_size=batch_size,
+                          max_workers=max_workers, cache=cache)
+    embedded = sum(1 for vector in vectors if vector is not None)
+
+    if embedded < len(all_chunks):
+        logger.warning(f"Embedded {embedded} of {len(all_chunks)} chunks")
 
     try:
-        documents = [Document(page_content=chunk["content"], metadata=chunk["metadata"]) for chunk in embedded_chunks]
-        chroma_store = Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_model,
-            persist_directory=persist_dir
-        )
+        chroma_store = open_store(embedding_model, persist_dir=persist_dir, collection_name=collection_name)
+        upsert_chunks(chroma_store, all_chunks, vectors, fingerprints=deduplicator is not None)
+        if deduplicator is not None:
+            annotate_duplicates(chroma_store, deduplicator)
+        prune_store(chroma_store, ttl_seconds)
         chroma_store.persist()
         return chroma_store
     except Exception as e:
@@ -0,0 +1,164 @@
+# pipeline/embedder.py
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from agent.config import EMBED_BATCH_SIZE, EMBED_MAX_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_FLUSH_INTERVAL
+from agent.instrumentation import incr, propagate, span
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def _embed_batch(texts, embedding_model):
+    """
+    Embeds one batch with a single `embed_documents` call. If the batch call
+    fails, falls back to one call per text so a bad chunk only loses itself.
+    """
+    try:
+        with span("embed", size=len(texts)):
+            incr("api.embed")
+            vectors = embedding_model.embed_documents(texts)
+        if len(vectors) == len(texts):
+            return vectors
+        logger.warning(f"Embedding batch returned {len(vectors)} vectors for {len(texts)} chunks")
+    except Exception as e:
+        logger.warning(f"Batch embedding failed, retrying {len(texts)} chunks individually: {e}")
+
+    vectors = []
+    for text in texts:
+        try:
+            incr("api.embed")
+            vectors.append(embedding_model.embed_documents([text])[0])
+        except Exception as e:
+            logger.warning(f"Failed to embed chunk: {e}")
+            vectors.append(None)
+    return vectors
+
+def embedding_model_name(embedding_model):
+    return getattr(embedding_model, "model", None) or type(embedding_model).__name__
+
+def embed_texts(texts, embedding_model, batch_size=EMBED_BATCH_SIZE, max_workers=EMBED_MAX_WORKERS,
+                cache=None):
+    """
+    Embeds texts in batches, running up to `max_workers` batches in parallel.
+    When an EmbeddingCache is given, only cache misses are sent to the API.
+    Returns a list aligned with `texts`, holding None where embedding failed.
+    """
+    texts = list(texts)
+    model_name = embedding_model_name(embedding_model)
+    vectors = cache.get_many(texts, model_name) if cache is not None else [None] * len(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if cache is not None:
+        incr("cache.embedding.hit", len(texts) - len(missing))
+        incr("cache.embedding.miss", len(missing))
+    if not missing:
+        return vectors
+
+    missing_texts = [texts[i] for i in missing]
+    batch_size = max(1, batch_size)
+    batches = [missing_texts[i:i + batch_size] for i in range(0, len(missing_texts), batch_size)]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        results = executor.map(propagate(lambda batch: _embed_batch(batch, embedding_model)), batches)
+        fresh = [vector for batch in results for vector in batch]
+
+    for i, vector in zip(missing, fresh):
+        vectors[i] = vector
+
+    if cache is not None:
+        try:
+            cache.put_many(missing_texts, fresh, model_name)
+        except Exception as e:
+            logger.warning(f"Failed to update embedding cache: {e}")
+    return vectors
+
+_DONE = object()
+
+class EmbeddingWorker:
+    def __init__(self, embedding_model, write_batch, cache=None, batch_size=EMBED_BATCH_SIZE,
+                 num_threads=EMBED_MAX_WORKERS, max_queue=PIPELINE_QUEUE_SIZE,
+                 flush_interval=PIPELINE_FLUSH_INTERVAL):
+        """
+        Background consumer that embeds chunks while they are still being produced.
+
+        Chunks are submitted into a bounded queue (submitting blocks when the
+        queue is full, which throttles the producer), grouped into batches of
+        `batch_size` and passed with their vectors to `write_batch(chunks, vectors)`.
+        A partial batch is flushed after `flush_interval` seconds without new
+        chunks so a slow producer doesn't leave work sitting in the buffer.
+        """
+        self.embedding_model = embedding_model
+        self.write_batch = write_batch
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max(1, max_queue))
+        self.threads = [
+            threading.Thread(target=propagate(self._run), name=f"embed-{i}", daemon=True)
+            for i in range(max(1, num_threads))
+        ]
+        self.submitted = 0
+        self.stored = 0
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, chunks):
+        for chunk in chunks:
+            self.queue.put(chunk)
+            self.submitted += 1
+
+    def close(self):
+        """
+        Flush everything still queued and wait for the consumers to finish.
+        """
+        for _ in self.threads:
+            self.queue.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+        return self.stored
+
+    def _flush(self, batch):
+        try:
+            vectors = embed_texts([chunk["content"] for chunk in batch], self.embedding_model,
+                                  batch_size=len(batch), max_workers=1, cache=self.cache)
+            written = self.write_batch(batch, vectors)
+            with self._lock:
+                self.stored += written if written is not None else len(batch)
+        except Exception as e:
+            logger.error(f"[EmbeddingWorker] Failed to embed/store batch of {len(batch)}: {e}")
+            with self._lock:
+                self.errors.append(e)
+
+    def _run(self):
+        batch = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                continue
+
+            if item is _DONE:
+                if batch:
+                    self._flush(batch)
+                return
+
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
@@ -0,0 +1,125 @@
+# pipeline/fetch_scheduler.py
+
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from agent.config import FETCH_MAX_WORKERS, FETCH_MAX_PER_HOST, FETCH_HOST_DELAY
+from agent.instrumentation import propagate
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class FetchScheduler:
+    def __init__(self, max_workers: int = FETCH_MAX_WORKERS,
+                 max_per_host: int = FETCH_MAX_PER_HOST,
+                 host_delay: float = FETCH_HOST_DELAY):
+        """
+        Thread-pool fetch scheduler with a global concurrency cap, a per-host
+        concurrency cap and a minimum delay between request starts to the same host.
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+        self.host_delay = max(0.0, host_delay)
+        self._lock = threading.Lock()
+        self._next_start: Dict[str, float] = {}
+
+    def _wait_for_host_turn(self, host: str, stop: threading.Event) -> None:
+        """
+        Reserve the next start slot for a host and sleep until it comes up.
+        """
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start_at + self.host_delay
+        delay = start_at - now
+        if delay > 0:
+            stop.wait(delay)
+
+    def _run_one(self, fetch: Callable[[Any], Any], item: Any, host: str, stop: threading.Event) -> Any:
+        if stop.is_set():
+            return None
+        self._wait_for_host_turn(host, stop)
+        if stop.is_set():
+            return None
+        return fetch(item)
+
+    def run(self, items: Iterable[Any], fetch: Callable[[Any], Any],
+            url_of: Callable[[Any], str] = lambda item: item["link"]) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+        """
+        Fetch items concurrently and yield results in completion order.
+
+        Items are pulled lazily from `items`, so an expensive generator (e.g. one
+        that runs searches) is only advanced when a worker slot is free. Closing
+        the returned generator (or breaking out of a `with closing(...)` block)
+        cancels every fetch that has not started yet.
+
+        Args:
+            items (Iterable): Work items, typically search result dicts.
+            fetch (Callable): Called in a worker thread with one item.
+            url_of (Callable): Extracts the URL used for per-host limits.
+
+        Yields:
+            Tuple[item, result, error]: `error` is the raised exception, if any.
+        """
+        stop = threading.Event()
+        source = iter(items)
+        source_exhausted = False
+        deferred: deque = deque()
+        host_counts: Dict[str, int] = defaultdict(int)
+        in_flight = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch")
+
+        def next_ready():
+            nonlocal source_exhausted
+            for _ in range(len(deferred)):
+                item, host = deferred.popleft()
+                if host_counts[host] < self.max_per_host:
+                    return item, host
+                deferred.append((item, host))
+
+            # Don't drain a lazy source just to find a free host
+            while not source_exhausted and len(deferred) < self.max_workers * 4:
+                try:
+                    item = next(source)
+                except StopIteration:
+                    source_exhausted = True
+                    break
+                host = urlparse(url_of(item)).netloc.lower()
+                if host_counts[host] < self.max_per_host:
+                    return item, host
+                deferred.append((item, host))
+            return None
+
+        try:
+            while True:
+                while len(in_flight) < self.max_workers:
+                    ready = next_ready()
+                    if ready is None:
+                        break
+                    item, host = ready
+                    host_counts[host] += 1
+                    future = executor.submit(propagate(self._run_one), fetch, item, host, stop)
+                    in_flight[future] = (item, host)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, host = in_flight.pop(future)
+                    host_counts[host] -= 1
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        logger.warning(f"[FetchScheduler] Fetch failed for {url_of(item)}: {e}")
+                        result, error = None, e
+                    yield item, result, error
+        finally:
+            stop.set()
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
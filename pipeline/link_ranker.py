@@ -1,32 +1,94 @@
 # pipeline/link_ranker.py
 
-from typing import List
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import re
+from typing import Dict, List, Tuple, Union
+from urllib.parse import urlparse, unquote
+from sklearn.feature_extraction.text import HashingVectorizer, ENGLISH_STOP_WORDS
+import logging
 
-def rank_links_by_query(links: List[str], query: str, top_k: int = 5) -> List[str]:
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+URL_NOISE = {"www", "http", "https", "html", "htm", "php", "asp", "aspx", "jsp", "index", "amp"}
+
+def tokenize_link_text(text: str) -> List[str]:
+    """
+    Split text (including URL paths like /blogPosts/rocket-pricing_2025.html)
+    into lowercase word tokens without stopwords or URL boilerplate.
+    """
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", unquote(text))
+    tokens = re.findall(r"[a-z0-9]+", text.lower())
+    return [token for token in tokens if token not in ENGLISH_STOP_WORDS and token not in URL_NOISE]
+
+def _url_text(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.path} {parsed.query}"
+
+class LinkRanker:
+    def __init__(self, query: str, threshold: float = 0.3, context_weight: float = 0.3,
+                 n_features: int = 2 ** 18):
+        """
+        Query-bound link scorer, built once per query and reused for every page
+        of a crawl. Uses a stateless hashing vectorizer, so there is nothing to
+        refit per page; only the query vector is computed up front.
+
+        A link is described by its URL path and anchor text, plus the text
+        surrounding the anchor (weighted by `context_weight`). Links scoring
+        below `threshold` cosine similarity are not followed.
+        """
+        self.query = query
+        self.threshold = threshold
+        self.context_weight = context_weight
+        self.vectorizer = HashingVectorizer(
+            analyzer=tokenize_link_text, n_features=n_features,
+            alternate_sign=False, norm="l2"
+        )
+        self.query_vec = self.vectorizer.transform([query])
+
+    def score(self, links: List[Dict[str, str]]) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Score links against the query.
+
+        Args:
+            links (List[Dict]): Dicts with 'url' and optional 'anchor' and 'context'.
+
+        Returns:
+            List[Tuple[Dict, float]]: (link, score) pairs, best first.
+        """
+        if not links:
+            return []
+
+        try:
+            primary = [f"{_url_text(link['url'])} {link.get('anchor', '')}" for link in links]
+            context = [link.get("context", "") for link in links]
+            primary_scores = (self.vectorizer.transform(primary) @ self.query_vec.T).toarray().ravel()
+            context_scores = (self.vectorizer.transform(context) @ self.query_vec.T).toarray().ravel()
+            scores = (1 - self.context_weight) * primary_scores + self.context_weight * context_scores
+            return sorted(zip(links, scores.tolist()), key=lambda pair: pair[1], reverse=True)
+        except Exception as e:
+            logger.warning(f"[LinkRanker] Failed to score links: {e}")
+            return [(link, 0.0) for link in links]
+
+    def rank(self, links: List[Dict[str, str]], top_k: int = 5) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Best `top_k` links whose score clears the similarity threshold.
+        """
+        return [(link, score) for link, score in self.score(links) if score >= self.threshold][:top_k]
+
+def rank_links_by_query(links: List[Union[str, Dict[str, str]]], query: str, top_k: int = 5,
+                        threshold: float = 0.3) -> List[str]:
     """
-    Rank internal links based on relevance to the query using TF-IDF cosine similarity.
+    Rank internal links based on relevance to the query.
 
     Args:
-        links (List[str]): Anchor texts or hrefs to rank.
+        links (List[str | Dict]): Hrefs, or link dicts with anchor/context text.
         query (str): User's question or topic.
         top_k (int): Number of top links to return.
+        threshold (float): Minimum cosine similarity for a link to be kept.
 
     Returns:
         List[str]: Ranked list of links most relevant to the query.
     """
-    if not links:
-        return []
-
-    try:
-        vectorizer = TfidfVectorizer().fit([query] + links)
-        vectors = vectorizer.transform([query] + links)
-        query_vec = vectors[0]
-        link_vecs = vectors[1:]
-        scores = cosine_similarity(query_vec, link_vecs).flatten()
-        ranked_links = [link for _, link in sorted(zip(scores, links), reverse=True)]
-        return ranked_links[:top_k]
-    except Exception as e:
-        print(f"[LinkRanker] Failed to rank links: {e}")
-        return links[:top_k]
+    link_dicts = [link if isinstance(link, dict) else {"url": link} for link in links]
+    ranked = LinkRanker(query, threshold=threshold).rank(link_dicts, top_k=top_k)
+    return [link["url"] for link, _ in ranked]
@@ -0,0 +1,131 @@
+# pipeline/memory_index.py
+
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from agent.instrumentation import incr, span
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class InMemoryVectorIndex:
+    def __init__(self, embedding_model, key=None, write_behind=None, initial_capacity=256):
+        """
+        Process-local vector index for one research run: normalized float32
+        vectors in one contiguous matrix, searched by brute-force dot product.
+        For the few hundred chunks of a run this beats a round trip through
+        Chroma's SQLite store and keeps disk writes off the request path.
+
+        Args:
+            embedding_model: Embeds retrieval queries (`embed_query`).
+            key (callable): Chunk -> ID; chunks with an existing ID replace it.
+            write_behind: Optional object whose `upsert(chunks, vectors)` is
+                called after each add, e.g. a ChromaWriteBehind that persists
+                the chunks in the background.
+        """
+        self.embedding_model = embedding_model
+        self.key = key
+        self.write_behind = write_behind
+        self._matrix = None
+        self._capacity = initial_capacity
+        self._ids = {}
+        self._documents = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def _row_for(self, chunk_key, dim):
+        if self._matrix is None:
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        row = self._ids.get(chunk_key)
+        if row is not None:
+            return row
+        row = len(self._documents)
+        if row == self._matrix.shape[0]:
+            grown = np.zeros((row * 2, dim), dtype=np.float32)
+            grown[:row] = self._matrix
+            self._matrix = grown
+        self._documents.append(None)
+        if chunk_key is not None:
+            self._ids[chunk_key] = row
+        return row
+
+    def add(self, chunks, vectors):
+        """
+        Adds chunks with their precomputed vectors, skipping chunks whose
+        embedding failed. Returns the number of chunks written.
+        """
+        pairs = [(chunk, vector) for chunk, vector in zip(chunks, vectors) if vector is not None]
+        if not pairs:
+            return 0
+        matrix = np.asarray([vector for _, vector in pairs], dtype=np.float32)
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1), 1e-12)[:, None]
+
+        with self._lock:
+            for (chunk, _), vector in zip(pairs, matrix):
+                row = self._row_for(self.key(chunk) if self.key else None, matrix.shape[1])
+                self._matrix[row] = vector
+                self._documents[row] = Document(page_content=chunk["content"], metadata=dict(chunk["metadata"]))
+
+        if self.write_behind is not None:
+            self.write_behind.upsert([chunk for chunk, _ in pairs], [vector for _, vector in pairs])
+        return len(pairs)
+
+    def update_metadata(self, chunk_key, **fields):
+        with self._lock:
+            row = self._ids.get(chunk_key)
+            if row is not None:
+                self._documents[row].metadata.update(fields)
+
+    def search(self, query_vector, k=4, urls=None):
+        """
+        Top-k chunks by cosine similarity, optionally restricted to `urls`.
+
+        Returns:
+            List[Tuple[Document, float]]: Best first.
+        """
+        with self._lock:
+            count = len(self._documents)
+            if count == 0:
+                return []
+            matrix = self._matrix[:count]
+            documents = list(self._documents)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ (query / max(np.linalg.norm(query), 1e-12))
+        if urls is not None:
+            allowed = set(urls)
+            mask = np.fromiter((doc.metadata.get("url") in allowed for doc in documents), dtype=bool, count=count)
+            scores = np.where(mask, scores, -np.inf)
+            count = int(mask.sum())
+        k = min(k, count)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top]
+
+    def as_retriever(self, search_kwargs=None):
+        """
+        Retriever with the interface `generate_answer` uses, accepting the same
+        `search_kwargs` as Chroma's: 'k' and a {'url': {'$in': [...]}} filter.
+        """
+        search_kwargs = search_kwargs or {}
+        urls = search_kwargs.get("filter", {}).get("url", {}).get("$in")
+        return InMemoryRetriever(self, k=search_kwargs.get("k", 4), urls=urls)
+
+class InMemoryRetriever:
+    def __init__(self, index, k=4, urls=None):
+        self.index = index
+        self.k = k
+        self.urls = urls
+
+    def get_relevant_documents(self, query):
+        with span("embed", size=1):
+            incr("api.embed")
+            query_vector = self.index.embedding_model.embed_query(query)
+        return [doc for doc, _ in self.index.search(query_vector, k=self.k, urls=self.urls)]
+
+    invoke = get_relevant_documents
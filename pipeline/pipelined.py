@@ -0,0 +1,70 @@
+# pipeline/pipelined.py
+
+from agent.config import EMBED_BATCH_SIZE, EMBED_MAX_WORKERS, CHROMA_TTL_SECONDS
+from pipeline.embedder import EmbeddingWorker
+from pipeline.embed_and_store import open_run_store, write_chunks, finalize_store, DEFAULT_COLLECTION
+from pipeline.search_and_scrape import search_and_scrape
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+def scrape_and_embed(keyword_chunks, search_tool, scraper, chunker, user_query, embedding_model,
+                     max_links=4, max_pages=3, max_crawl_depth=2, max_crawl_pages=3,
+                     cache=None, persist_dir="chroma_store", collection_name=DEFAULT_COLLECTION,
+                     batch_size=EMBED_BATCH_SIZE, embed_threads=EMBED_MAX_WORKERS,
+                     ttl_seconds=CHROMA_TTL_SECONDS, on_event=None, deduplicator=None,
+                     dedup_against_store=False, matched_urls=None, backend="chroma", write_behind=True):
+    """
+    Runs search/scrape and embedding as overlapping stages: every page's
+    chunks go into a bounded queue the moment the page is chunked, and
+    EmbeddingWorker threads embed and upsert them while fetching continues.
+    `on_event` is forwarded to search_and_scrape for progress reporting.
+
+    With a ChunkDeduplicator, duplicate chunks are dropped before they are
+    queued for embedding (also against the store if `dedup_against_store`),
+    and the URLs they came from are recorded on the kept chunks at the end.
+    URLs of the kept chunks that stood in for duplicates go into `matched_urls`.
+
+    With `backend="memory"` chunks go into an InMemoryVectorIndex, copied to
+    Chroma in the background if `write_behind`; store dedup needs "chroma".
+
+    Returns:
+        Tuple[list, list, store | None]: scraped results, all chunks, and the
+        Chroma store or in-memory index (None if nothing could be stored).
+    """
+    store = open_run_store(embedding_model, backend=backend, persist_dir=persist_dir,
+                           collection_name=collection_name, write_behind=write_behind, ttl_seconds=ttl_seconds,
+                           fingerprints=deduplicator is not None)
+    if deduplicator is not None and dedup_against_store and backend == "chroma":
+        deduplicator.store = store
+    worker = EmbeddingWorker(
+        embedding_model,
+        write_batch=lambda chunks, vectors: write_chunks(store, chunks, vectors,
+                                                         fingerprints=deduplicator is not None),
+        cache=cache, batch_size=batch_size, num_threads=embed_threads
+    )
+
+    on_chunks = worker.submit
+    if deduplicator is not None:
+        on_chunks = lambda chunks: worker.submit(deduplicator.filter(chunks, matched_urls))
+
+    with worker:
+        scraped_results, all_chunks = search_and_scrape(
+            keyword_chunks, search_tool, scraper, chunker, user_query,
+            max_links=max_links, max_pages=max_pages,
+            max_crawl_depth=max_crawl_depth, max_crawl_pages=max_crawl_pages,
+            on_chunks=on_chunks, on_event=on_event
+        )
+
+    if worker.errors:
+        logger.warning(f"{len(worker.errors)} embedding batches failed; stored {worker.stored} of {worker.submitted} chunks")
+    # Every chunk may have been a duplicate of stored content; only fail if embedding did
+    if worker.submitted and worker.stored == 0:
+        logger.error("Failed to store any embeddings")
+        return scraped_results, all_chunks, None
+
+    if deduplicator is not None:
+        logger.info(f"Dropped {deduplicator.dropped} duplicate chunks, embedding {deduplicator.kept}")
+    finalize_store(store, deduplicator, ttl_seconds)
+    return scraped_results, all_chunks, store
@@ -1,8 +1,8 @@
 
 from agent.query_analyzer import QueryAnalyzer
 
-def analyze_query(user_query: str):
-    analyzer = QueryAnalyzer()
+def analyze_query(user_query: str, cache=None):
+    analyzer = QueryAnalyzer(cache=cache)
     metadata = analyzer.analyze_query(user_query)
     keyword_chunks = metadata.get("KeywordChunks", [[user_query]])
     return keyword_chunks
@@ -0,0 +1,222 @@
+# pipeline/reranker.py
+
+import google.generativeai as genai
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from agent.config import SCORING_MAX_WORKERS
+from agent.instrumentation import incr, propagate
+from agent.rate_limiter import gemini_limiter
+from pipeline.embedder import embed_texts
+import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCORING_MODES = ("batch", "concurrent")
+
+def _to_entries(docs, scores, relevance=None):
+    entries = [{
+        "doc": doc,
+        "url": doc.metadata.get("url", "No URL"),
+        "score": score,
+        "relevance": float(relevance[i]) if relevance is not None else float(score)
+    } for i, (doc, score) in enumerate(zip(docs, scores))]
+    entries.sort(key=lambda x: x["relevance"], reverse=True)
+    return entries
+
+def _score_one(model, doc, user_query):
+    """
+    Scores a single document with its own Gemini call.
+    """
+    url = doc.metadata.get("url", "No URL")
+    snippet = doc.page_content[:500]
+
+    prompt = f"""
+    You are a relevance evaluator assistant.
+
+    Given the user's query and a document snippet, score how relevant this document is (1 to 5 scale):
+
+    User Query:
+    \"\"\"{user_query}\"\"\"
+
+    Document Snippet:
+    \"\"\"{snippet}\"\"\"
+
+    Return a single number (1-5):
+    """
+
+    try:
+        gemini_limiter.acquire()
+        incr("api.gemini")
+        response = model.generate_content(prompt)
+        score = int("".join(filter(str.isdigit, response.text.strip())))
+        return min(5, max(1, score))
+    except Exception as e:
+        logger.warning(f"Scoring failed for URL {url}: {e}")
+        return 3  # Default fallback score
+
+def _parse_score_array(text, expected):
+    """
+    Pulls the first JSON array out of a model response and validates it
+    holds `expected` scores. Returns None if the response is unusable.
+    """
+    match = re.search(r"\[[^\[\]]*\]", text)
+    if not match:
+        return None
+    try:
+        values = json.loads(match.group(0))
+        if len(values) != expected:
+            return None
+        return [min(5, max(1, int(round(float(value))))) for value in values]
+    except (ValueError, TypeError):
+        return None
+
+def _score_batch(model, docs, user_query):
+    """
+    Scores every document in one Gemini round trip. Returns None on failure.
+    """
+    snippets = "\n\n".join(
+        f"[{i + 1}]\n\"\"\"{doc.page_content[:500]}\"\"\"" for i, doc in enumerate(docs)
+    )
+    prompt = f"""
+    You are a relevance evaluator assistant.
+
+    Given the user's query and {len(docs)} numbered document snippets, score how relevant each document is (1 to 5 scale):
+
+    User Query:
+    \"\"\"{user_query}\"\"\"
+
+    Document Snippets:
+    {snippets}
+
+    Return only a JSON array of {len(docs)} integers (1-5), one per document in the order given, e.g. [4, 2, 5]:
+    """
+
+    try:
+        gemini_limiter.acquire()
+        incr("api.gemini")
+        response = model.generate_content(prompt)
+        scores = _parse_score_array(response.text.strip(), len(docs))
+        if scores is None:
+            logger.warning("Batch scoring returned an unparseable response")
+        return scores
+    except Exception as e:
+        logger.warning(f"Batch scoring failed: {e}")
+        return None
+
+def score_documents_with_gemini(docs, user_query, mode="batch", max_workers=SCORING_MAX_WORKERS):
+    """
+    Uses Gemini to rate how relevant each document is to the user's query (scale 1–5).
+
+    Args:
+        docs: Retrieved LangChain documents.
+        user_query (str): The user's question.
+        mode (str): "batch" scores all snippets in one call and falls back to
+            "concurrent" if the response can't be parsed; "concurrent" issues
+            one call per document with up to `max_workers` in flight.
+        max_workers (int): Parallel calls in concurrent mode.
+    """
+    if mode not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode: {mode}")
+
+    model = genai.GenerativeModel("gemini-2.0-pro-exp-02-05")
+    docs = list(docs)
+    scores = _score_batch(model, docs, user_query) if mode == "batch" and docs else None
+
+    if scores is None and docs:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(docs)))) as executor:
+            scores = list(executor.map(propagate(lambda doc: _score_one(model, doc, user_query)), docs))
+
+    return _to_entries(docs, scores or [])
+
+class Reranker(ABC):
+    """
+    Scores retrieved documents for a query.
+
+    `score` returns entries sorted best-first, each a dict with 'doc', 'url',
+    an integer 'score' on the 1–5 scale shown in the UI, and a float
+    'relevance' used for ordering. This is the shape `build_context`
+    and the relevance expander consume.
+    """
+    @abstractmethod
+    def score(self, docs, user_query):
+        ...
+
+class GeminiReranker(Reranker):
+    def __init__(self, mode="batch", max_workers=SCORING_MAX_WORKERS):
+        self.mode = mode
+        self.max_workers = max_workers
+
+    def score(self, docs, user_query):
+        return score_documents_with_gemini(docs, user_query, mode=self.mode, max_workers=self.max_workers)
+
+def _tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def bm25_scores(texts, query, k1=1.5, b=0.75):
+    """
+    BM25 of `query` against each text, with IDF taken over the candidate set.
+    Computed as one (documents x query terms) matrix operation.
+    """
+    terms = list(dict.fromkeys(_tokenize(query)))
+    if not texts or not terms:
+        return np.zeros(len(texts), dtype=np.float32)
+
+    tokenized = [Counter(_tokenize(text)) for text in texts]
+    tf = np.array([[counts[term] for term in terms] for counts in tokenized], dtype=np.float32)
+    lengths = np.array([sum(counts.values()) for counts in tokenized], dtype=np.float32)
+
+    n_docs = len(texts)
+    df = (tf > 0).sum(axis=0)
+    idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+    norm = k1 * (1.0 - b + b * lengths / max(lengths.mean(), 1.0))
+    return ((tf * (k1 + 1.0)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+def _min_max(values):
+    spread = values.max() - values.min() if len(values) else 0.0
+    if spread <= 0:
+        return np.zeros_like(values)
+    return (values - values.min()) / spread
+
+class LocalReranker(Reranker):
+    def __init__(self, embedding_model, cache=None, semantic_weight=0.7):
+        """
+        Zero-LLM reranker: cosine similarity between the query embedding and
+        the chunk embeddings, blended with BM25 over the chunk text.
+
+        Chunk vectors come from the EmbeddingCache when given (they were
+        computed at store time), so normally only the query is embedded.
+        """
+        self.embedding_model = embedding_model
+        self.cache = cache
+        self.semantic_weight = semantic_weight
+
+    def score(self, docs, user_query):
+        docs = list(docs)
+        if not docs:
+            return []
+        texts = [doc.page_content for doc in docs]
+
+        semantic = np.zeros(len(docs), dtype=np.float32)
+        try:
+            vectors = embed_texts(texts, self.embedding_model, cache=self.cache)
+            incr("api.embed")
+            query_vec = np.asarray(self.embedding_model.embed_query(user_query), dtype=np.float32)
+            dim = query_vec.shape[0]
+            matrix = np.array([v if v is not None else np.zeros(dim) for v in vectors], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1) * max(np.linalg.norm(query_vec), 1e-12)
+            semantic = np.clip(matrix @ query_vec / np.maximum(norms, 1e-12), 0.0, 1.0)
+        except Exception as e:
+            logger.warning(f"Embedding similarity unavailable, using BM25 only: {e}")
+            weight = 0.0
+        else:
+            weight = self.semantic_weight
+
+        lexical = _min_max(bm25_scores(texts, user_query))
+        relevance = weight * semantic + (1.0 - weight) * lexical
+        scores = [int(round(1 + 4 * value)) for value in relevance]
+        return _to_entries(docs, scores, relevance)
@@ -0,0 +1,373 @@
+# pipeline/research.py
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from dataclasses import asdict, dataclass, field, replace
+import google.generativeai as genai
+from agent.config import (GOOGLE_CSE_API_KEY, GOOGLE_CSE_CX, GEMINI_API_KEY,
+                          SEARCH_CACHE_TTL, QUERY_PLAN_TTL, INSTRUMENTATION_EXPORT_PATH, CONTEXT_CANDIDATES,
+                          DEDUP_ENABLED, DEDUP_AGAINST_STORE, VECTOR_STORE_BACKEND, VECTOR_STORE_WRITE_BEHIND)
+from agent.instrumentation import incr, start_trace
+from agent.query_analyzer import normalize_query
+from agent.search_tool import GoogleCSESearchTool
+from agent.scraper_tool import WebScraperTool
+from agent.chunker import TextChunker
+from agent.embedding_cache import EmbeddingCache
+from agent.answer_cache import AnswerCache
+from agent.page_cache import PageCache
+from agent.ttl_cache import TTLCache
+from pipeline.query_handler import analyze_query
+from pipeline.pipelined import scrape_and_embed
+from pipeline.embed_and_store import build_retriever, collection_for_query, DEFAULT_COLLECTION, STORE_BACKENDS
+from pipeline.embedder import embed_texts, embedding_model_name
+from pipeline.dedup import ChunkDeduplicator
+from pipeline.answer_generator import generate_answer
+from pipeline.reranker import GeminiReranker, LocalReranker
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCORING_CHOICES = ("batch", "concurrent", "local")
+NAMESPACE_CHOICES = ("shared", "per_query")
+
+# genai.configure() sets one process-wide key; pipelines built for different
+# keys (e.g. one per Streamlit user) take turns holding it while they run
+_gemini_key_condition = threading.Condition()
+_gemini_key = None
+_gemini_key_users = 0
+
+@contextmanager
+def gemini_key(api_key):
+    """
+    Hold the process-wide Gemini key set to `api_key` for the duration of the
+    block. Runs with the same key proceed concurrently; a run with another
+    key waits for them to finish, then reconfigures genai.
+    """
+    global _gemini_key, _gemini_key_users
+    with _gemini_key_condition:
+        while _gemini_key_users and _gemini_key != api_key:
+            _gemini_key_condition.wait()
+        if _gemini_key != api_key:
+            genai.configure(api_key=api_key)
+            _gemini_key = api_key
+        _gemini_key_users += 1
+    try:
+        yield
+    finally:
+        with _gemini_key_condition:
+            _gemini_key_users -= 1
+            _gemini_key_condition.notify_all()
+# Settings that can differ between runs sharing one pipeline's tools and caches
+RUN_SETTINGS = ("num_links", "max_pages", "max_crawl_depth", "max_crawl_pages", "store_namespace",
+                "restrict_to_run", "scoring_mode", "dedup", "dedup_against_store", "store_backend",
+                "write_behind")
+
+@dataclass
+class ResearchResult:
+    query: str
+    answer: str = ""
+    sources: List[Dict] = field(default_factory=list)
+    scores: List[Dict] = field(default_factory=list)
+    scraped_results: List[Dict] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    context: Dict[str, int] = field(default_factory=dict)
+    trace: Dict[str, Dict] = field(default_factory=dict)
+    cached: bool = False
+    cached_query: Optional[str] = None
+    similarity: Optional[float] = None
+    created_at: Optional[float] = None
+    error: Optional[str] = None
+    reused: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_cache(cls, query, cached):
+        """
+        Result for `query` served from an AnswerCache entry.
+        """
+        return cls(query=query, answer=cached["answer"], sources=cached["sources"],
+                   scores=cached["scores"], cached=True, cached_query=cached["query"],
+                   similarity=cached["similarity"], created_at=cached["created_at"])
+
+    @property
+    def includes_deeper_pages(self):
+        return any(r.get("page", 1) > 1 for r in self.scraped_results)
+
+    def to_dict(self):
+        return asdict(self)
+
+class StageMemo:
+    def __init__(self, max_entries=16):
+        """
+        Bounded LRU of stage outputs keyed by (stage, query, settings), e.g.
+        kept per Streamlit session so a rerun only repeats the stages whose
+        settings changed. Values are returned as stored, not copied.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class ResearchPipeline:
+    def __init__(self, gemini_api_key=None, cse_api_key=GOOGLE_CSE_API_KEY, cse_id=GOOGLE_CSE_CX,
+                 num_links=4, max_pages=3, max_crawl_depth=2, max_crawl_pages=2,
+                 store_namespace="shared", restrict_to_run=True, scoring_mode="batch",
+                 persist_dir="chroma_store", use_answer_cache=True, embedding_model=None,
+                 trace_path=INSTRUMENTATION_EXPORT_PATH, dedup=DEDUP_ENABLED,
+                 dedup_against_store=DEDUP_AGAINST_STORE, store_backend=VECTOR_STORE_BACKEND,
+                 write_behind=VECTOR_STORE_WRITE_BEHIND):
+        """
+        Headless research pipeline: analyze → search/scrape/embed → score →
+        synthesize, with no UI dependencies. Tools and caches are built once
+        and reused by every `run`, so one instance can serve many queries.
+
+        Args:
+            store_namespace (str): "shared" collection or a "per_query" one.
+            restrict_to_run (bool): Retrieve only from pages fetched in this run.
+            scoring_mode (str): "batch" / "concurrent" Gemini scoring, or "local".
+            use_answer_cache (bool): Serve near-duplicate questions from the AnswerCache.
+            trace_path (str): Append each run's spans and counters to this JSONL file.
+            dedup (bool): Drop exact and near-duplicate chunks before embedding.
+            dedup_against_store (bool): Also drop chunks already in the vector store.
+            store_backend (str): "memory" retrieves from an in-process index of
+                the run's chunks, "chroma" from the persistent store.
+            write_behind (bool): With "memory", copy chunks to Chroma in the background.
+        """
+        api_key = gemini_api_key or GEMINI_API_KEY
+        self.api_key = api_key  # applied per run, see gemini_key()
+
+        self.num_links = num_links
+        self.max_pages = max_pages
+        self.max_crawl_depth = max_crawl_depth
+        self.max_crawl_pages = max_crawl_pages
+        self.store_namespace = store_namespace
+        self.restrict_to_run = restrict_to_run
+        self.scoring_mode = scoring_mode
+        self.persist_dir = persist_dir
+        self.trace_path = trace_path
+        self.dedup = dedup
+        self.dedup_against_store = dedup_against_store
+        self.store_backend = store_backend
+        self.write_behind = write_behind
+        self._validate()
+
+        self.search_tool = GoogleCSESearchTool(api_key=cse_api_key, cse_id=cse_id,
+                                               cache=TTLCache("search", ttl=SEARCH_CACHE_TTL))
+        self.scraper = WebScraperTool(page_cache=PageCache())
+        self.chunker = TextChunker()
+        if embedding_model is None:
+            # Deferred: langchain_google_genai is slow to import and unused with a custom model
+            from langchain_google_genai import GoogleGenerativeAIEmbeddings
+            embedding_model = GoogleGenerativeAIEmbeddings(model="models/text-embedding-004",
+                                                           google_api_key=api_key)
+        self.embedding_model = embedding_model
+        self.embedding_cache = EmbeddingCache()
+        self.plan_cache = TTLCache("query_plans", ttl=QUERY_PLAN_TTL)
+        self.answer_cache = AnswerCache() if use_answer_cache else None
+
+    def _validate(self):
+        if self.scoring_mode not in SCORING_CHOICES:
+            raise ValueError(f"Unknown scoring mode: {self.scoring_mode}")
+        if self.store_namespace not in NAMESPACE_CHOICES:
+            raise ValueError(f"Unknown store namespace: {self.store_namespace}")
+        if self.store_backend not in STORE_BACKENDS:
+            raise ValueError(f"Unknown store backend: {self.store_backend}")
+
+    def with_settings(self, **settings):
+        """
+        Copy of this pipeline with different RUN_SETTINGS, sharing its tools,
+        embedding model and caches, so changing a setting rebuilds nothing.
+        """
+        unknown = set(settings) - set(RUN_SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown run settings: {', '.join(sorted(unknown))}")
+        pipeline = copy.copy(self)
+        pipeline.__dict__.update(settings)
+        pipeline._validate()
+        return pipeline
+
+    def make_reranker(self):
+        if self.scoring_mode == "local":
+            return LocalReranker(self.embedding_model, cache=self.embedding_cache)
+        return GeminiReranker(mode=self.scoring_mode)
+
+    def backend_for_run(self, store_backend=None):
+        """
+        The in-memory index only holds the run's own chunks, so retrieval
+        across the whole store, or skipping chunks already stored, needs Chroma.
+        """
+        backend = store_backend or self.store_backend
+        if backend == "memory" and (not self.restrict_to_run or self.dedup_against_store):
+            return "chroma"
+        return backend
+
+    def lookup_cached(self, user_query, query_vector, model_name, force_refresh=False):
+        if query_vector is None or force_refresh:
+            return None
+        cached = self.answer_cache.lookup(query_vector, model_name)
+        incr("cache.answer.hit" if cached is not None else "cache.answer.miss")
+        return cached
+
+    def _memo_keys(self, user_query, backend):
+        # Scraped pages and the store depend on these settings; the answer also on the last two
+        scrape_key = ("scrape_embed", normalize_query(user_query), self.num_links, self.max_pages,
+                      self.max_crawl_depth, self.max_crawl_pages, self.store_namespace, backend,
+                      self.dedup, self.dedup_against_store)
+        return scrape_key, ("answer",) + scrape_key[1:] + (self.restrict_to_run, self.scoring_mode)
+
+    def run(self, user_query, force_refresh=False, on_event=None, store_backend=None, memo=None):
+        """
+        Research one question end to end, recording an instrumentation trace
+        whose per-stage summary is returned in `ResearchResult.trace`.
+        `store_backend` overrides the pipeline's retrieval backend for this run.
+
+        With a StageMemo, a run whose query and settings match an earlier one
+        returns that result, and one that only changes retrieval or scoring
+        settings reuses the earlier scrape/embed output and store; the stages
+        reused are listed in `ResearchResult.reused`. `force_refresh` skips it.
+
+        `on_event(name, payload)` is called on the calling thread with progress:
+        'stage' ({'name'}), 'cache_hit', 'memo_hit' ({'stages'}), 'source',
+        'crawl_failed' and 'token' ({'text'}). Sources are replayed on a memo hit.
+
+        Returns:
+            ResearchResult: Answer, sources, scores, per-stage timings and
+            the size of the synthesis context.
+            Failures are reported in `error` rather than raised.
+        """
+        with gemini_key(self.api_key), start_trace("research", export_path=self.trace_path) as trace:
+            result = self._run(user_query, force_refresh, on_event, store_backend, memo)
+        result.trace = trace.summary()
+        return result
+
+    def _run(self, user_query, force_refresh, on_event, store_backend, memo):
+        emit = on_event or (lambda name, payload: None)
+        result = ResearchResult(query=user_query)
+        run_started = time.perf_counter()
+        backend = self.backend_for_run(store_backend)
+        scrape_key, answer_key = self._memo_keys(user_query, backend)
+        use_memo = memo is not None and not force_refresh
+
+        def stage(name):
+            emit("stage", {"name": name})
+            return time.perf_counter()
+
+        def replay(stages, scraped):
+            incr("memo.hit")
+            emit("memo_hit", {"stages": stages})
+            for source in scraped["sources"]:
+                emit("source", source)
+
+        scraped = memo.get(scrape_key) if use_memo else None
+        if scraped is not None:
+            answered = memo.get(answer_key)
+            if answered is not None:
+                replay(["analyze", "scrape_embed", "answer"], scraped)
+                stage("answer")
+                return replace(answered, reused=["analyze", "scrape_embed", "answer"],
+                               timings={"total": time.perf_counter() - run_started})
+
+        try:
+            model_name = embedding_model_name(self.embedding_model)
+            query_vector = None
+            # A memoized scrape means settings changed for this query; answer afresh
+            if self.answer_cache is not None and scraped is None:
+                started = stage("cache_lookup")
+                query_vector = embed_texts([user_query], self.embedding_model, cache=self.embedding_cache)[0]
+                cached = self.lookup_cached(user_query, query_vector, model_name, force_refresh)
+                result.timings["cache_lookup"] = time.perf_counter() - started
+                if cached is not None:
+                    timings = result.timings
+                    result = ResearchResult.from_cache(user_query, cached)
+                    result.timings = timings
+                    emit("cache_hit", cached)
+                    return result
+
+            if scraped is not None:
+                replay(["analyze", "scrape_embed"], scraped)
+                result.reused = ["analyze", "scrape_embed"]
+            else:
+                started = stage("analyze")
+                keyword_chunks = analyze_query(user_query, cache=self.plan_cache)
+                result.timings["analyze"] = time.perf_counter() - started
+
+                started = stage("scrape_embed")
+                collection_name = (collection_for_query(user_query) if self.store_namespace == "per_query"
+                                   else DEFAULT_COLLECTION)
+                deduplicator = ChunkDeduplicator() if self.dedup else None
+                matched_urls = set()
+                sources = []
+
+                def on_scrape_event(name, payload):
+                    if name == "source":
+                        sources.append(payload)
+                    emit(name, payload)
+
+                # Scraping and embedding overlap: chunks are embedded as pages arrive
+                scraped_results, all_chunks, store = scrape_and_embed(
+                    keyword_chunks, self.search_tool, self.scraper, self.chunker, user_query, self.embedding_model,
+                    max_links=self.num_links, max_pages=self.max_pages,
+                    max_crawl_depth=self.max_crawl_depth, max_crawl_pages=self.max_crawl_pages,
+                    cache=self.embedding_cache, persist_dir=self.persist_dir,
+                    collection_name=collection_name, on_event=on_scrape_event,
+                    deduplicator=deduplicator, dedup_against_store=self.dedup_against_store,
+                    matched_urls=matched_urls, backend=backend, write_behind=self.write_behind
+                )
+                result.timings["scrape_embed"] = time.perf_counter() - started
+                if not scraped_results:
+                    result.error = "No pages could be fetched for this query."
+                    return result
+                if store is None:
+                    result.scraped_results = scraped_results
+                    result.error = "Failed to embed and store documents."
+                    return result
+                scraped = {"scraped_results": scraped_results, "chunks": all_chunks, "store": store,
+                           "matched_urls": matched_urls, "sources": sources}
+                if memo is not None:
+                    memo.put(scrape_key, scraped)
+
+            scraped_results, store = scraped["scraped_results"], scraped["store"]
+            result.scraped_results = scraped_results
+
+            stage("answer")
+            run_urls = None
+            if self.restrict_to_run:
+                run_urls = ([chunk["metadata"]["url"] for chunk in scraped["chunks"]]
+                            + sorted(scraped["matched_urls"]))
+            retriever = build_retriever(store, k=CONTEXT_CANDIDATES, urls=run_urls)
+            answer = generate_answer(user_query, retriever, reranker=self.make_reranker(),
+                                     on_token=lambda text: emit("token", {"text": text}))
+            result.answer = answer["answer"]
+            result.sources = answer["sources"]
+            result.scores = answer["scores"]
+            result.timings.update(answer["timings"])
+            result.context = answer["context"]
+
+            if self.answer_cache is not None and result.answer and query_vector is not None:
+                self.answer_cache.put(user_query, query_vector, model_name, result.answer,
+                                      result.sources, result.scores)
+            if memo is not None and result.answer:
+                memo.put(answer_key, result)
+        except Exception as e:
+            logger.exception("Research pipeline failed.")
+            result.error = str(e)
+        finally:
+            result.timings["total"] = time.perf_counter() - run_started
+        return result
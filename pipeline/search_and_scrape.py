@@ -1,83 +1,173 @@
 # pipeline/search_and_scrape.py
 
-import streamlit as st
+import threading
+from concurrent.futures import Future
+from contextlib import closing
 from urllib.parse import urlparse
+from agent.instrumentation import span
+from agent.query_analyzer import normalize_query
+from agent.search_tool import iter_search_results
 from pipeline.crawler import crawl_site
+from pipeline.fetch_scheduler import FetchScheduler
+from pipeline.link_ranker import LinkRanker
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+HOMEPAGE_PATHS = ["", "/", "/index.html", "/home"]
+
+def is_homepage(url):
+    return urlparse(url).path in HOMEPAGE_PATHS
+
+class PageMemo:
+    """
+    Thread-safe memo of fetched pages keyed by `page_memo_key`, shared by
+    several search_and_scrape runs (e.g. a batch of related queries) so every
+    unique URL is fetched once. Concurrent requests for a link that is still
+    being fetched wait for that fetch instead of starting another. Failures
+    are memoized too, so a dead link is not retried within the batch.
+    """
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get_or_fetch(self, link, fetch):
+        with self._lock:
+            future = self._pages.get(link)
+            owner = future is None
+            if owner:
+                future = self._pages[link] = Future()
+            else:
+                self.hits += 1
+
+        if owner:
+            try:
+                future.set_result(fetch())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+def page_memo_key(link, user_query):
+    """
+    Scraped pages are reused by link alone, but a crawl's pages depend on the
+    query its links were ranked for, so homepages are keyed per query too.
+    """
+    return (link, normalize_query(user_query)) if is_homepage(link) else link
+
+def fetch_result(result, scraper, user_query, max_crawl_depth=2, max_crawl_pages=3, link_ranker=None):
+    """
+    Fetch one search result: crawls homepages, scrapes everything else.
+    Runs inside a scheduler worker thread, so it must not touch Streamlit.
+
+    Returns:
+        List[Dict]: Pages with 'url', 'title', 'content' and 'crawled'.
+    """
+    if is_homepage(result["link"]):
+        crawled_pages = crawl_site(result["link"], user_query,
+                                   max_depth=max_crawl_depth,
+                                   max_links=max_crawl_pages,
+                                   link_ranker=link_ranker,
+                                   scraper=scraper)
+        return [{
+            "url": page["url"],
+            "title": f"Crawled from {result['link']}",
+            "content": page["content"],
+            "crawled": True
+        } for page in crawled_pages]
+
+    scraped = scraper.scrape(result["link"])
+    if not scraped["content"]:
+        return []
+    return [{
+        "url": result["link"],
+        "title": result["title"],
+        "content": scraped["content"],
+        "crawled": False
+    }]
+
+def chunk_pages(pages, chunker):
+    """
+    Attach each page's chunks as page['chunks'] (None if chunking failed).
+    Runs in the fetch worker, so chunking overlaps with other fetches and,
+    with a process-pool chunker, runs in parallel across pages.
+    """
+    for page in pages:
+        try:
+            with span("chunk", url=page["url"]):
+                page["chunks"] = chunker.chunk_text(page["content"], {
+                    "url": page["url"],
+                    "title": page["title"]
+                })
+        except Exception as e:
+            logger.warning(f"Failed chunking for {page['url']}: {e}")
+            page["chunks"] = None
+    return pages
+
 def search_and_scrape(keyword_chunks, search_tool, scraper, chunker, user_query,
-                      max_links=4, max_pages=3, max_crawl_depth=2, max_crawl_pages=3):
+                      max_links=4, max_pages=3, max_crawl_depth=2, max_crawl_pages=3,
+                      scheduler=None, on_chunks=None, on_event=None, page_memo=None):
     """
     Executes search and scraping for each keyword cluster.
     If homepage, crawls internal pages; otherwise, scrapes and chunks.
+    Pages are chunked in the fetch workers as they arrive.
+    Candidate URLs from all clusters are fetched concurrently through a
+    FetchScheduler; outstanding fetches are cancelled once `max_links` pages are in.
+    `on_chunks`, if given, receives each page's chunks as soon as they are
+    produced so downstream stages can start before scraping finishes.
+    `on_event(name, payload)`, if given, is called on the calling thread with
+    a 'source' event per kept page and a 'crawl_failed' event per failed crawl.
+    A shared `page_memo` (PageMemo) reuses pages already fetched by other runs;
+    crawled homepages are only reused for the same (normalized) query.
     """
-    st.sidebar.markdown("### 🔗 Scraped Sources")
+    emit = on_event or (lambda name, payload: None)
+    scheduler = scheduler or FetchScheduler()
     scraped_results = []
     all_chunks = []
 
-    for chunk in keyword_chunks:
-        if len(scraped_results) >= max_links:
-            break
-
-        query = " ".join(chunk)
-        try:
-            chunk_results = search_tool.search(query, num_results=10, max_pages=max_pages)
-        except Exception as e:
-            logger.error(f"Search failed for chunk {chunk}: {e}")
-            continue
+    candidates = iter_search_results(search_tool, [" ".join(chunk) for chunk in keyword_chunks],
+                                     max_pages=max_pages)
+    link_ranker = LinkRanker(user_query)  # shared by every crawl in this run
+    fetch = lambda result: chunk_pages(fetch_result(result, scraper, user_query,
+                                                    max_crawl_depth=max_crawl_depth,
+                                                    max_crawl_pages=max_crawl_pages,
+                                                    link_ranker=link_ranker), chunker)
+    if page_memo is not None:
+        fetch_uncached = fetch
+        fetch = lambda result: page_memo.get_or_fetch(page_memo_key(result["link"], user_query),
+                                                      lambda: fetch_uncached(result))
 
-        for result in chunk_results:
-            if len(scraped_results) >= max_links:
-                break
+    with closing(scheduler.run(candidates, fetch)) as completed:
+        for result, pages, error in completed:
+            if error is not None:
+                if is_homepage(result["link"]):
+                    emit("crawl_failed", {"link": result["link"], "error": str(error)})
+                continue
 
-            try:
-                parsed = urlparse(result["link"])
-                is_homepage = parsed.path in ["", "/", "/index.html", "/home"]
-
-                if is_homepage:
-                    try:
-                        crawled_pages = crawl_site(result["link"], user_query,
-                                                   max_depth=max_crawl_depth,
-                                                   max_links=max_crawl_pages)
-                        for page in crawled_pages:
-                            if len(scraped_results) >= max_links:
-                                break
-                            doc_chunks = chunker.chunk_text(page["content"], {
-                                "url": page["url"],
-                                "title": f"Crawled from {result['link']}"
-                            })
-                            all_chunks.extend(doc_chunks)
-                            scraped_results.append({
-                                "title": f"Crawled from {result['link']}",
-                                "link": page["url"],
-                                "page": result.get("page", 1)
-                            })
-                            st.sidebar.markdown(f"<span style='color:green'>🌐 Crawled</span> 🔹 <a href='{page['url']}' target='_blank'>{page['url']}</a>", unsafe_allow_html=True)
-                    except Exception as e:
-                        logger.warning(f"Failed to crawl {result['link']}: {e}")
-                        st.sidebar.warning(f"Failed to crawl {result['link']} — {e}")
+            for page in pages:
+                if len(scraped_results) >= max_links:
+                    break
+                doc_chunks = page["chunks"]
+                if doc_chunks is None:
                     continue
+                all_chunks.extend(doc_chunks)
+                if on_chunks is not None:
+                    on_chunks(doc_chunks)
 
-                scraped = scraper.scrape(result["link"])
-                if scraped["content"]:
-                    doc_chunks = chunker.chunk_text(scraped["content"], {
-                        "url": result["link"],
-                        "title": result["title"]
-                    })
-                    all_chunks.extend(doc_chunks)
-                    scraped_results.append(result)
-
-                    page_info = result.get("page", 1)
-                    if page_info > 1:
-                        st.sidebar.markdown(
-                            f"<span style='color:orange'>📄 Page {page_info}</span> 🔹 <a href='{result['link']}' target='_blank'>{result['title']}</a>",
-                            unsafe_allow_html=True)
-                    else:
-                        st.sidebar.markdown(f"🔹 [Page {page_info}] [{result['title']}]({result['link']})")
-            except Exception as e:
-                logger.warning(f"Failed scraping or chunking for {result['link']}: {e}")
+                page_info = result.get("page", 1)
+                if page["crawled"]:
+                    source = {
+                        "title": page["title"],
+                        "link": page["url"],
+                        "page": page_info
+                    }
+                else:
+                    source = result
+                scraped_results.append(source)
+                emit("source", {**source, "crawled": page["crawled"]})
+
+            if len(scraped_results) >= max_links:
+                break
 
     return scraped_results, all_chunks
@@ -0,0 +1,27 @@
+# tests/test_answer_cache.py
+
+from agent.answer_cache import AnswerCache
+
+SOURCES = [{"label": "Source 1", "url": "http://example.com/a"}]
+SCORES = [{"url": "http://example.com/a", "score": 5}]
+
+def test_near_duplicate_query_hits(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite"), threshold=0.9)
+    cache.put("rocket launch prices", [1.0, 0.0, 0.1], "m", "## Answer", SOURCES, SCORES)
+
+    hit = cache.lookup([0.98, 0.02, 0.12], "m")
+    assert hit["answer"] == "## Answer"
+    assert hit["sources"] == SOURCES and hit["scores"] == SCORES
+
+    assert cache.lookup([0.0, 1.0, 0.0], "m") is None
+    assert cache.lookup([1.0, 0.0, 0.1], "other-model") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "entries": 1}
+
+def test_stale_answers_are_ignored(monkeypatch, tmp_path):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("agent.answer_cache.time.time", lambda: clock["now"])
+    cache = AnswerCache(path=str(tmp_path / "answers.sqlite"), max_age=60)
+    cache.put("q", [1.0, 0.0], "m", "old", SOURCES, SCORES)
+
+    clock["now"] += 61
+    assert cache.lookup([1.0, 0.0], "m") is None
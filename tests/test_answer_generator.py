@@ -0,0 +1,31 @@
+# tests/test_answer_generator.py
+
+from types import SimpleNamespace
+from pipeline import answer_generator
+from pipeline.answer_generator import generate_answer
+
+class FakeRetriever:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def get_relevant_documents(self, query):
+        return self.docs
+
+class FakeReranker:
+    def score(self, docs, user_query):
+        return [{"doc": doc, "url": doc.metadata["url"], "score": 5 - i, "relevance": 5 - i}
+                for i, doc in enumerate(docs)]
+
+def test_generate_answer_is_headless(monkeypatch):
+    monkeypatch.setattr(answer_generator, "stream_answer", lambda prompt: iter(["## Report ", "[Source 1]"]))
+    docs = [SimpleNamespace(metadata={"url": f"https://{name}.com"}, page_content=name) for name in ("a", "b")]
+    tokens = []
+
+    result = generate_answer("query", FakeRetriever(docs), reranker=FakeReranker(), on_token=tokens.append)
+
+    assert result["answer"] == "## Report [Source 1]"
+    assert tokens == ["## Report ", "[Source 1]"]
+    assert result["sources"] == [{"label": "Source 1", "url": "https://a.com"},
+                                 {"label": "Source 2", "url": "https://b.com"}]
+    assert result["scores"] == [{"url": "https://a.com", "score": 5}, {"url": "https://b.com", "score": 4}]
+    assert set(result["timings"]) == {"retrieve", "score", "synthesize"}
@@ -0,0 +1,118 @@
+# tests/test_batch.py
+
+from pipeline import batch
+from pipeline.batch import load_queries, research_batch, SearchMemo
+from pipeline.embedder import embedding_model_name
+from pipeline.research import ResearchPipeline
+
+class FakeEmbeddings:
+    """One-hot vector per distinct text, so only identical texts are similar."""
+    def __init__(self):
+        self.texts = {}
+
+    def embed_query(self, text):
+        index = self.texts.setdefault(text, len(self.texts))
+        return [1.0 if i == index else 0.0 for i in range(64)]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+class FakeSearch:
+    def __init__(self):
+        self.calls = []
+
+    def search_page(self, query, page_num, num_results):
+        self.calls.append((query, page_num))
+        if page_num:
+            return []
+        host = query.replace(" ", "-")
+        return [{"title": query, "link": f"https://{host}.com/post"}]
+
+class FakeScraper:
+    def __init__(self):
+        self.scraped = []
+
+    def scrape(self, url):
+        self.scraped.append(url)
+        return {"url": url, "content": f"Article text published at {url} about rockets."}
+
+def make_pipeline(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)  # caches live under ./.cache
+    pipeline = ResearchPipeline(gemini_api_key="test", embedding_model=FakeEmbeddings(),
+                                store_backend="memory", write_behind=False)
+    pipeline.search_tool = FakeSearch()
+    pipeline.scraper = FakeScraper()
+    return pipeline
+
+def test_search_memo_searches_each_chunk_once():
+    search = FakeSearch()
+    memo = SearchMemo(search)
+
+    assert memo.search_page("Rocket prices", 0) == memo.search_page("rocket  prices!", 0)
+    memo.search_page("rocket prices", 1)
+    assert search.calls == [("Rocket prices", 0), ("rocket prices", 1)]
+    assert (memo.calls, memo.hits) == (2, 1)
+
+def test_load_queries_skips_comments_blanks_and_duplicates(tmp_path):
+    path = tmp_path / "queries.txt"
+    path.write_text("# launch costs\nRocket prices\n\nrocket prices?\nLaunch dates\n", encoding="utf-8")
+
+    assert load_queries(path) == ["Rocket prices", "Launch dates"]
+
+def test_batch_shares_work_and_isolates_failures(monkeypatch, tmp_path):
+    pipeline = make_pipeline(monkeypatch, tmp_path)
+    analyzed, answered = [], []
+
+    def fake_analyze(query, cache=None):
+        analyzed.append(query)
+        if query == "broken query":
+            raise RuntimeError("analysis failed")
+        return [["rocket"], [query]]
+
+    def fake_generate_answer(user_query, retriever, reranker=None, on_token=None):
+        answered.append(user_query)
+        urls = sorted(doc.metadata["url"] for doc in retriever.get_relevant_documents(user_query))
+        return {"answer": f"answer to {user_query}", "sources": urls, "scores": [],
+                "timings": {"synthesize": 0.0}, "context": {"tokens": 1}}
+
+    monkeypatch.setattr(batch, "analyze_query", fake_analyze)
+    monkeypatch.setattr(batch, "generate_answer", fake_generate_answer)
+    cached_vector = pipeline.embedding_model.embed_query("cached question")
+    pipeline.answer_cache.put("cached question", cached_vector, embedding_model_name(pipeline.embedding_model),
+                              "cached answer", [], [])
+
+    queries = ["rocket prices", "broken query", "cached question", "rocket launches"]
+    results = research_batch(pipeline, queries)
+
+    assert [result.query for result in results] == queries
+    prices, broken, cached, launches = results
+    assert prices.answer == "answer to rocket prices"
+    assert prices.sources == ["https://rocket-prices.com/post", "https://rocket.com/post"]
+    assert launches.answer == "answer to rocket launches"
+    assert broken.error == "analysis failed" and not broken.answer
+    assert cached.cached and cached.answer == "cached answer"
+
+    # The cached query is never analyzed or scraped; the shared "rocket" chunk is searched once
+    assert sorted(analyzed) == ["broken query", "rocket launches", "rocket prices"]
+    assert sorted(answered) == ["rocket launches", "rocket prices"]
+    assert [call for call in pipeline.search_tool.calls if call[1] == 0].count(("rocket", 0)) == 1
+    assert sorted(pipeline.scraper.scraped) == ["https://rocket-launches.com/post", "https://rocket-prices.com/post",
+                                                "https://rocket.com/post"]
+
+def test_reused_duplicate_pages_still_reach_the_kept_copy(monkeypatch, tmp_path):
+    pipeline = make_pipeline(monkeypatch, tmp_path)
+    links = {"first query": ["https://a.com/post", "https://b.com/post"], "second query": ["https://b.com/post"]}
+    pipeline.search_tool.search_page = lambda query, page_num, num_results: (
+        [] if page_num else [{"title": query, "link": link} for link in links[query]])
+    pipeline.scraper.scrape = lambda url: {"url": url, "content": "The same syndicated article text."}
+
+    monkeypatch.setattr(batch, "analyze_query", lambda query, cache=None: [[query]])
+    monkeypatch.setattr(batch, "generate_answer", lambda user_query, retriever, reranker=None, on_token=None: {
+        "answer": "answer", "scores": [], "timings": {}, "context": {},
+        "sources": [doc.metadata["url"] for doc in retriever.get_relevant_documents(user_query)]})
+
+    first, second = research_batch(pipeline, ["first query", "second query"])
+
+    # b.com duplicates a.com, so the second query's only page is served by a.com's chunk
+    assert first.sources == ["https://a.com/post"]
+    assert second.error is None and second.sources == ["https://a.com/post"]
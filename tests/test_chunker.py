@@ -0,0 +1,44 @@
+# tests/test_chunker.py
+
+from concurrent.futures import ThreadPoolExecutor
+from agent.chunker import TextChunker, chunk_many
+
+PAGE = "\n".join(
+    ["Launch Costs"]
+    + [f"Rocket {i} carries {i * 10} tonnes to orbit. Each flight is priced per kilogram!" for i in range(40)]
+    + ["Reusability", "Boosters land on drone ships and fly again within weeks. " * 12]
+)
+
+def test_chunks_are_sentence_aligned_with_exact_offsets():
+    chunker = TextChunker(chunk_size=400, chunk_overlap=100)
+    chunks = list(chunker.iter_chunks(PAGE, {"url": "https://a.com"}))
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert PAGE[chunk.start:chunk.end] == chunk.content
+        assert len(chunk.content) <= 400
+        assert chunk.content[-1] in ".!" or chunk.content.endswith("weeks")
+    # Consecutive chunks overlap, and the heading opens a fresh chunk
+    assert chunks[1].start < chunks[0].end
+    assert any(chunk.content.startswith("Reusability\n") for chunk in chunks)
+
+def test_chunk_text_and_chunk_many_return_dicts_with_offsets():
+    chunker = TextChunker(chunk_size=400, chunk_overlap=100)
+    chunks = chunker.chunk_text(PAGE, {"url": "https://a.com"})
+
+    assert chunks[0]["metadata"] == {"url": "https://a.com", "start_offset": 0,
+                                     "end_offset": len(chunks[0]["content"])}
+    assert chunk_many([(PAGE, {"url": "https://a.com"})] * 2, chunk_size=400, chunk_overlap=100) == [chunks, chunks]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert chunk_many([(PAGE, {"url": "https://a.com"})] * 3, chunk_size=400, chunk_overlap=100,
+                          executor=executor) == [chunks] * 3
+    assert chunker.chunk_text("", {"url": "https://a.com"}) == []
+
+def test_text_without_sentence_breaks_still_overlaps_on_words():
+    text = "word " * 400
+    chunks = list(TextChunker(chunk_size=200, chunk_overlap=100).iter_chunks(text))
+
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert 0 < previous.end - chunk.start <= 100
+        assert text[chunk.start - 1] == " "
+    assert chunks[-1].end == len(text.rstrip())
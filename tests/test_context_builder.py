@@ -0,0 +1,39 @@
+# tests/test_context_builder.py
+
+from types import SimpleNamespace
+from pipeline.context_builder import build_context, estimate_tokens
+
+def entry(url, text, relevance):
+    doc = SimpleNamespace(metadata={"url": url}, page_content=text)
+    return {"doc": doc, "url": url, "score": round(relevance), "relevance": relevance}
+
+PRICING = "Starter plan costs 10 dollars per month and includes five projects with email support."
+FEATURES = "The platform offers single sign on, audit logs, role based access and a public API."
+LIMITS = "Free accounts are limited to one project, one hundred requests per day and community help."
+
+def test_mmr_skips_redundant_chunks_and_allows_several_per_source():
+    scored = [
+        entry("https://a.com", PRICING, 5),
+        entry("https://b.com", PRICING + " ", 4.9),  # same information, other site
+        entry("https://a.com", FEATURES, 4),
+        entry("https://c.com", LIMITS, 3),
+    ]
+
+    context = build_context(scored, token_budget=1000, max_per_source=2)
+
+    assert [doc.page_content for doc in context["docs"]] == [PRICING, FEATURES, LIMITS]
+    assert context["labels"] == {"https://a.com": "Source 1", "https://c.com": "Source 2"}
+    assert context["text"].count("[Source 1]") == 1
+    assert context["tokens"] == estimate_tokens(context["text"])
+
+def test_budget_limits_selection_and_oversized_top_chunk_is_truncated():
+    scored = [entry("https://a.com", PRICING, 5), entry("https://b.com", FEATURES, 4)]
+
+    context = build_context(scored, token_budget=estimate_tokens(PRICING) + 15)
+    assert [doc.page_content for doc in context["docs"]] == [PRICING]
+    assert context["tokens"] <= context["budget"]
+
+    context = build_context([entry("https://a.com", PRICING * 20, 5)], token_budget=50)
+    assert len(context["docs"]) == 1
+    assert context["tokens"] <= 50 + 1
+    assert build_context([], token_budget=50)["text"] == ""
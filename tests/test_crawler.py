@@ -0,0 +1,49 @@
+# tests/test_crawler.py
+
+from types import SimpleNamespace
+from pipeline.crawler import canonicalize_url, crawl_site, extract_internal_links
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Example.com:443/Docs/?b=2&a=1&utm_source=x#top") == "https://example.com/Docs?a=1&b=2"
+    assert canonicalize_url("http://example.com") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/a/") == "http://example.com:8080/a"
+
+class FakeClient:
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def get(self, url, **kwargs):
+        self.fetched.append(url)
+        body = self.pages[url].encode("utf-8")
+        return SimpleNamespace(
+            status_code=200,
+            headers={"Content-Type": "text/html"},
+            raise_for_status=lambda: None,
+            iter_content=lambda chunk_size: iter([body]),
+            close=lambda: None
+        )
+
+def test_crawl_is_best_first_and_deduplicates():
+    pages = {
+        "https://site.com/": '<p>home</p><a href="/about">About us</a><a href="/blog/">Blog</a><a href="/blog#x">Blog</a>',
+        "https://site.com/blog/": '<p>blog</p><a href="/team">Our team</a><a href="/blog/rocket-pricing">Rocket pricing</a>',
+        "https://site.com/blog/rocket-pricing": "<p>pricing</p>",
+    }
+    client = FakeClient(pages)
+
+    crawled = crawl_site("https://site.com/", "rocket pricing blog", max_depth=2, max_links=4, http_client=client)
+
+    # /about and /team fall below the similarity threshold and are never fetched
+    assert [page["url"] for page in crawled] == [
+        "https://site.com/", "https://site.com/blog/", "https://site.com/blog/rocket-pricing"
+    ]
+    assert len(client.fetched) == len(set(client.fetched))
+
+def test_extract_internal_links_filters_other_hosts():
+    links = [
+        {"url": "https://site.com/p", "anchor": "pricing page", "context": "Read our pricing page today"},
+        {"url": "https://other.com/", "anchor": "x", "context": ""},
+    ]
+
+    assert extract_internal_links(links, "https://site.com/") == links[:1]
@@ -0,0 +1,40 @@
+# tests/test_dedup.py
+
+from pipeline.dedup import ChunkDeduplicator, hamming, simhash
+
+ARTICLE = ("India and the United States signed an agreement on Tuesday to expand cooperation in "
+           "human spaceflight, satellite navigation and deep space exploration, with a joint "
+           "mission to the International Space Station planned for next year. Officials said the "
+           "partnership would also cover launch services, data sharing and training of astronauts.")
+
+SPECS = " ".join(f"Paragraph {i} discusses launch vehicle number {i * 7} and its payload capacity of {i * 13} tonnes to orbit."
+                 for i in range(30))
+
+def chunk(url, content):
+    return {"content": content, "metadata": {"url": url}}
+
+def test_simhash_is_close_for_near_duplicates():
+    edited = SPECS.replace("Paragraph 5 ", "Section 5 ")
+    assert hamming(simhash(SPECS), simhash(edited)) <= 3
+    assert hamming(simhash(SPECS), simhash(ARTICLE)) > 3
+    assert simhash("too short") is None
+
+def test_duplicates_are_dropped_and_their_urls_recorded():
+    dedup = ChunkDeduplicator(max_distance=3)
+    matched = set()
+    chunks = [
+        chunk("https://news.com/a", ARTICLE),
+        chunk("https://mirror.com/a", ARTICLE.upper() + "  "),
+        chunk("https://news.com/b", SPECS),
+        chunk("https://blog.com/specs", SPECS.replace("Paragraph 5 ", "Section 5 ")),
+    ]
+
+    kept = dedup.filter(chunks, matched_urls=matched)
+
+    assert [c["metadata"]["url"] for c in kept] == ["https://news.com/a", "https://news.com/b"]
+    assert matched == {"https://news.com/a", "https://news.com/b"}
+    assert {rep["url"]: rep["duplicate_urls"] for rep in dedup.duplicates()} == {
+        "https://news.com/a": ["https://mirror.com/a"],
+        "https://news.com/b": ["https://blog.com/specs"],
+    }
+    assert (dedup.kept, dedup.dropped) == (2, 2)
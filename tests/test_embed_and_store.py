@@ -0,0 +1,158 @@
+# tests/test_embed_and_store.py
+
+import threading
+import pytest
+from pipeline import embed_and_store
+from pipeline.dedup import ChunkDeduplicator
+from pipeline.embed_and_store import (annotate_duplicates, build_retriever, chunk_id, collection_for_query,
+                                      finalize_store, open_run_store, prune_store, upsert_chunks, write_chunks)
+from pipeline.memory_index import InMemoryVectorIndex
+
+SPECS = " ".join(f"Paragraph {i} discusses launch vehicle number {i * 7} and its payload capacity of {i * 13} tonnes to orbit."
+                 for i in range(30))
+
+def matches(metadata, where):
+    if "$or" in where:
+        return any(matches(metadata, condition) for condition in where["$or"])
+    (field, value), = where.items()
+    return metadata.get(field) == value
+
+class FakeCollection:
+    """The slice of Chroma's collection API the store helpers use."""
+    def __init__(self, calls):
+        self.entries = {}
+        self.calls = calls
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.calls.append((documents[0][:5], threading.current_thread().name))
+        for key, embedding, document, metadata in zip(ids, embeddings, documents, metadatas):
+            self.entries[key] = {"embedding": embedding, "document": document, "metadata": metadata}
+
+    def get(self, ids=None, where=None, include=None):
+        if ids is not None:
+            found = [key for key in ids if key in self.entries]
+        else:
+            found = [key for key, entry in self.entries.items() if matches(entry["metadata"], where)]
+        return {"ids": found, "metadatas": [dict(self.entries[key]["metadata"]) for key in found]}
+
+    def update(self, ids, metadatas):
+        for key, metadata in zip(ids, metadatas):
+            self.entries[key]["metadata"] = metadata
+
+    def delete(self, where):
+        (field, condition), = where.items()
+        cutoff = condition["$lt"]
+        self.entries = {key: entry for key, entry in self.entries.items() if entry["metadata"][field] >= cutoff}
+
+class FakeStore:
+    def __init__(self):
+        self.calls = []
+        self._collection = FakeCollection(self.calls)
+        self.search_kwargs = None
+
+    def persist(self):
+        self.calls.append(("persist", threading.current_thread().name))
+
+    def as_retriever(self, search_kwargs=None):
+        self.search_kwargs = search_kwargs
+        return self
+
+def chunk(url, content, **metadata):
+    return {"content": content, "metadata": {"url": url, **metadata}}
+
+def test_chunk_ids_are_stable_and_collections_follow_the_normalized_query():
+    assert chunk_id(chunk("https://a.com", "text")) == chunk_id(chunk("https://a.com", "text", title="T"))
+    assert chunk_id(chunk("https://a.com", "text")) != chunk_id(chunk("https://b.com", "text"))
+    assert collection_for_query("Rocket  prices") == collection_for_query("rocket prices")
+    assert collection_for_query("rocket prices").startswith("query-")
+
+def test_reupserts_replace_entries_and_prune_drops_only_expired(monkeypatch):
+    store = FakeStore()
+    old = chunk("https://a.com", "old news", title=None, tags=["space"], extra={"a": 1}, page=2)
+    written = upsert_chunks(store, [old, old, chunk("https://b.com", "failed")], [[1.0], [1.0], None],
+                            stored_at=100.0)
+    assert written == 1
+    metadata = store._collection.entries[chunk_id(old)]["metadata"]
+    assert metadata["page"] == 2 and not {"title", "tags", "extra"} & set(metadata)
+
+    fresh = chunk("https://a.com", "fresh news")
+    upsert_chunks(store, [old, fresh], [[2.0], [3.0]], stored_at=200.0)
+    assert len(store._collection.entries) == 2
+    assert store._collection.entries[chunk_id(old)]["embedding"] == [2.0]
+
+    upsert_chunks(store, [fresh], [[3.0]], stored_at=1000.0)
+    monkeypatch.setattr(embed_and_store.time, "time", lambda: 1010.0)
+    prune_store(store, ttl_seconds=0)  # pruning disabled
+    assert len(store._collection.entries) == 2
+    prune_store(store, ttl_seconds=100)
+    assert list(store._collection.entries) == [chunk_id(fresh)]
+
+def test_build_retriever_passes_the_url_filter():
+    store = FakeStore()
+    build_retriever(store, k=6, urls=["https://b.com", "https://a.com", "https://b.com"])
+    assert store.search_kwargs == {"k": 6, "filter": {"url": {"$in": ["https://a.com", "https://b.com"]}}}
+
+    build_retriever(store, k=2)
+    assert store.search_kwargs == {"k": 2}
+    store.search_kwargs = None
+    assert build_retriever(store, k=2, urls=[]).get_relevant_documents("query") == []
+    assert store.search_kwargs is None
+
+def test_fingerprints_are_stored_only_when_dedup_is_on():
+    store = FakeStore()
+    upsert_chunks(store, [chunk("https://a.com", SPECS)], [[1.0]], fingerprints=False)
+    upsert_chunks(store, [chunk("https://b.com", SPECS)], [[1.0]], fingerprints=True)
+
+    plain, fingerprinted = (entry["metadata"] for entry in store._collection.entries.values())
+    assert "dedup_hash" not in plain and "simhash" not in plain
+    assert {"dedup_hash", "simhash", "simhash_band0"} <= set(fingerprinted)
+
+def test_store_duplicates_are_dropped_annotated_and_survive_reupserts():
+    store = FakeStore()
+    original = chunk("https://news.com/specs", SPECS)
+    upsert_chunks(store, [original], [[1.0]], fingerprints=True)
+
+    # A later run finds a near-duplicate of the stored chunk, and the same page again
+    dedup = ChunkDeduplicator(max_distance=3, store=store)
+    matched = set()
+    mirror = chunk("https://mirror.com/specs", SPECS.replace("Paragraph 5 ", "Section 5 "))
+    assert dedup.filter([mirror, original], matched_urls=matched) == [original]
+    assert matched == {"https://news.com/specs"}
+    assert dedup.duplicates()[0]["id"] == chunk_id(original)
+
+    assert annotate_duplicates(store, dedup) == 1
+    stored = store._collection.entries[chunk_id(original)]["metadata"]
+    assert stored["duplicate_urls"] == "https://mirror.com/specs"
+
+    # Re-scraping the page without meeting the mirror again keeps the recorded URL
+    upsert_chunks(store, [original], [[1.0]], fingerprints=True)
+    assert store._collection.entries[chunk_id(original)]["metadata"]["duplicate_urls"] == "https://mirror.com/specs"
+
+def test_open_run_store_rejects_unknown_backends():
+    with pytest.raises(ValueError):
+        open_run_store(object(), backend="faiss")
+
+def test_write_behind_persists_in_order_on_the_writer_thread(monkeypatch):
+    chroma = FakeStore()
+    monkeypatch.setattr(embed_and_store, "open_store", lambda *args, **kwargs: chroma)
+    index = open_run_store(object(), backend="memory", ttl_seconds=0)
+    assert isinstance(index, InMemoryVectorIndex)
+
+    original = chunk("https://news.com/specs", SPECS)
+    mirror = chunk("https://mirror.com/specs", SPECS.replace("Paragraph 5 ", "Section 5 "))
+    dedup = ChunkDeduplicator(max_distance=3)
+    kept = dedup.filter([original, mirror])
+    futures = [index.write_behind.upsert([chunk("https://a.com", "first")], [[1.0]])]
+    assert write_chunks(index, kept, [[0.0, 1.0]]) == 1
+    index.write_behind.upsert([chunk("https://a.com", "last")], [[2.0]])
+    finalize_store(index, dedup)
+    futures.append(index.write_behind.finalize())
+    for future in futures:
+        future.result(timeout=5)
+
+    assert [call for call, _ in chroma.calls] == ["first", "Parag", "last", "persist", "persist"]
+    assert all(thread.startswith("chroma-write-behind") for _, thread in chroma.calls)
+    # Duplicate URLs land on the in-memory document at once, and on the stored copy after finalize
+    document, = [doc for doc, _ in index.search([0.0, 1.0]) if doc.metadata["url"] == "https://news.com/specs"]
+    assert document.metadata["duplicate_urls"] == "https://mirror.com/specs"
+    assert chroma._collection.entries[chunk_id(original)]["metadata"]["duplicate_urls"] == "https://mirror.com/specs"
@@ -0,0 +1,34 @@
+# tests/test_embedder.py
+
+from pipeline.embedder import embed_texts, EmbeddingWorker
+
+class MockEmbeddings:
+    model = "mock"
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        if any("bad" in text for text in texts):
+            raise ValueError("bad chunk")
+        return [[float(len(text))] for text in texts]
+
+def test_failed_batch_only_loses_bad_chunk():
+    vectors = embed_texts(["a", "bad", "ccc"], MockEmbeddings(), batch_size=2)
+    assert vectors == [[1.0], None, [3.0]]
+
+def test_worker_embeds_submitted_chunks_in_batches():
+    model = MockEmbeddings()
+    written = []
+
+    def write_batch(chunks, vectors):
+        written.extend(zip([chunk["content"] for chunk in chunks], vectors))
+        return len(chunks)
+
+    with EmbeddingWorker(model, write_batch, batch_size=2, num_threads=1, max_queue=2) as worker:
+        worker.submit([{"content": text, "metadata": {}} for text in ["a", "bb", "ccc"]])
+
+    assert sorted(written) == [("a", [1.0]), ("bb", [2.0]), ("ccc", [3.0])]
+    assert worker.stored == 3
+    assert max(len(batch) for batch in model.batches) == 2
@@ -0,0 +1,27 @@
+# tests/test_embedding_cache.py
+
+import pytest
+from agent.embedding_cache import EmbeddingCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(path=str(tmp_path / "embeddings.sqlite"), max_entries=2)
+
+def test_round_trip_is_keyed_by_model(cache):
+    cache.put_many(["hello"], [[0.5, 0.25]], "models/a")
+
+    assert cache.get_many(["hello"], "models/a") == [[0.5, 0.25]]
+    assert cache.get_many(["hello"], "models/b") == [None]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_evicts_least_recently_used(cache, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr("agent.embedding_cache.time.time", lambda: next(clock))
+
+    cache.put_many(["a"], [[1.0]], "m")
+    cache.put_many(["b"], [[2.0]], "m")
+    cache.get_many(["a"], "m")
+    cache.put_many(["c"], [[3.0]], "m")
+
+    assert cache.get_many(["a", "b", "c"], "m") == [[1.0], None, [3.0]]
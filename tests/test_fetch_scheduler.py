@@ -0,0 +1,52 @@
+# tests/test_fetch_scheduler.py
+
+import threading
+import time
+from contextlib import closing
+from pipeline.fetch_scheduler import FetchScheduler
+
+def test_respects_per_host_cap():
+    scheduler = FetchScheduler(max_workers=6, max_per_host=2, host_delay=0)
+    lock = threading.Lock()
+    active = {"n": 0, "peak": 0}
+
+    def fetch(item):
+        with lock:
+            active["n"] += 1
+            active["peak"] = max(active["peak"], active["n"])
+        time.sleep(0.02)
+        with lock:
+            active["n"] -= 1
+        return item["link"]
+
+    items = [{"link": f"https://example.com/{i}"} for i in range(8)]
+    results = [result for _, result, _ in scheduler.run(items, fetch)]
+
+    assert sorted(results) == sorted(item["link"] for item in items)
+    assert active["peak"] <= 2
+
+def test_closing_cancels_pending_fetches():
+    scheduler = FetchScheduler(max_workers=2, max_per_host=2, host_delay=0)
+    started = []
+
+    def fetch(item):
+        started.append(item["link"])
+        time.sleep(0.02)
+        return item["link"]
+
+    items = [{"link": f"https://example.com/{i}"} for i in range(20)]
+    with closing(scheduler.run(items, fetch)) as completed:
+        for _ in completed:
+            break
+
+    time.sleep(0.1)
+    assert len(started) < len(items)
+
+def test_failed_fetch_is_reported():
+    scheduler = FetchScheduler(max_workers=2, host_delay=0)
+
+    def fetch(item):
+        raise ValueError("boom")
+
+    (item, result, error), = list(scheduler.run([{"link": "https://example.com"}], fetch))
+    assert result is None and isinstance(error, ValueError)
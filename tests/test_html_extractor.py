@@ -0,0 +1,57 @@
+# tests/test_html_extractor.py
+
+import pytest
+from agent.html_extractor import extract_page, HTMLExtractor, BACKENDS, etree
+
+HTML = """
+<html><head><title>T</title><style>p { color: red }</style></head><body>
+<nav><a href="/pricing">Pricing</a> menu text</nav>
+<h1>Launch report</h1>
+<p>Read our <a href="/docs#intro">docs page</a> today.</p>
+<ul><li>First &amp; best</li><li>Second</li></ul>
+<table><tr><th>Plan</th><td>$10</td></tr></table>
+<script>var hidden = 1;</script>
+<footer>Copyright</footer>
+</body></html>
+"""
+
+backends = [b for b in BACKENDS if b != "lxml" or etree is not None]
+
+@pytest.mark.parametrize("backend", backends)
+def test_extracts_main_content_and_links(backend):
+    page = extract_page(HTML, base_url="https://site.com/", backend=backend)
+
+    assert page["text"].split("\n") == ["Launch report", "Read our docs page today.", "First & best", "Second", "Plan", "$10"]
+    assert {"url": "https://site.com/pricing", "anchor": "Pricing", "context": ""} in page["links"]
+    assert {"url": "https://site.com/docs", "anchor": "docs page", "context": "Read our docs page today."} in page["links"]
+
+@pytest.mark.parametrize("backend", backends)
+def test_stops_after_max_chars(backend):
+    extractor = HTMLExtractor(want_links=False, max_chars=15, backend=backend)
+    extractor.feed("<p>first block of text</p>")
+    assert extractor.done
+    extractor.feed("<p>never parsed</p>")
+
+    assert extractor.close()["text"] == "first block of "
+
+@pytest.mark.parametrize("backend", backends)
+def test_keeps_text_after_nested_block(backend):
+    html = ("<ul><li><p>Inner para text</p>tail text after inner block</li></ul>"
+            "<table><tr><td><p>Cell para</p> cell tail <a href='/x'>link</a></td></tr></table>")
+    page = extract_page(html, base_url="https://site.com/", backend=backend)
+
+    assert page["text"].split("\n") == ["Inner para text", "tail text after inner block", "Cell para", "cell tail link"]
+    assert page["links"][0]["context"] == "cell tail link"
+
+MALFORMED = [
+    ("<p>a<p>b<div>c</div>d", ["a", "b"]),
+    ("<div>x<p>a</div>y", ["a"]),
+    ("<ul><li>a<div>b</div>c</li></ul>", ["a", "b", "c"]),
+    ("<p>a<ul><li>b</ul>c", ["a", "b"]),
+    ("<dl><dt>a<dd>b<dt>c</dl>", ["a", "b", "c"]),
+]
+
+@pytest.mark.parametrize("backend", backends)
+@pytest.mark.parametrize("html, blocks", MALFORMED)
+def test_backends_agree_on_malformed_markup(backend, html, blocks):
+    assert extract_page(html, backend=backend)["text"].split("\n") == blocks
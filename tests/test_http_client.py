@@ -0,0 +1,26 @@
+# tests/test_http_client.py
+
+from agent.http_client import HTTPClient
+
+def test_sessions_are_pooled_per_host():
+    client = HTTPClient(pool_size=4)
+    a = client.session_for("https://example.com/a")
+    b = client.session_for("https://EXAMPLE.com/b?x=1")
+    other = client.session_for("https://example.org/")
+
+    assert a is b
+    assert a is not other
+    assert a.get_adapter("https://example.com/")._pool_maxsize == 4
+
+def test_get_applies_default_timeout(monkeypatch):
+    seen = {}
+
+    def mock_get(self, url, **kwargs):
+        seen.update(kwargs)
+        return "ok"
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    client = HTTPClient(timeout=3)
+
+    assert client.get("https://example.com") == "ok"
+    assert seen["timeout"] == 3
@@ -0,0 +1,35 @@
+# tests/test_instrumentation.py
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from agent.instrumentation import incr, propagate, record_span, span, start_trace
+
+def test_spans_and_counters_follow_worker_threads(tmp_path):
+    export = tmp_path / "trace.jsonl"
+
+    def work(i):
+        with span("fetch", url=f"https://example.com/{i}") as record:
+            record["attributes"]["bytes"] = 100
+            incr("http.bytes", 100)
+
+    with start_trace("research", export_path=str(export)) as trace:
+        with span("scrape") as parent:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                list(executor.map(propagate(work), range(6)))
+        record_span("parse", 0.25)
+
+    summary = trace.summary()
+    assert summary["stages"]["fetch"]["count"] == 6
+    assert summary["stages"]["parse"]["total"] == 0.25
+    assert summary["counters"] == {"http.bytes": 600}
+    fetches = [s for s in trace.spans if s["name"] == "fetch"]
+    assert all(s["parent_id"] == parent["span_id"] for s in fetches)
+
+    lines = [json.loads(line) for line in export.read_text().splitlines()]
+    assert len(lines) == len(trace.spans) + 1
+    assert lines[-1]["counters"] == {"http.bytes": 600}
+
+def test_outside_a_trace_nothing_is_recorded():
+    with span("score") as record:
+        incr("api.gemini")
+    assert record["duration"] >= 0
@@ -0,0 +1,21 @@
+# tests/test_link_ranker.py
+
+from pipeline.link_ranker import LinkRanker, tokenize_link_text, rank_links_by_query
+
+def test_tokenize_url_paths():
+    assert tokenize_link_text("/blogPosts/rocket-pricing_2025.html?page=2") == ["blog", "posts", "rocket", "pricing", "2025", "page", "2"]
+
+def test_anchor_text_drives_ranking_and_threshold():
+    ranker = LinkRanker("enterprise pricing plans")
+    links = [
+        {"url": "https://site.com/p/123", "anchor": "Pricing and plans"},
+        {"url": "https://site.com/careers", "anchor": "Join us"},
+    ]
+
+    ranked = ranker.rank(links)
+
+    assert [link["url"] for link, _ in ranked] == ["https://site.com/p/123"]
+    assert ranked[0][1] >= 0.3
+
+def test_rank_links_by_query_accepts_plain_urls():
+    assert rank_links_by_query(["https://a.com/about", "https://a.com/pricing"], "pricing") == ["https://a.com/pricing"]
@@ -0,0 +1,37 @@
+# tests/test_memory_index.py
+
+import numpy as np
+from pipeline.memory_index import InMemoryVectorIndex
+
+class FakeEmbeddings:
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0] if "rocket" in text else [0.0, 1.0, 0.0]
+
+class RecordingWriter:
+    def __init__(self):
+        self.batches = []
+
+    def upsert(self, chunks, vectors):
+        self.batches.append(len(chunks))
+
+def chunk(url, content):
+    return {"content": content, "metadata": {"url": url}}
+
+def test_search_returns_top_k_by_cosine_and_honors_url_filter():
+    writer = RecordingWriter()
+    index = InMemoryVectorIndex(FakeEmbeddings(), key=lambda c: c["content"], write_behind=writer,
+                                initial_capacity=2)
+    index.add([chunk("https://a.com", "rockets"), chunk("https://b.com", "boats"),
+               chunk("https://c.com", "rocket fuel"), chunk("https://d.com", "failed")],
+              [[10.0, 0.0, 0.0], [0.0, 3.0, 0.0], [0.6, 0.8, 0.0], None])
+    index.add([chunk("https://b.com", "boats")], [[0.0, 0.0, 1.0]])  # same key replaces the row
+
+    assert len(index) == 3
+    assert writer.batches == [3, 1]
+    hits = index.search([1.0, 0.0, 0.0], k=2)
+    assert [doc.page_content for doc, _ in hits] == ["rockets", "rocket fuel"]
+    assert np.isclose(hits[0][1], 1.0)
+
+    retriever = index.as_retriever(search_kwargs={"k": 4, "filter": {"url": {"$in": ["https://b.com", "https://c.com"]}}})
+    assert [doc.metadata["url"] for doc in retriever.get_relevant_documents("rocket")] == ["https://c.com", "https://b.com"]
+    assert index.search([1.0, 0.0, 0.0], urls=["https://x.com"]) == []
@@ -0,0 +1,69 @@
+# tests/test_page_cache.py
+
+import pytest
+from agent.page_cache import PageCache, freshness_lifetime
+from agent.scraper_tool import WebScraperTool
+
+class MockClient:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        status, response_headers, body = self.responses.pop(0)
+
+        class MockResponse:
+            status_code = status
+            def __init__(self):
+                self.headers = {"Content-Type": "text/html", **response_headers}
+            def raise_for_status(self): pass
+            def iter_content(self, chunk_size=1):
+                yield body
+            def close(self): pass
+        return MockResponse()
+
+@pytest.fixture
+def cache(tmp_path):
+    return PageCache(path=str(tmp_path / "pages.sqlite"))
+
+def test_fresh_entry_is_served_without_network(cache):
+    client = MockClient([(200, {"Cache-Control": "max-age=600"}, b"<p>cached text</p>")])
+    scraper = WebScraperTool(http_client=client, page_cache=cache)
+
+    first = scraper.scrape("https://example.com/a")
+    second = scraper.scrape("https://example.com/a")
+
+    assert first == second == {"url": "https://example.com/a", "content": "cached text"}
+    assert len(client.requests) == 1
+    assert cache.stats()["hits"] == 1
+
+def test_stale_entry_is_revalidated(cache):
+    client = MockClient([
+        (200, {"Cache-Control": "no-cache", "ETag": '"v1"'}, b"<p>old text</p>"),
+        (304, {"Cache-Control": "max-age=600"}, b""),
+    ])
+    scraper = WebScraperTool(http_client=client, page_cache=cache)
+
+    scraper.scrape("https://example.com/a")
+    page = scraper.scrape("https://example.com/a")
+
+    assert page["content"] == "old text"
+    assert client.requests[1]["If-None-Match"] == '"v1"'
+    assert cache.stats()["revalidated"] == 1
+    assert cache.get("https://example.com/a")["fresh"]
+
+def test_entry_without_links_does_not_answer_link_requests(cache):
+    client = MockClient([(200, {}, b'<p>text <a href="/b">b</a></p>')] * 2)
+    scraper = WebScraperTool(http_client=client, page_cache=cache)
+
+    scraper.scrape("https://example.com/a")
+    page = scraper.fetch_page("https://example.com/a", want_links=True)
+
+    assert page["links"][0]["url"] == "https://example.com/b"
+    assert len(client.requests) == 2
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"Cache-Control": "public, max-age=120"}, 60) == 120
+    assert freshness_lifetime({"Cache-Control": "no-store"}, 60) is None
+    assert freshness_lifetime({}, 60) == 60
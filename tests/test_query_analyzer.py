@@ -1 +1,34 @@
- 
\ No newline at end of file
+# tests/test_query_analyzer.py
+
+from agent.query_analyzer import QueryAnalyzer, normalize_query
+from agent.ttl_cache import TTLCache
+
+RESPONSE = """Intent: Compare rocket launch costs
+Info Types: pricing
+Time Range: recent
+KeywordChunks:
+[["rocket launch cost"], ["spacex pricing"]]"""
+
+class MockModel:
+    def __init__(self, *args, **kwargs):
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        class MockResponse:
+            text = RESPONSE
+        return MockResponse()
+
+def test_normalize_query():
+    assert normalize_query("  What's the COST of   rockets? ") == "what s the cost of rockets"
+
+def test_plan_is_cached_by_normalized_query(monkeypatch, tmp_path):
+    monkeypatch.setattr("agent.query_analyzer.genai.GenerativeModel", MockModel)
+    analyzer = QueryAnalyzer(cache=TTLCache("query_plans", path=str(tmp_path / "plans.sqlite")))
+
+    first = analyzer.analyze_query("Rocket launch costs?")
+    second = analyzer.analyze_query("rocket   launch costs")
+
+    assert first["KeywordChunks"] == [["rocket launch cost"], ["spacex pricing"]]
+    assert second == first
+    assert analyzer.model.calls == 1
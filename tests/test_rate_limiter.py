@@ -0,0 +1,20 @@
+# tests/test_rate_limiter.py
+
+from agent.rate_limiter import TokenBucket
+
+def test_burst_then_throttle(monkeypatch):
+    clock = {"now": 0.0}
+    monkeypatch.setattr("agent.rate_limiter.time.monotonic", lambda: clock["now"])
+    monkeypatch.setattr("agent.rate_limiter.time.sleep", lambda s: clock.__setitem__("now", clock["now"] + s))
+    bucket = TokenBucket(rate_per_minute=60, capacity=2)
+
+    assert bucket.acquire() and bucket.acquire()
+    assert clock["now"] == 0.0
+
+    assert bucket.acquire()
+    assert abs(clock["now"] - 1.0) < 1e-9
+
+def test_timeout(monkeypatch):
+    bucket = TokenBucket(rate_per_minute=1, capacity=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=0.01)
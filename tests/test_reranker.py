@@ -0,0 +1,67 @@
+# tests/test_reranker.py
+
+import pytest
+from types import SimpleNamespace
+from pipeline import reranker
+from pipeline.reranker import _parse_score_array, score_documents_with_gemini, LocalReranker, Reranker, bm25_scores
+
+def make_doc(url, text):
+    return SimpleNamespace(metadata={"url": url}, page_content=text)
+
+class MockModel:
+    def __init__(self, batch_reply):
+        self.batch_reply = batch_reply
+        self.calls = 0
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        if "JSON array" in prompt:
+            return SimpleNamespace(text=self.batch_reply)
+        return SimpleNamespace(text="2")
+
+def test_parse_score_array():
+    assert _parse_score_array("Scores: [5, 2, 9]", 3) == [5, 2, 5]
+    assert _parse_score_array("[1, 2]", 3) is None
+    assert _parse_score_array("no scores", 1) is None
+
+@pytest.mark.parametrize("reply, expected_calls, expected_scores", [
+    ("```json\n[1, 4]\n```", 1, [4, 1]),
+    ("sorry", 3, [2, 2]),
+])
+def test_batch_mode_uses_one_call_and_falls_back(monkeypatch, reply, expected_calls, expected_scores):
+    model = MockModel(reply)
+    monkeypatch.setattr(reranker.genai, "GenerativeModel", lambda name: model)
+    docs = [make_doc("https://a.com", "alpha"), make_doc("https://b.com", "beta")]
+
+    scored = score_documents_with_gemini(docs, "query", mode="batch")
+
+    assert model.calls == expected_calls
+    assert [entry["score"] for entry in scored] == expected_scores
+
+class MockEmbeddings:
+    model = "mock"
+
+    def embed_documents(self, texts):
+        return [[1.0, 0.0] if "rocket" in text else [0.0, 1.0] for text in texts]
+
+    def embed_query(self, text):
+        return [1.0, 0.0]
+
+def test_bm25_prefers_matching_terms():
+    scores = bm25_scores(["launch of the rocket", "cooking pasta at home"], "rocket launch")
+    assert scores[0] > scores[1] == 0
+
+def test_local_reranker_orders_by_similarity():
+    docs = [make_doc("https://b.com", "pasta recipes"), make_doc("https://a.com", "rocket launch schedule")]
+
+    scored = LocalReranker(MockEmbeddings()).score(docs, "rocket launch")
+
+    assert [entry["url"] for entry in scored] == ["https://a.com", "https://b.com"]
+    assert scored[0]["score"] == 5 and scored[1]["score"] == 1
+
+def test_rerankers_must_implement_score():
+    class Unfinished(Reranker):
+        pass
+
+    with pytest.raises(TypeError):
+        Unfinished()
@@ -0,0 +1,100 @@
+# tests/test_research.py
+
+import threading
+import pytest
+from pipeline import research
+from pipeline.research import ResearchPipeline, StageMemo
+
+def make_pipeline(monkeypatch, tmp_path, calls, api_key="test"):
+    monkeypatch.chdir(tmp_path)  # caches live under ./.cache
+
+    def fake_scrape_and_embed(keyword_chunks, *args, on_event=None, **kwargs):
+        calls.append("scrape_embed")
+        on_event("source", {"title": "A", "link": "https://a.com", "crawled": False})
+        chunk = {"content": "text", "metadata": {"url": "https://a.com"}}
+        return [{"title": "A", "link": "https://a.com"}], [chunk], "store"
+
+    def fake_generate_answer(user_query, retriever, reranker=None, on_token=None):
+        calls.append("answer")
+        return {"answer": f"answer {len(calls)}", "sources": [], "scores": [],
+                "timings": {"synthesize": 0.0}, "context": {"tokens": 1}}
+
+    monkeypatch.setattr(research, "analyze_query", lambda query, cache=None: calls.append("analyze") or [["a"]])
+    monkeypatch.setattr(research, "scrape_and_embed", fake_scrape_and_embed)
+    monkeypatch.setattr(research, "build_retriever", lambda store, k, urls: None)
+    monkeypatch.setattr(research, "generate_answer", fake_generate_answer)
+    return ResearchPipeline(gemini_api_key=api_key, embedding_model=object(), use_answer_cache=False)
+
+def test_reruns_repeat_only_stages_whose_settings_changed(monkeypatch, tmp_path):
+    calls = []
+    pipeline = make_pipeline(monkeypatch, tmp_path, calls)
+    memo = StageMemo()
+
+    first = pipeline.run("Rocket prices", memo=memo)
+    assert calls == ["analyze", "scrape_embed", "answer"]
+    assert first.reused == []
+
+    events = []
+    again = pipeline.run("rocket prices?", memo=memo, on_event=lambda name, payload: events.append(name))
+    assert calls == ["analyze", "scrape_embed", "answer"]
+    assert again.answer == first.answer
+    assert again.reused == ["analyze", "scrape_embed", "answer"]
+    assert events == ["memo_hit", "source", "stage"]
+
+    rescored = pipeline.with_settings(scoring_mode="local").run("Rocket prices", memo=memo)
+    assert calls[3:] == ["answer"]
+    assert rescored.reused == ["analyze", "scrape_embed"]
+    assert rescored.answer != first.answer
+
+    pipeline.run("Rocket prices", memo=memo, force_refresh=True)
+    assert calls[4:] == ["analyze", "scrape_embed", "answer"]
+
+def test_with_settings_shares_tools_and_validates(monkeypatch, tmp_path):
+    pipeline = make_pipeline(monkeypatch, tmp_path, [])
+
+    variant = pipeline.with_settings(num_links=8)
+    assert (variant.num_links, pipeline.num_links) == (8, 4)
+    assert variant.scraper is pipeline.scraper and variant.embedding_cache is pipeline.embedding_cache
+    with pytest.raises(ValueError):
+        pipeline.with_settings(scoring_mode="random")
+    with pytest.raises(ValueError):
+        pipeline.with_settings(persist_dir="elsewhere")
+
+def test_each_run_uses_its_own_pipelines_gemini_key(monkeypatch, tmp_path):
+    configured, seen = [], []
+    monkeypatch.setattr(research.genai, "configure", lambda api_key: configured.append(api_key))
+    first = make_pipeline(monkeypatch, tmp_path, [], api_key="key-a")
+    second = make_pipeline(monkeypatch, tmp_path, [], api_key="key-b")
+    in_first, release_first = threading.Event(), threading.Event()
+
+    def fake_analyze(query, cache=None):
+        seen.append((query, configured[-1]))
+        if query == "first":
+            in_first.set()
+            release_first.wait(5)
+        return [["a"]]
+
+    monkeypatch.setattr(research, "analyze_query", fake_analyze)
+    runner = threading.Thread(target=first.run, args=("first",))
+    runner.start()
+    in_first.wait(5)
+    waiting = threading.Thread(target=second.run, args=("second",))
+    waiting.start()
+    waiting.join(0.2)
+    assert seen == [("first", "key-a")]  # the other key waits for the running pipeline
+
+    release_first.set()
+    runner.join(5)
+    waiting.join(5)
+    first.run("third")
+    assert seen == [("first", "key-a"), ("second", "key-b"), ("third", "key-a")]
+
+def test_run_without_fetched_pages_fails_instead_of_answering_from_the_store(monkeypatch, tmp_path):
+    calls = []
+    pipeline = make_pipeline(monkeypatch, tmp_path, calls)
+    monkeypatch.setattr(research, "scrape_and_embed", lambda *args, **kwargs: ([], [], "store"))
+
+    result = pipeline.run("Rocket prices")
+
+    assert result.error == "No pages could be fetched for this query."
+    assert "answer" not in calls and not result.answer
@@ -1,20 +1,64 @@
- # tests/test_scraper_tool.py
+# tests/test_scraper_tool.py
 
 import pytest
-from agent.scraper_tool import WebScraperTool
+from agent.http_client import HTTPClient
+from agent.scraper_tool import WebScraperTool, detect_encoding
 
 @pytest.fixture
 def scraper():
     return WebScraperTool()
 
+def mock_response(body: bytes, content_type="text/html; charset=utf-8", read=None):
+    class MockResponse:
+        status_code = 200
+        headers = {"Content-Type": content_type}
+        def raise_for_status(self): pass
+        def iter_content(self, chunk_size=1):
+            for i in range(0, len(body), chunk_size):
+                if read is not None:
+                    read.append(chunk_size)
+                yield body[i:i + chunk_size]
+        def close(self): pass
+    return MockResponse()
+
 def test_scrape_html(monkeypatch, scraper):
     def mock_get(*args, **kwargs):
-        class MockResponse:
-            def raise_for_status(self): pass
-            text = "<html><body><p>Test paragraph</p></body></html>"
-        return MockResponse()
+        return mock_response(b"<html><body><p>Test paragraph</p></body></html>")
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     result = scraper.scrape("https://ai.google.dev/gemini-api/docs/models")
     
     assert "Test paragraph" in result["content"]
+
+def test_scrape_skips_non_html(monkeypatch, scraper):
+    read = []
+    monkeypatch.setattr("requests.Session.get", lambda *a, **k: mock_response(b"%PDF-1.7 ...", "application/pdf", read))
+
+    assert scraper.scrape("https://example.com/report.pdf")["content"] == ""
+    assert read == []
+
+def test_scrape_stops_reading_once_enough_text(monkeypatch, scraper):
+    read = []
+    body = b"<p>" + b"word " * 20000 + b"</p>" + b"<p>more</p>" * 20000
+    monkeypatch.setattr("requests.Session.get", lambda *a, **k: mock_response(body, read=read))
+
+    result = scraper.scrape("https://example.com/long")
+
+    assert len(result["content"]) == 5000
+    assert sum(read) < len(body) // 2
+
+def test_detect_encoding():
+    assert detect_encoding("text/html; charset=ISO-8859-1", b"") == "iso8859-1"
+    assert detect_encoding("text/html", b'<meta charset="windows-1252">') == "cp1252"
+    assert detect_encoding("text/html", b"<p>x</p>") == "utf-8"
+
+def test_scrape_uses_the_client_timeout(monkeypatch):
+    seen = {}
+    def mock_get(self, url, **kwargs):
+        seen.update(kwargs)
+        return mock_response(b"<p>Test paragraph</p>")
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    WebScraperTool(http_client=HTTPClient(timeout=7)).scrape("https://example.com/post")
+
+    assert seen["timeout"] == 7
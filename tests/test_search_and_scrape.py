@@ -0,0 +1,51 @@
+# tests/test_search_and_scrape.py
+
+from pipeline.fetch_scheduler import FetchScheduler
+from pipeline.search_and_scrape import search_and_scrape, page_memo_key, PageMemo
+
+class FakeSearch:
+    def search_page(self, query, page_num, num_results):
+        if page_num:
+            return []
+        return [{"title": "A", "link": "https://a.com/post"}, {"title": "B", "link": "https://b.com/post"}]
+
+class FakeScraper:
+    def __init__(self):
+        self.scraped = []
+
+    def scrape(self, url):
+        self.scraped.append(url)
+        return {"url": url, "content": f"text of {url}"}
+
+class FakeChunker:
+    def chunk_text(self, content, metadata):
+        return [{"content": content, "metadata": metadata}]
+
+def test_progress_is_reported_through_events():
+    events = []
+    results, chunks = search_and_scrape(
+        [["rockets"]], FakeSearch(), FakeScraper(), FakeChunker(), "rockets",
+        scheduler=FetchScheduler(max_workers=2, host_delay=0),
+        on_event=lambda name, payload: events.append((name, payload["link"]))
+    )
+
+    assert len(results) == len(chunks) == 2
+    assert sorted(events) == [("source", "https://a.com/post"), ("source", "https://b.com/post")]
+
+def test_page_memo_fetches_each_url_once_across_runs():
+    scraper = FakeScraper()
+    memo = PageMemo()
+    for query in ("rockets", "rocket prices"):
+        results, chunks = search_and_scrape(
+            [[query]], FakeSearch(), scraper, FakeChunker(), query,
+            scheduler=FetchScheduler(max_workers=2, host_delay=0), page_memo=memo
+        )
+        assert len(results) == len(chunks) == 2
+
+    assert sorted(scraper.scraped) == ["https://a.com/post", "https://b.com/post"]
+    assert memo.hits == 2
+
+def test_crawled_homepages_are_memoized_per_query():
+    assert page_memo_key("https://a.com/post", "rockets") == page_memo_key("https://a.com/post", "boats")
+    assert page_memo_key("https://a.com/", "Rockets?") == page_memo_key("https://a.com/", "rockets")
+    assert page_memo_key("https://a.com/", "rockets") != page_memo_key("https://a.com/", "boats")
@@ -1,7 +1,9 @@
  # tests/test_search_tool.py
 
 import pytest
-from agent.search_tool import GoogleCSESearchTool
+from agent.http_client import HTTPClient
+from agent.search_tool import GoogleCSESearchTool, iter_search_results
+from agent.ttl_cache import TTLCache
 
 @pytest.fixture
 def search_tool():
@@ -11,6 +13,7 @@ def test_search_returns_list(monkeypatch, search_tool):
     # Mocked search response
     def mock_get(*args, **kwargs):
         class MockResponse:
+            status_code = 200
             def raise_for_status(self): pass
             def json(self):
                 return {
@@ -20,8 +23,75 @@ def test_search_returns_list(monkeypatch, search_tool):
                 }
         return MockResponse()
 
-    monkeypatch.setattr("requests.get", mock_get)
+    monkeypatch.setattr("requests.Session.get", mock_get)
     results = search_tool.search("India US trade")
     
     assert isinstance(results, list)
     assert results[0]["title"] == "Test Title"
+
+def make_page_get(calls, items_per_page):
+    def mock_get(self, url, params=None, **kwargs):
+        calls.append(params["start"])
+        class MockResponse:
+            status_code = 200
+            def raise_for_status(self): pass
+            def json(self):
+                return {"items": [
+                    {"title": f"T{params['start'] + i}", "link": f"http://example.com/{params['start'] + i}"}
+                    for i in range(items_per_page)
+                ]}
+        return MockResponse()
+    return mock_get
+
+def test_results_are_cached_per_page(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr("requests.Session.get", make_page_get(calls, 10))
+    tool = GoogleCSESearchTool("key", "cx", cache=TTLCache("search", path=str(tmp_path / "search.sqlite")))
+
+    first = tool.search("India US trade", max_pages=2)
+    second = tool.search("India US trade", max_pages=2)
+
+    assert first == second and len(first) == 20
+    assert sorted(calls) == [1, 11]
+
+def test_iter_search_results_fetches_pages_lazily(monkeypatch, search_tool):
+    calls = []
+    monkeypatch.setattr("requests.Session.get", make_page_get(calls, 10))
+
+    results = iter_search_results(search_tool, ["India US trade"], max_pages=3)
+    taken = [next(results) for _ in range(10)]
+
+    assert len(taken) == 10 and calls == [1]
+    next(results)
+    assert calls == [1, 11]
+
+def test_iter_search_results_interleaves_queries_and_skips_seen_links():
+    class PagedSearch:
+        def __init__(self):
+            self.calls = []
+
+        def search_page(self, query, page_num, num_results):
+            self.calls.append((query, page_num))
+            if query == "short":
+                return [{"link": "http://example.com/shared"}]
+            return [{"link": f"http://example.com/{page_num}/{i}"} for i in range(num_results - 1)] + \
+                   [{"link": "http://example.com/shared"}]
+
+    search = PagedSearch()
+    links = [result["link"] for result in iter_search_results(search, ["long", "short"], max_pages=2, num_results=3)]
+
+    assert search.calls == [("long", 0), ("short", 0), ("long", 1)]
+    assert links == ["http://example.com/0/0", "http://example.com/0/1", "http://example.com/shared",
+                     "http://example.com/1/0", "http://example.com/1/1"]
+
+def test_search_uses_the_client_timeout(monkeypatch):
+    seen = {}
+    page_get = make_page_get([], 1)
+    def mock_get(self, url, params=None, **kwargs):
+        seen.update(kwargs)
+        return page_get(self, url, params=params)
+
+    monkeypatch.setattr("requests.Session.get", mock_get)
+    GoogleCSESearchTool("key", "cx", http_client=HTTPClient(timeout=7)).search_page("India US trade")
+
+    assert seen["timeout"] == 7